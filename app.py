@@ -1,31 +1,63 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+from flask import (
+    Flask, Response, render_template, request, redirect, url_for, jsonify, session,
+    stream_with_context
+)
 from functools import wraps
-from datetime import datetime
+from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
-import ollama
 import json
+import math
+import random
 import re
-from pathlib import Path
-
-try:
-    import joblib
-    import pandas as pd
-except Exception:
-    joblib = None
-    pd = None
 
 from db import (
-    init_db, create_user, get_user_by_email, get_user_by_id,
-    add_score, get_scores, save_schedule, get_latest_schedule,
+    init_db, init_app, create_user, get_user_by_email, get_user_by_id,
+    add_score, add_scores, get_scores, save_schedule, get_latest_schedule, complete_schedule_game,
     update_user_profile,
     add_orientation_question, get_orientation_questions,
     deactivate_orientation_question, get_orientation_questions_by_ids,
-    get_bandit_state, update_bandit_state, get_scores_by_game
+    get_domain_averages, get_game_stats
+)
+import bandit
+import content_pool
+from scheduling import (
+    DayStreamParser, build_schedule_prompt, build_chat_prompt, parse_chat_reply,
+    decode_compact_schedule, chat_fast_path, chat_cache_key, get_cached_reply,
+    remember_reply, chat_cache_stats
+)
+from llm import generate as llm_generate, stream as llm_stream
+from ml import (
+    get_cached_prediction, predict_for_user, invalidate_prediction,
+    model_ready, preload_model, start_model_preload, check_model_update,
+    FEATURE_SCORE_WINDOW
 )
 
 app = Flask(__name__)
 app.secret_key = "dev-change-this"  # hackathon OK; change for real production
 
+# Per-call LLM deadlines (seconds); on timeout the routes use their fallbacks
+SCHEDULE_TIMEOUT = 45
+SCHEDULE_CHAT_TIMEOUT = 30
+
+# Largest array accepted by /api/scores/batch
+SCORE_BATCH_LIMIT = 500
+
+FALLBACK_TYPING_TEXTS = [
+    "Neuroplasticity is the ability of the brain to form and reorganize synaptic connections, especially in response to learning or experience or following injury.",
+    "The ability to focus deeply on demanding tasks is becoming increasingly rare and valuable in our distracted world.",
+    "Cognitive training has been shown to improve various aspects of mental performance including memory, attention, and processing speed.",
+    "Modern technology offers us unprecedented opportunities to measure and track our cognitive abilities over time.",
+    "Regular practice and consistent effort are the foundations of skill development and cognitive improvement.",
+]
+
+FALLBACK_RECALL_WORDS = [
+    ["elephant", "crystal", "mountain", "piano", "harbor"],
+    ["garden", "thunder", "silver", "whisper", "anchor"],
+    ["canvas", "forest", "marble", "silence", "beacon"],
+    ["island", "symphony", "pearl", "venture", "wisdom"],
+    ["bridge", "twilight", "emerald", "rhythm", "horizon"],
+]
+
 
 @app.before_request
 def require_login():
@@ -38,6 +70,8 @@ def require_login():
 
 
 init_db()
+init_app(app)
+start_model_preload()
 
 
 def current_user():
@@ -83,11 +117,30 @@ def extract_json_object(text: str):
         return None
 
 
+def date_schedule_day(day, index, today=None):
+    """
+    Normalise one schedule day: force its date to today + index and make
+    sure it has a games list.
+    """
+    from datetime import date, timedelta
+
+    today = today or date.today()
+    if not isinstance(day, dict):
+        day = {"focus": "Training", "description": "", "games": []}
+
+    day["date"] = (today + timedelta(days=index)).isoformat()
+
+    # Ensure games exists
+    if "games" not in day or not isinstance(day["games"], list):
+        day["games"] = []
+    return day
+
+
 def add_dates_to_schedule(schedule_data, days):
     """
     Force schedule to start today and have sequential day.date fields.
     """
-    from datetime import date, timedelta
+    from datetime import date
 
     today = date.today()
 
@@ -110,142 +163,18 @@ def add_dates_to_schedule(schedule_data, days):
 
     # FORCE date for each day (override whatever the model returned)
     for i in range(days):
-        d = schedule_data["days"][i]
-        if not isinstance(d, dict):
-            d = {"focus": "Training", "description": "", "games": []}
-            schedule_data["days"][i] = d
-
-        d["date"] = (today + timedelta(days=i)).isoformat()
-
-        # Ensure games exists
-        if "games" not in d or not isinstance(d["games"], list):
-            d["games"] = []
+        schedule_data["days"][i] = date_schedule_day(schedule_data["days"][i], i, today)
 
     return schedule_data
 
 
-_MODEL_CACHE = {"model": None}
-
-
-def load_ml_model():
-    if not joblib:
-        return None
-    if _MODEL_CACHE["model"] is not None:
-        return _MODEL_CACHE["model"]
-    model_path = Path(__file__).parent / "ml-models" / "best_model.joblib"
-    if not model_path.exists():
-        return None
-    _MODEL_CACHE["model"] = joblib.load(model_path)
-    return _MODEL_CACHE["model"]
-
-
-def map_gender_to_legal_sex(gender):
-    if not gender:
-        return None
-    g = str(gender).strip().lower()
-    if g.startswith("m"):
-        return "M"
-    if g.startswith("f"):
-        return "W"
-    return None
-
-
-def extract_latest_by_game(scores):
-    latest = {}
-    for s in scores:
-        game = s.get("game")
-        if game and game not in latest:
-            latest[game] = s
-    return latest
-
-
-def build_feature_row(user, scores):
-    if not pd:
-        return None
-
-    latest = extract_latest_by_game(scores)
-
-    def get_detail(game_id, key):
-        details = (latest.get(game_id) or {}).get("details") or {}
-        return details.get(key)
-
-    # General demographics
-    age = user["age"] if user and user.get("age") not in ("", None) else None
-    legal_sex = map_gender_to_legal_sex(user.get("gender") if user else None)
-    race_eth = user.get("ethnicity") if user else None
-
-    # Orientation score proxy (sum device items)
-    orient_device_score = 0
-    orient_keys = [
-        "SATURN_SCORE_ORIENTATION_MONTH",
-        "SATURN_SCORE_ORIENTATION_YEAR",
-        "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK",
-        "SATURN_SCORE_ORIENTATION_DATE",
-    ]
-    for k in orient_keys:
-        val = get_detail("orientation", k)
-        if isinstance(val, (int, float)):
-            orient_device_score += int(val)
-
-    feature_cols = [
-        "AGE",
-        "AUTO_LEGAL_SEX",
-        "RACE_ETHNICITY",
-        "YR_EDU_num",
-        "SATURN_SCORE_STROOP_POINTS",
-        "SATURN_TIME_STROOP_ERRORS",
-        "SATURN_TIME_STROOP_MEAN_ms",
-        "MoCA_1_SCORE_orientation",
-        "SATURN_SCORE_ORIENTATION_MONTH",
-        "SATURN_SCORE_ORIENTATION_YEAR",
-        "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK",
-        "SATURN_SCORE_ORIENTATION_STATE",
-        "SATURN_SCORE_RECALL_FIVEWORDS",
-        "SATURN_TIME_RECALL_FIVEWORDS_ms",
-        "MoCA_1_SCORE_recall",
-        "SATURN_MOTOR_SPEED_ms_per_button",
-        "MoCA_1_SCORE_fluency",
-    ]
-
-    data = {
-        "AGE": age,
-        "AUTO_LEGAL_SEX": legal_sex,
-        "RACE_ETHNICITY": race_eth,
-        "YR_EDU_num": None,
-        "SATURN_SCORE_STROOP_POINTS": get_detail("stroop", "SATURN_SCORE_STROOP_POINTS"),
-        "SATURN_TIME_STROOP_ERRORS": get_detail("stroop", "SATURN_TIME_STROOP_ERRORS"),
-        "SATURN_TIME_STROOP_MEAN_ms": get_detail("stroop", "SATURN_TIME_STROOP_MEAN_ms"),
-        "MoCA_1_SCORE_orientation": orient_device_score if orient_device_score > 0 else None,
-        "SATURN_SCORE_ORIENTATION_MONTH": get_detail("orientation", "SATURN_SCORE_ORIENTATION_MONTH"),
-        "SATURN_SCORE_ORIENTATION_YEAR": get_detail("orientation", "SATURN_SCORE_ORIENTATION_YEAR"),
-        "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK": get_detail("orientation", "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK"),
-        "SATURN_SCORE_ORIENTATION_STATE": get_detail("orientation", "SATURN_SCORE_ORIENTATION_STATE"),
-        "SATURN_SCORE_RECALL_FIVEWORDS": get_detail("recall", "SATURN_SCORE_RECALL_FIVEWORDS"),
-        "SATURN_TIME_RECALL_FIVEWORDS_ms": get_detail("recall", "SATURN_TIME_RECALL_FIVEWORDS_ms"),
-        "MoCA_1_SCORE_recall": get_detail("recall", "SATURN_SCORE_RECALL_FIVEWORDS"),
-        "SATURN_MOTOR_SPEED_ms_per_button": get_detail("tapping", "SATURN_MOTOR_SPEED_ms_per_button"),
-        "MoCA_1_SCORE_fluency": None,
-    }
-
-    # Add missingness indicators
-    for col in feature_cols:
-        data[f"{col}_missing"] = 1 if data.get(col) is None else 0
-
-    return pd.DataFrame([data])
-
-
 def game_higher_better(game):
     return game not in {"tapping"}
 
 
-def compute_context_bucket(game, scores):
-    # scores: list of sqlite rows or dicts, newest first
-    values = []
-    for s in scores:
-        val = s["value"] if isinstance(s, dict) else s["value"]
-        if val is None:
-            continue
-        values.append(float(val))
+def compute_context_bucket(game, values):
+    # values: the game's recent scores, newest first (user_game_stats.recent)
+    values = [float(v) for v in values or [] if v is not None]
     if len(values) < 3:
         return "mid"
 
@@ -267,53 +196,24 @@ def compute_context_bucket(game, scores):
     return "mid"
 
 
-def select_bandit_action(user_id, game, context):
-    import random
-    actions = ["easy", "medium", "hard"]
-    rows = get_bandit_state(user_id, game, context)
-    stats = {r["action"]: {"count": r["count"], "value": r["value"]} for r in rows}
+def practice_reward(game, recent):
+    # recent: the game's values newest first, including the score just played
+    if len(recent) < 2:
+        return 0.0
+    delta = float(recent[0]) - float(recent[1])
+    if not game_higher_better(game):
+        delta = -delta
+    return 1.0 if delta > 0 else (-1.0 if delta < 0 else 0.0)
+
 
-    total_n = sum(s["count"] for s in stats.values()) if stats else 0
-    epsilon = max(0.1, 1 / (total_n + 1) ** 0.5)
-    if random.random() < epsilon or not stats:
-        return random.choice(actions), epsilon, stats
+def select_bandit_action(user_id, game, context):
+    # Served from the in-memory arm statistics; see bandit.py
+    return bandit.select_action(user_id, game, context)
 
-    best = max(actions, key=lambda a: stats.get(a, {"value": 0}).get("value", 0))
-    return best, epsilon, stats
 
 def mark_schedule_game_completed(user_id: int, game_id: str):
     """Mark today's instance of game_id as completed in the latest schedule."""
-    latest = get_latest_schedule(user_id)
-    if not latest:
-        return
-
-    try:
-        schedule_data = json.loads(latest["schedule_data"])
-    except:
-        return
-
-    today = date.today().isoformat()
-
-    changed = False
-    for day in schedule_data.get("days", []):
-        if day.get("date") != today:
-            continue
-
-        for g in day.get("games", []):
-            if g.get("id") == game_id:
-                if not g.get("completed"):
-                    g["completed"] = True
-                    g["completed_at"] = datetime.utcnow().isoformat()
-                    changed = True
-
-    if changed:
-        # Save as newest schedule snapshot (your app reads "latest" anyway)
-        save_schedule(
-            user_id,
-            json.dumps(schedule_data),
-            int(schedule_data.get("num_days", len(schedule_data.get("days", [])) or 7)),
-            datetime.utcnow().isoformat()
-        )
+    complete_schedule_game(user_id, game_id, datetime.utcnow().isoformat())
 
 
 @app.route("/")
@@ -640,15 +540,11 @@ def practice():
     todays_tasks = []
     latest = get_latest_schedule(user["id"])
     if latest:
-        try:
-            sched = json.loads(latest["schedule_data"])
-            today = date.today().isoformat()
-            for d in sched.get("days", []):
-                if d.get("date") == today:
-                    todays_tasks = d.get("games", []) or []
-                    break
-        except:
-            todays_tasks = []
+        today = date.today().isoformat()
+        for d in latest["schedule_data"].get("days", []):
+            if d.get("date") == today:
+                todays_tasks = d.get("games", []) or []
+                break
 
     return render_template(
         "practice.html",
@@ -669,40 +565,37 @@ def dashboard():
         return redirect(url_for("login"))
     user = dict(user)
 
-    raw_scores = get_scores(user["id"], limit=30)
+    # The score list doubles as the prediction's feature window.
+    raw_scores = get_scores(user["id"], limit=FEATURE_SCORE_WINDOW)
     scores = []
     for s in raw_scores:
+        # SATURN_* values come from score's generated columns; details stays
+        # raw JSON for the score modal and is only decoded for custom prompts.
         row = dict(s)
-        if row.get("details"):
-            try:
-                row["details"] = json.loads(row["details"])
-            except Exception:
-                row["details"] = {}
         game = (row.get("game") or "").lower()
         max_score = None
         display_subvalue = None
         display_unit = "pts"
         if game == "stroop":
             max_score = 3
-            mean_ms = (row.get("details") or {}).get("SATURN_TIME_STROOP_MEAN_ms")
+            mean_ms = row.get("SATURN_TIME_STROOP_MEAN_ms")
             if mean_ms is not None:
                 display_subvalue = f"{mean_ms} ms"
         elif game == "recall":
             max_score = 5
-            recall_ms = (row.get("details") or {}).get("SATURN_TIME_RECALL_FIVEWORDS_ms")
+            recall_ms = row.get("SATURN_TIME_RECALL_FIVEWORDS_ms")
             if recall_ms is not None:
                 display_subvalue = f"{recall_ms} ms"
         elif game == "orientation":
-            custom_total = (row.get("details") or {}).get("custom_total")
+            custom_total = json.loads(row["details"]).get("custom_total") if row.get("details") else None
             max_score = 4 + (custom_total or 0)
-            details = row.get("details") or {}
             timing_keys = [
                 "SATURN_TIME_ORIENTATION_MONTH_ms",
                 "SATURN_TIME_ORIENTATION_YEAR_ms",
                 "SATURN_TIME_ORIENTATION_DAY_OF_WEEK_ms",
                 "SATURN_TIME_ORIENTATION_DATE_ms",
             ]
-            times = [details.get(k) for k in timing_keys if details.get(k) is not None]
+            times = [row[k] for k in timing_keys if row.get(k) is not None]
             if times:
                 avg_ms = round(sum(times) / len(times))
                 display_subvalue = f"{avg_ms} ms avg"
@@ -724,28 +617,26 @@ def dashboard():
         if s["domain"] not in latest_by_domain:
             latest_by_domain[s["domain"]] = s
 
-    prediction = None
-    model = load_ml_model()
-    features = build_feature_row(user, scores)
-    if model is not None and features is not None:
+    # Cached (or batch-scored) prediction for this user's scores and the
+    # deployed model; only a miss builds features and runs the model. Any
+    # score that enters the window, even a late backdated upload, has a
+    # higher id than everything in it, so the highest id keys the window.
+    check_model_update()
+    latest_score_id = max((s["id"] for s in scores), default=0)
+    prediction = get_cached_prediction(user["id"], latest_score_id)
+
+    if prediction is None and not model_ready():
+        # Never block a page view on deserializing the model
+        preload_model()
+        prediction = {
+            "label": "model warming up",
+            "probability": None,
+            "color": "indigo"
+        }
+
+    if prediction is None:
         try:
-            proba = None
-            if hasattr(model, "predict_proba"):
-                proba = float(model.predict_proba(features)[0][1])
-            pred = int(model.predict(features)[0])
-            color = "indigo"
-            if proba is not None:
-                if proba < 0.33:
-                    color = "emerald"
-                elif proba < 0.66:
-                    color = "amber"
-                else:
-                    color = "rose"
-            prediction = {
-                "label": "abnormal" if pred == 1 else "normal",
-                "probability": proba,
-                "color": color
-            }
+            prediction = predict_for_user(user, scores, latest_score_id, datetime.utcnow().isoformat())
         except Exception as exc:
             print(f"Prediction error: {exc}")
             prediction = None
@@ -757,9 +648,11 @@ def dashboard():
         }
 
     difficulty_levels = {}
-    for game_id in ["stroop", "recall", "orientation", "tapping", "trails_switch", "visual_puzzle"]:
-        recent = get_scores_by_game(user["id"], game_id, limit=5)
-        context = compute_context_bucket(game_id, recent)
+    practice_games = ["stroop", "recall", "orientation", "tapping", "trails_switch", "visual_puzzle"]
+    stats_by_game = get_game_stats(user["id"], practice_games)
+    for game_id in practice_games:
+        stats = stats_by_game.get(game_id)
+        context = compute_context_bucket(game_id, stats["recent"] if stats else [])
         action, _, _ = select_bandit_action(user["id"], game_id, context)
         difficulty_levels[game_id] = action
 
@@ -783,113 +676,156 @@ def api_score():
                          ) if payload.get("details") else None
     add_score(user["id"], payload.get("game"), payload.get(
         "domain"), payload.get("value"), datetime.utcnow().isoformat(), details)
+    invalidate_prediction(user["id"])
+    bandit.forget_choices(user["id"])
+    mark_schedule_game_completed(user["id"], payload.get("game"))
 
     # Optional: bandit update for practice sessions
     action = payload.get("practice_action")
     context = payload.get("practice_context")
     if action and context:
         game = payload.get("game")
-        recent = get_scores_by_game(user["id"], game, limit=2)
-        reward = 0.0
-        if len(recent) >= 2:
-            current = float(recent[0]["value"])
-            prev = float(recent[1]["value"])
-            delta = current - prev
-            if not game_higher_better(game):
-                delta = -delta
-            reward = 1.0 if delta > 0 else (-1.0 if delta < 0 else 0.0)
-        update_bandit_state(
+        stats = get_game_stats(user["id"], [game]).get(game)
+        reward = practice_reward(game, stats["recent"] if stats else [])
+        bandit.record_reward(
             user["id"], game, context, action, reward, datetime.utcnow().isoformat()
         )
     return jsonify({"ok": True})
 
 
-@app.get("/api/typing-text")
-@login_required
-def get_typing_text():
-    """Generate random text from LLM for typing test."""
+def parse_client_timestamp(value):
+    """
+    Naive UTC isoformat for a client timestamp (ISO 8601 string, or epoch
+    milliseconds as sent by Date.now()); None if it can't be parsed.
+    """
     try:
-        # Use Ollama to generate text via local LLM
-        response = ollama.generate(
-            model="mistral",  # or "llama2", "neural-chat", etc.
-            prompt="Generate a single short sentence (15-30 words) about a random topic for a typing test. Just the sentence, nothing else.",
-            stream=False
-        )
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value / 1000, timezone.utc).replace(tzinfo=None).isoformat()
+        parsed = datetime.fromisoformat(str(value))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
 
-        text = response['response'].strip()
 
-        # Fallback if LLM fails to generate good text
-        if not text or len(text) < 10:
-            text = "Neuroplasticity is the ability of the brain to form and reorganize synaptic connections, especially in response to learning or experience or following injury."
+@app.post("/api/scores/batch")
+@login_required
+def api_scores_batch():
+    """
+    Ingest queued sessions from offline devices: a JSON array of /api/score
+    payloads (or {"scores": [...]}), each with a client created_at. All of
+    them are written in one transaction, oldest first, with the practice
+    bandit updates replayed in that order. Sessions older than scores already
+    stored take their place by created_at (see db.add_scores), so a late
+    upload never becomes the user's latest result.
+    """
+    user = current_user()
+    payload = request.get_json(force=True)
+    items = payload.get("scores") if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return jsonify({"ok": False, "error": "expected a non-empty array of scores"}), 400
+    if len(items) > SCORE_BATCH_LIMIT:
+        return jsonify({"ok": False, "error": f"at most {SCORE_BATCH_LIMIT} scores per batch"}), 400
 
-        return jsonify({
-            "text": text,
-            "length": len(text)
-        })
-    except Exception as e:
-        print(f"LLM Error: {e}")
-        # Fallback text if LLM is unavailable
-        fallback_texts = [
-            "Neuroplasticity is the ability of the brain to form and reorganize synaptic connections, especially in response to learning or experience or following injury.",
-            "The ability to focus deeply on demanding tasks is becoming increasingly rare and valuable in our distracted world.",
-            "Cognitive training has been shown to improve various aspects of mental performance including memory, attention, and processing speed.",
-            "Modern technology offers us unprecedented opportunities to measure and track our cognitive abilities over time.",
-            "Regular practice and consistent effort are the foundations of skill development and cognitive improvement.",
-        ]
-        import random
-        text = random.choice(fallback_texts)
-        return jsonify({
-            "text": text,
-            "length": len(text)
+    now = datetime.utcnow().isoformat()
+    scores = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("game") or not item.get("domain"):
+            return jsonify({"ok": False, "error": f"score {i}: game and domain are required"}), 400
+        try:
+            value = float(item.get("value"))
+        except (TypeError, ValueError):
+            value = None
+        # float() also takes "NaN", "inf" and 1e999; none of them can be stored.
+        if value is None or not math.isfinite(value):
+            return jsonify({"ok": False, "error": f"score {i}: value must be a finite number"}), 400
+        created_at = now
+        if item.get("created_at") is not None:
+            created_at = parse_client_timestamp(item["created_at"])
+            if created_at is None:
+                return jsonify({"ok": False, "error": f"score {i}: invalid created_at"}), 400
+        scores.append({
+            "game": item["game"],
+            "domain": item["domain"],
+            "value": value,
+            "created_at": created_at,
+            "details": json.dumps(item["details"]) if item.get("details") else None,
+            "practice_action": item.get("practice_action"),
+            "practice_context": item.get("practice_context"),
         })
 
+    scores.sort(key=lambda s: s["created_at"])
+    score_ids = add_scores(user["id"], scores, reward=practice_reward)
+    invalidate_prediction(user["id"])
+    # add_scores replayed the rewards straight into bandit_state
+    bandit.invalidate(user["id"])
+    bandit.forget_choices(user["id"])
+    return jsonify({"ok": True, "count": len(score_ids), "score_ids": score_ids})
+
+
+@app.get("/api/practice/difficulty")
+@login_required
+def practice_difficulty_api():
+    """
+    Difficulty level for a practice game, chosen by the bandit for the
+    user's current context bucket. The choice is kept until the user's
+    next score (or bandit.STATE_TTL, for scores another worker handled),
+    so restarting a game doesn't re-roll it or hit the DB.
+    """
+    user = current_user()
+    game = (request.args.get("game") or "").strip()
+    if not game:
+        return jsonify({"ok": False, "error": "game is required"}), 400
+
+    choice = bandit.get_choice(user["id"], game)
+    if choice is None:
+        stats = get_game_stats(user["id"], [game]).get(game)
+        context = compute_context_bucket(game, stats["recent"] if stats else [])
+        level, _, _ = select_bandit_action(user["id"], game, context)
+        choice = bandit.remember_choice(user["id"], game, level, context)
+
+    level, context = choice
+    return jsonify({"ok": True, "game": game, "level": level, "context": context})
+
+
+@app.get("/api/typing-text")
+@login_required
+def get_typing_text():
+    """Serve a pre-generated sentence for the typing test."""
+    user = current_user()
+    text = content_pool.take(user["id"], content_pool.TYPING_TEXT)
+
+    # Fallback while the pool is empty or this user has seen all of it
+    if not text:
+        text = random.choice(FALLBACK_TYPING_TEXTS)
+
+    return jsonify({
+        "text": text,
+        "length": len(text)
+    })
+
 @app.get("/api/recall-words")
 @login_required
 def get_recall_words():
-    """Generate 5 random words for recall game."""
-    try:
-        # Use Ollama to generate words via local LLM
-        response = ollama.generate(
-            model="mistral",
-            prompt="Generate exactly 5 random common English words separated by commas. Just the words, nothing else. Example format: cat, book, tree, water, light",
-            stream=False
-        )
+    """Serve a pre-generated set of 5 words for the recall game."""
+    user = current_user()
+    words = content_pool.take(user["id"], content_pool.RECALL_WORDS)
 
-        words_str = response['response'].strip()
-        words = [w.strip().lower() for w in words_str.split(',')][:5]
-
-        # Fallback if we don't get exactly 5 words
-        if len(words) < 5:
-            import random
-            fallback_words = [
-                ["elephant", "crystal", "mountain", "piano", "harbor"],
-                ["garden", "thunder", "silver", "whisper", "anchor"],
-                ["canvas", "forest", "marble", "silence", "beacon"],
-                ["island", "symphony", "pearl", "venture", "wisdom"],
-                ["bridge", "twilight", "emerald", "rhythm", "horizon"],
-            ]
-            words = random.choice(fallback_words)
+    # Fallback while the pool is empty or this user has seen all of it
+    if not words:
+        words = random.choice(FALLBACK_RECALL_WORDS)
 
-        return jsonify({
-            "words": words[:5]
-        })
-
-    except Exception as e:
-        print(f"LLM Error: {e}")
-        # Fallback words if LLM is unavailable entirely
-        selected_set = random.choice(fallback_sets)
-        return jsonify({
-            "words": selected_set[:5] # Ensure only 5 words from your expanded list are sent
-        })
+    return jsonify({
+        "words": words[:5]
+    })
 
 @app.route("/schedule")
 @login_required
 def schedule():
     user = current_user()
-    scores = get_scores(user["id"], limit=100)
-
     # Check if user has any assessments
-    has_assessments = len(scores) > 0
+    has_assessments = bool(get_game_stats(user["id"]))
 
     # Get latest schedule
     latest_schedule = get_latest_schedule(user["id"])
@@ -898,12 +834,7 @@ def schedule():
 
     if latest_schedule:
         current_schedule = latest_schedule
-        schedule_data_str = latest_schedule["schedule_data"]
-        try:
-            schedule_json = json.loads(schedule_data_str) if isinstance(
-                schedule_data_str, str) else schedule_data_str
-        except:
-            schedule_json = {}
+        schedule_json = latest_schedule["schedule_data"]
 
     return render_template(
         "schedule.html",
@@ -922,62 +853,12 @@ def generate_schedule_api():
     payload = request.get_json(force=True)
     days = int(payload.get("days", 7))
 
-    # You CAN keep using scores for now (it’s fine)
-    scores = get_scores(user["id"], limit=100)
-
-    # Domain averages (optional, but you already have it)
-    domain_scores = {}
-    for score in scores:
-        domain = score["domain"]
-        domain_scores.setdefault(domain, []).append(score["value"])
-    domain_averages = {d: (sum(v)/len(v)) for d, v in domain_scores.items()} if domain_scores else {}
-
-    domains_info = "\n".join([f"- {d}: {avg:.2f}/100" for d, avg in domain_averages.items()]) if domain_averages else "- No prior scores yet"
-
-    prompt = f"""
-You are a cognitive training coach. Create a {days}-day schedule starting today.
-
-User signals (not a diagnosis):
-{domains_info}
-
-Available game ids (use ONLY these):
-- typing
-- visual_puzzle
-- stroop
-- recall
-- tapping
-- orientation
-- trails
-- fluency
-
-Rules:
-- Output ONLY valid JSON. No extra text.
-- Exactly {days} days.
-- Each day: 2 to 4 games.
-- Include minutes (int) and a short reason for each game.
-- Add a date for each day starting today.
-
-Return EXACT schema:
-{{
-  "start_date": "YYYY-MM-DD",
-  "num_days": {days},
-  "days": [
-    {{
-      "date": "YYYY-MM-DD",
-      "focus": "short title",
-      "description": "1 sentence",
-      "games": [
-        {{"id":"stroop","name":"Stroop Practice","minutes":2,"reason":"..."}}
-      ]
-    }}
-  ]
-}}
-"""
+    domain_averages = get_domain_averages(user["id"])
+    prompt = build_schedule_prompt(days, domain_averages)
 
     try:
-        response = ollama.generate(model="mistral", prompt=prompt, stream=False)
-        schedule_text = response.get("response", "").strip()
-        schedule_data = extract_json_object(schedule_text)
+        schedule_text = llm_generate(prompt, timeout=SCHEDULE_TIMEOUT)
+        schedule_data = decode_compact_schedule(schedule_text) or extract_json_object(schedule_text)
 
         if not schedule_data:
             schedule_data = generate_fallback_schedule(days, domain_averages)
@@ -985,7 +866,7 @@ Return EXACT schema:
         schedule_data = add_dates_to_schedule(schedule_data, days)
 
         # Save schedule to DB
-        save_schedule(user["id"], json.dumps(schedule_data), days, datetime.utcnow().isoformat())
+        save_schedule(user["id"], schedule_data, days, datetime.utcnow().isoformat())
 
         return jsonify({"ok": True, "schedule": schedule_data})
 
@@ -993,10 +874,70 @@ Return EXACT schema:
         print(f"Error generating schedule: {e}")
         schedule_data = generate_fallback_schedule(days, domain_averages)
         schedule_data = add_dates_to_schedule(schedule_data, days)
-        save_schedule(user["id"], json.dumps(schedule_data), days, datetime.utcnow().isoformat())
+        save_schedule(user["id"], schedule_data, days, datetime.utcnow().isoformat())
         return jsonify({"ok": True, "schedule": schedule_data})
 
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/generate-schedule/stream")
+@login_required
+def generate_schedule_stream_api():
+    """
+    Same schedule as /api/generate-schedule, sent as Server-Sent Events:
+    one "day" event per day as soon as the model finishes writing it, then
+    a "done" event with the saved schedule (padded from the fallback
+    schedule if the model stopped early).
+    """
+    user = current_user()
+    payload = request.get_json(force=True)
+    days = int(payload.get("days", 7))
+
+    domain_averages = get_domain_averages(user["id"])
+    prompt = build_schedule_prompt(days, domain_averages)
+
+    def model_days(chunks):
+        parser = DayStreamParser()
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+            if parser.done:
+                return
+        yield from parser.flush()
+
+    def events():
+        streamed = []
+        chunks = llm_stream(prompt, timeout=SCHEDULE_TIMEOUT)
+        try:
+            for day in model_days(chunks):
+                day = date_schedule_day(day, len(streamed))
+                streamed.append(day)
+                yield sse_event("day", {"index": len(streamed) - 1, "day": day})
+                if len(streamed) >= days:
+                    break
+        except Exception as e:
+            print(f"Error streaming schedule: {e}")
+        finally:
+            # Frees the LLM slot now if we stopped reading early.
+            chunks.close()
+
+        fallback = generate_fallback_schedule(days, domain_averages)
+        for i in range(len(streamed), days):
+            day = date_schedule_day(fallback["days"][i], i)
+            streamed.append(day)
+            yield sse_event("day", {"index": i, "day": day})
+
+        schedule_data = add_dates_to_schedule({"days": streamed}, days)
+        save_schedule(user["id"], schedule_data, days, datetime.utcnow().isoformat())
+        yield sse_event("done", {"ok": True, "schedule": schedule_data})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 def generate_fallback_schedule(days, domain_averages):
     """Generate a basic schedule when LLM fails"""
@@ -1067,45 +1008,27 @@ def schedule_chat_api():
     if not current_schedule or "days" not in current_schedule:
         current_schedule = add_dates_to_schedule({"days": []}, 7)
 
-    prompt = f"""
-You are an AI schedule coach. The user wants changes to their schedule.
-
-Current schedule JSON:
-{json.dumps(current_schedule, indent=2)}
-
-User message:
-"{message}"
-
-Instructions:
-- Understand the request before acting.
-- If user asks a question, answer it. If they ask for a change, update the schedule.
-- If they say "today", apply the change to the day whose date equals today's date (already in the JSON).
-- If they say "tomorrow", apply to the next date in the JSON.
-- If they say "less / shorter", reduce to 2 games that day.
-- If they say "more / harder", increase to 4 games that day.
-- If they want more of a domain:
-  - memory -> recall
-  - executive/attention -> stroop or trails
-  - visuospatial -> visual_puzzle
-  - language -> fluency
-- Keep ids valid: typing, visual_puzzle, stroop, recall, tapping, orientation, trails, fluency
-- Output ONLY valid JSON (no extra text).
-
-Return EXACT JSON:
-{{
-  "response": "1-4 sentences that clearly explains what you changed",
-  "updatedSchedule": null OR {{
-    "start_date": "...",
-    "num_days": ...,
-    "days": [...]
-  }}
-}}
-"""
+    # Common edits ("make today shorter", "more memory tomorrow") skip the model
+    fast = chat_fast_path(current_schedule, message)
+    if fast is not None:
+        response_text, updated = fast
+        if updated is not None:
+            days_count = len(updated["days"])
+            updated = add_dates_to_schedule(updated, days_count)
+            save_schedule(user["id"], updated, days_count, datetime.utcnow().isoformat())
+        return jsonify({"ok": True, "response": response_text, "updatedSchedule": updated})
+
+    cache_key = chat_cache_key(current_schedule, message)
+
+    prompt = build_chat_prompt(current_schedule, message)
 
     try:
-        response = ollama.generate(model="mistral", prompt=prompt, stream=False)
-        out_text = response.get("response", "").strip()
-        out = extract_json_object(out_text)
+        out = get_cached_reply(cache_key)
+        if out is None:
+            out_text = llm_generate(prompt, timeout=SCHEDULE_CHAT_TIMEOUT)
+            out = parse_chat_reply(out_text, current_schedule) or extract_json_object(out_text)
+            if out:
+                remember_reply(cache_key, out)
 
         if not out:
             return jsonify({
@@ -1122,7 +1045,7 @@ Return EXACT JSON:
             days_count = len(updated.get("days", [])) or current_schedule.get("num_days", 7)
             updated = add_dates_to_schedule(updated, int(days_count))
 
-            save_schedule(user["id"], json.dumps(updated), int(updated.get("num_days", days_count)), datetime.utcnow().isoformat())
+            save_schedule(user["id"], updated, int(updated.get("num_days", days_count)), datetime.utcnow().isoformat())
 
             return jsonify({"ok": True, "response": response_text, "updatedSchedule": updated})
 
@@ -1138,5 +1061,11 @@ Return EXACT JSON:
         })
 
 
+@app.get("/api/schedule-chat/cache-stats")
+@login_required
+def schedule_chat_cache_stats_api():
+    return jsonify({"ok": True, **chat_cache_stats()})
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5001, debug=True)
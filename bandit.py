@@ -0,0 +1,228 @@
+"""
+Epsilon-greedy difficulty bandit served from memory.
+
+Arm statistics for recently active users live in a bounded LRU, loaded
+from bandit_state in one query on a user's first selection. Selections
+never touch SQLite after that. Rewards update the in-memory arms at once
+and are queued for write-behind: a background thread replays them into
+bandit_state with db.update_bandit_states every FLUSH_INTERVAL seconds,
+or as soon as FLUSH_BATCH are pending.
+
+Durability: pending rewards are also flushed at interpreter exit (atexit:
+normal exit, Ctrl+C, gunicorn's graceful worker shutdown). A process killed
+without running exit handlers (SIGKILL, a bare SIGTERM to python app.py)
+loses at most the last FLUSH_INTERVAL seconds of rewards. With several worker
+processes each keeps its own copy; cached users are re-read after
+STATE_TTL seconds so other workers' rewards show up, and cached practice
+difficulty choices expire after the same STATE_TTL.
+"""
+import atexit
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from db import get_bandit_states, update_bandit_states
+
+ACTIONS = ["easy", "medium", "hard"]
+
+CACHE_USERS = int(os.environ.get("MEMORY_LANE_BANDIT_CACHE_USERS", "2048"))
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH = 200
+STATE_TTL = 60.0
+
+# user_id -> (loaded_at, {(game, context): {action: {"count", "value"}}})
+_STATE = OrderedDict()
+# user_id -> {game: (chosen_at, action, context)}: the difficulty served to
+# practice games, kept until the user's next score (see forget_choices) or
+# for STATE_TTL seconds, since other workers' scores can't forget it here
+_CHOICES = OrderedDict()
+_STATE_LOCK = threading.Lock()
+_PENDING = []
+_FLUSH_LOCK = threading.Lock()
+_WAKE = threading.Event()
+_FLUSHER = {"thread": None}
+_FLUSHER_LOCK = threading.Lock()
+
+
+def _apply_reward(arms, game, context, action, reward):
+    # Caller holds _STATE_LOCK (or owns arms). Same running mean as BANDIT_UPSERT_SQL.
+    arm = arms.setdefault((game, context), {}).setdefault(action, {"count": 0, "value": 0.0})
+    arm["count"] += 1
+    arm["value"] += (reward - arm["value"]) / arm["count"]
+
+
+def _load_user(user_id):
+    # This user's rewards that haven't reached bandit_state yet are replayed
+    # on top of it rather than flushed here, so a failing write never fails
+    # the request; the flusher thread (or atexit) retries it. Holding
+    # _FLUSH_LOCK keeps a batch that is mid-flush from being in neither place.
+    with _FLUSH_LOCK:
+        rows = get_bandit_states(user_id)
+        with _STATE_LOCK:
+            pending = [p for p in _PENDING if p[0] == user_id]
+    arms = {}
+    for row in rows:
+        arms.setdefault((row["game"], row["context"]), {})[row["action"]] = {
+            "count": row["count"], "value": row["value"]
+        }
+    for _, game, context, action, reward, _ in pending:
+        _apply_reward(arms, game, context, action, reward)
+    return arms
+
+
+def _user_arms(user_id):
+    # Caller holds _STATE_LOCK.
+    entry = _STATE.get(user_id)
+    if entry is None or time.monotonic() - entry[0] > STATE_TTL:
+        return None
+    _STATE.move_to_end(user_id)
+    return entry[1]
+
+
+def _arms_for(user_id):
+    with _STATE_LOCK:
+        arms = _user_arms(user_id)
+    if arms is None:
+        loaded = _load_user(user_id)
+        with _STATE_LOCK:
+            # Another thread may have loaded (and updated) this user meanwhile.
+            arms = _user_arms(user_id)
+            if arms is not None:
+                return arms
+            arms = loaded
+            _STATE[user_id] = (time.monotonic(), arms)
+            _STATE.move_to_end(user_id)
+            while len(_STATE) > CACHE_USERS:
+                _STATE.popitem(last=False)
+    return arms
+
+
+def select_action(user_id, game, context):
+    """(action, epsilon, stats) for the (game, context) arm set, as select_bandit_action returned."""
+    arms = _arms_for(user_id)
+    with _STATE_LOCK:
+        stats = {a: dict(s) for a, s in arms.get((game, context), {}).items()}
+
+    total_n = sum(s["count"] for s in stats.values()) if stats else 0
+    epsilon = max(0.1, 1 / (total_n + 1) ** 0.5)
+    if random.random() < epsilon or not stats:
+        return random.choice(ACTIONS), epsilon, stats
+
+    best = max(ACTIONS, key=lambda a: stats.get(a, {"value": 0}).get("value", 0))
+    return best, epsilon, stats
+
+
+def record_reward(user_id, game, context, action, reward, updated_at):
+    """Apply a reward in memory now and queue it for bandit_state."""
+    reward = float(reward)
+    arms = _arms_for(user_id)
+    with _STATE_LOCK:
+        _apply_reward(arms, game, context, action, reward)
+        _PENDING.append((user_id, game, context, action, reward, updated_at))
+        pending = len(_PENDING)
+    _ensure_flusher()
+    if pending >= FLUSH_BATCH:
+        _WAKE.set()
+
+
+def invalidate(user_id):
+    """Forget a user's cached arms, e.g. after bandit_state was written directly."""
+    with _STATE_LOCK:
+        _STATE.pop(user_id, None)
+
+
+def get_choice(user_id, game):
+    """The (action, context) last chosen for this user and game, or None."""
+    with _STATE_LOCK:
+        games = _CHOICES.get(user_id)
+        if games is None or game not in games:
+            return None
+        chosen_at, action, context = games[game]
+        if time.monotonic() - chosen_at > STATE_TTL:
+            del games[game]
+            return None
+        _CHOICES.move_to_end(user_id)
+        return action, context
+
+
+def remember_choice(user_id, game, action, context):
+    with _STATE_LOCK:
+        _CHOICES.setdefault(user_id, {})[game] = (time.monotonic(), action, context)
+        _CHOICES.move_to_end(user_id)
+        while len(_CHOICES) > CACHE_USERS:
+            _CHOICES.popitem(last=False)
+    return action, context
+
+
+def forget_choices(user_id):
+    """Drop the user's cached difficulty choices; call whenever a score is written."""
+    with _STATE_LOCK:
+        _CHOICES.pop(user_id, None)
+
+
+def flush():
+    """Write every pending reward to bandit_state, in order. Returns how many."""
+    with _FLUSH_LOCK:
+        with _STATE_LOCK:
+            batch = _PENDING[:]
+            del _PENDING[:]
+        if not batch:
+            return 0
+        try:
+            update_bandit_states(batch)
+        except Exception:
+            # Put them back in front so nothing is lost or reordered.
+            with _STATE_LOCK:
+                _PENDING[:0] = batch
+            raise
+        return len(batch)
+
+
+def _flush_loop():
+    while True:
+        _WAKE.wait(FLUSH_INTERVAL)
+        _WAKE.clear()
+        try:
+            flush()
+        except Exception as exc:
+            print(f"Bandit flush error: {exc}")
+
+
+def _ensure_flusher():
+    with _FLUSHER_LOCK:
+        thread = _FLUSHER["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_flush_loop, name="bandit-flush", daemon=True)
+            _FLUSHER["thread"] = thread
+            thread.start()
+
+
+def _flush_at_exit():
+    try:
+        flushed = flush()
+    except Exception as exc:
+        print(f"Bandit flush at exit failed: {exc}")
+        return
+    if flushed:
+        print(f"Flushed {flushed} pending bandit updates")
+
+
+def _reset_after_fork():
+    # The parent keeps (and flushes) its own pending rewards; the child
+    # starts empty with fresh locks and its own flusher thread.
+    global _STATE_LOCK, _FLUSH_LOCK, _FLUSHER_LOCK, _WAKE
+    _STATE_LOCK = threading.Lock()
+    _FLUSH_LOCK = threading.Lock()
+    _FLUSHER_LOCK = threading.Lock()
+    _WAKE = threading.Event()
+    _STATE.clear()
+    _CHOICES.clear()
+    del _PENDING[:]
+    _FLUSHER["thread"] = None
+
+
+atexit.register(_flush_at_exit)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
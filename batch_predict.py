@@ -0,0 +1,60 @@
+"""
+Offline re-scoring of every user with the risk classifier.
+
+Streams users in id order, loads each chunk's latest per-game scores (within
+the newest FEATURE_SCORE_WINDOW scores, as on the dashboard) in one query,
+encodes the whole chunk into one feature matrix and calls predict_proba once
+per chunk. Results go to the prediction table, which the dashboard reads
+while they are still current for the user's latest score.
+
+    python batch_predict.py --chunk-size 1000
+"""
+import argparse
+import time
+from datetime import datetime
+
+from db import init_db, iter_users, get_latest_scores_for_users, save_predictions
+from ml import (
+    FEATURE_GAMES, FEATURE_SCORE_WINDOW, load_ml_model, model_version, build_feature_dict, predict_rows
+)
+
+
+def score_all_users(chunk_size=1000):
+    model = load_ml_model()
+    if model is None:
+        raise SystemExit("Model unavailable: install joblib/pandas and check ml-models/best_model.joblib")
+    version = model_version()
+
+    total = 0
+    for users in iter_users(chunk_size):
+        user_ids = [u["id"] for u in users]
+        latest, max_ids = get_latest_scores_for_users(user_ids, FEATURE_GAMES, FEATURE_SCORE_WINDOW)
+
+        rows = [
+            build_feature_dict(dict(u), [dict(s) for s in latest.get(u["id"], [])])
+            for u in users
+        ]
+        results = predict_rows(model, rows)
+
+        now = datetime.utcnow().isoformat()
+        save_predictions(
+            (uid, max_ids.get(uid, 0), version, pred, proba, now)
+            for uid, (pred, proba) in zip(user_ids, results)
+        )
+        total += len(users)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score all users into the prediction table.")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    start = time.perf_counter()
+    total = score_all_users(args.chunk_size)
+    print(f"Scored {total} users in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Multi-process write load test for POST /api/score's storage path
+(add_score followed by update_bandit_state) in the default rollback-journal
+mode and in the opt-in WAL mode.
+
+    python benchmarks/bench_concurrent_writes.py --workers 8 16 32 --ops 200
+"""
+import argparse
+import multiprocessing as mp
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+
+USERS = 16
+
+
+def worker(args):
+    db_path, wal, worker_id, ops = args
+    db.DB_PATH = Path(db_path)
+    db.WAL_ENABLED = wal
+    ok = failed = 0
+    for i in range(ops):
+        user_id = (worker_id + i) % USERS + 1
+        now = datetime.utcnow().isoformat()
+        try:
+            db.add_score(user_id, "stroop", "Executive Function", i % 4, now, "{}")
+            db.update_bandit_state(user_id, "stroop", "mid", "medium", 1.0, now)
+            ok += 1
+        except sqlite3.OperationalError:
+            failed += 1
+    return ok, failed
+
+
+def run(workers, ops, wal):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "load.db"
+        db.init_db(wal=wal)
+        now = datetime.utcnow().isoformat()
+        for u in range(USERS):
+            db.create_user(f"user{u}", f"user{u}@example.com", "x", now)
+
+        jobs = [(str(db.DB_PATH), wal, w, ops) for w in range(workers)]
+        start = time.perf_counter()
+        with mp.get_context("fork").Pool(workers) as pool:
+            results = pool.map(worker, jobs)
+        elapsed = time.perf_counter() - start
+
+        ok = sum(r[0] for r in results)
+        failed = sum(r[1] for r in results)
+        conn = db.get_conn()
+        rows = conn.execute("SELECT COUNT(*) FROM score").fetchone()[0]
+        conn.close()
+    return ok, failed, rows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ops", type=int, default=200, help="score submissions per worker")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'workers':>7} {'ok':>7} {'failed':>7} {'rows':>7} {'secs':>7} {'writes/s':>9}")
+    for wal in (False, True):
+        for workers in args.workers:
+            ok, failed, rows, elapsed = run(workers, args.ops, wal)
+            mode = "wal" if wal else "delete"
+            print(f"{mode:<8} {workers:>7} {ok:>7} {failed:>7} {rows:>7} {elapsed:>7.2f} {ok / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare connect-per-call against the per-request shared connection for the
+sequence of db.py calls a /dashboard page view makes.
+
+    python benchmarks/bench_db_connections.py --views 500
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+
+GAMES = ["stroop", "recall", "orientation", "tapping", "trails_switch", "visual_puzzle"]
+
+
+def seed(user_count=20, scores_per_user=200):
+    now = datetime.utcnow().isoformat()
+    for u in range(user_count):
+        db.create_user(f"user{u}", f"user{u}@example.com", "x", now)
+    conn = db.get_conn()
+    conn.executemany(
+        "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (?,?,?,?,?,?)",
+        [
+            (u + 1, GAMES[i % len(GAMES)], "Memory", float(i % 5), now, "{}")
+            for u in range(user_count)
+            for i in range(scores_per_user)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def dashboard_calls(user_id):
+    # Mirrors the db.py calls made by dashboard(): user lookup, score list,
+    # then per-game recent scores and bandit state.
+    db.get_user_by_id(user_id)
+    db.get_scores(user_id, limit=30)
+    for game in GAMES:
+        db.get_scores_by_game(user_id, game, limit=5)
+        db.get_bandit_state(user_id, game, "mid")
+
+
+def run(views, per_request):
+    app = Flask(__name__)
+    db.init_app(app)
+    timings = []
+    for i in range(views):
+        user_id = (i % 20) + 1
+        start = time.perf_counter()
+        if per_request:
+            with app.app_context():
+                dashboard_calls(user_id)
+        else:
+            dashboard_calls(user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<22} p50={p50:7.3f} ms  p95={p95:7.3f} ms  mean={statistics.mean(timings):7.3f} ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--views", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+        seed()
+
+        before = report("connect-per-call", run(args.views, per_request=False))
+        after = report("per-request shared", run(args.views, per_request=True))
+        print(f"p50 speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
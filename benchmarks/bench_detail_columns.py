@@ -0,0 +1,169 @@
+"""
+Feature-row loading through score's generated SATURN_* columns against the
+old path (SELECT details, json.loads per row), on a temporary database.
+Checks that both paths build identical feature dicts for every user, then
+times a full batch_predict-style pass and a cohort percentile query on an
+indexed timing column.
+
+    python benchmarks/bench_detail_columns.py --users 5000 --scores 40
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+from ml import FEATURE_GAMES, FEATURE_SCORE_WINDOW, build_feature_dict  # noqa: E402
+
+ORIENTATION_ITEMS = ("MONTH", "YEAR", "DAY_OF_WEEK", "DATE")
+
+
+def details_for(game, rng):
+    if game == "stroop":
+        errors = rng.randint(0, 4)
+        return {
+            "SATURN_SCORE_STROOP_POINTS": max(0, 3 - errors),
+            "SATURN_TIME_STROOP_ERRORS": rng.choice([errors, str(errors)]),
+            "SATURN_TIME_STROOP_MEAN_ms": rng.uniform(400, 3000),
+            "correct_first_try": 12 - errors,
+            "total_trials": 12,
+        }
+    if game == "recall":
+        return {
+            "SATURN_SCORE_RECALL_FIVEWORDS": rng.randint(0, 5),
+            "SATURN_TIME_RECALL_FIVEWORDS_ms": rng.randint(5000, 90000),
+        }
+    if game == "orientation":
+        out = {"custom_total": rng.randint(0, 2)}
+        for item in ORIENTATION_ITEMS:
+            out[f"SATURN_SCORE_ORIENTATION_{item}"] = rng.choice([0, 1, True])
+            out[f"SATURN_TIME_ORIENTATION_{item}_ms"] = rng.randint(800, 9000)
+        return out
+    taps = rng.randint(10, 60)
+    return {"SATURN_MOTOR_SPEED_ms_per_button": 10000 / taps, "taps": taps, "duration_s": 10}
+
+
+def populate(users, per_user, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO user (name, email, password_hash, created_at, age, gender) VALUES (?,?,?,?,?,?)",
+            [(f"u{i}", f"u{i}@example.com", "x", start.isoformat(), rng.randint(60, 90), rng.choice(["male", "female"]))
+             for i in range(users)]
+        )
+        rows = []
+        for user_id in range(1, users + 1):
+            for i in range(per_user):
+                game = rng.choice(FEATURE_GAMES + ["typing"])
+                details = details_for(game, rng)
+                roll = rng.random()
+                if roll < 0.01:
+                    text = "{not json"
+                elif roll < 0.03:
+                    text = None
+                else:
+                    text = json.dumps(details)
+                rows.append((user_id, game, "Memory", rng.uniform(0, 100),
+                             (start + timedelta(minutes=i)).isoformat(), text))
+        conn.executemany(
+            "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (?,?,?,?,?,?)",
+            rows
+        )
+        conn.commit()
+
+
+def legacy_latest(user_ids):
+    """The pre-generated-column query, with details decoded in Python."""
+    marks = ",".join(["?"] * len(user_ids))
+    game_marks = ",".join(["?"] * len(FEATURE_GAMES))
+    with db.connection() as conn:
+        rows = conn.execute(
+            f"""SELECT user_id, id, game, details
+                FROM (
+                    SELECT user_id, id, game, details, created_at,
+                           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS rn
+                    FROM score
+                    WHERE user_id IN ({marks})
+                )
+                WHERE rn <= ? AND game IN ({game_marks})
+                ORDER BY user_id, created_at DESC, id DESC""",
+            (*user_ids, FEATURE_SCORE_WINDOW, *FEATURE_GAMES)
+        ).fetchall()
+    latest = {}
+    for row in rows:
+        try:
+            details = json.loads(row["details"]) if row["details"] else {}
+        except Exception:
+            details = {}
+        latest.setdefault(row["user_id"], []).append({"game": row["game"], **details})
+    return latest
+
+
+def typed_latest(user_ids):
+    """What batch_predict does now."""
+    latest, _ = db.get_latest_scores_for_users(user_ids, FEATURE_GAMES, FEATURE_SCORE_WINDOW)
+    return {uid: [dict(r) for r in rows] for uid, rows in latest.items()}
+
+
+def feature_pass(users, load):
+    out = []
+    for chunk in users:
+        latest = load([u["id"] for u in chunk])
+        out.extend(build_feature_dict(dict(u), latest.get(u["id"], [])) for u in chunk)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--scores", type=int, default=40, help="scores per user")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+        populate(args.users, args.scores)
+        users = list(db.iter_users(args.chunk_size))
+
+        start = time.perf_counter()
+        legacy = feature_pass(users, legacy_latest)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        typed = feature_pass(users, typed_latest)
+        typed_s = time.perf_counter() - start
+
+        assert legacy == typed, "feature dicts differ between details JSON and generated columns"
+        print(f"parity ok on {len(typed)} users ({args.users * args.scores} scores)")
+        print(f"details + json.loads  {legacy_s:.3f}s")
+        print(f"generated columns     {typed_s:.3f}s ({legacy_s / typed_s:.1f}x)")
+
+        percentile_sql = """
+            SELECT SATURN_TIME_STROOP_MEAN_ms FROM score
+            WHERE game = 'stroop' AND SATURN_TIME_STROOP_MEAN_ms IS NOT NULL
+            ORDER BY SATURN_TIME_STROOP_MEAN_ms
+            LIMIT 1 OFFSET (
+              SELECT COUNT(*) * 9 / 10 FROM score
+              WHERE game = 'stroop' AND SATURN_TIME_STROOP_MEAN_ms IS NOT NULL
+            )"""
+        with db.connection() as conn:
+            plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + percentile_sql)]
+            start = time.perf_counter()
+            p90 = conn.execute(percentile_sql).fetchone()[0]
+            indexed_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            conn.execute(percentile_sql.replace("FROM score", "FROM score NOT INDEXED")).fetchone()
+            scan_ms = (time.perf_counter() - start) * 1000
+        assert any("idx_score_stroop_mean_ms" in step for step in plan), plan
+        print(f"stroop mean p90 = {p90:.0f} ms: indexed {indexed_ms:.1f} ms, full scan {scan_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Throughput and peak memory of export_scores.py on a generated score table
+(10M rows by default, spread over 8 games and 24 months), against pulling
+the same rows through SQLite and json.loads-ing details one row at a time.
+Reads the dataset back and checks row counts and per-game sums.
+
+    python benchmarks/bench_export_parquet.py --rows 10000000
+"""
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+from export_scores import CHUNK_SIZE, export_scores  # noqa: E402
+
+GAMES = ["stroop", "recall", "orientation", "tapping", "typing", "visual_puzzle", "trails_switch", "fluency"]
+SPAN_SECONDS = 730 * 86400
+
+# One INSERT ... SELECT so generating 10M rows stays inside SQLite.
+POPULATE_SQL = f"""
+WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < :rows)
+INSERT INTO score (user_id, game, domain, value, created_at, details)
+SELECT 1 + i % :users,
+       CASE i % 8 {" ".join(f"WHEN {k} THEN '{g}'" for k, g in enumerate(GAMES))} END,
+       'Memory',
+       abs(random() % 10000) / 100.0,
+       strftime('%Y-%m-%dT%H:%M:%S', '2024-01-01', '+' || (i * {SPAN_SECONDS} / :rows) || ' seconds'),
+       CASE i % 8
+         WHEN 0 THEN json_object(
+           'SATURN_SCORE_STROOP_POINTS', abs(random() % 4),
+           'SATURN_TIME_STROOP_ERRORS', CASE WHEN i % 3 = 0 THEN '1' ELSE abs(random() % 5) END,
+           'SATURN_TIME_STROOP_MEAN_ms', 400 + abs(random() % 2600000) / 1000.0,
+           'correct_first_try', 10, 'total_trials', 12)
+         WHEN 1 THEN json_object(
+           'SATURN_SCORE_RECALL_FIVEWORDS', abs(random() % 6),
+           'SATURN_TIME_RECALL_FIVEWORDS_ms', 5000 + abs(random() % 85000))
+         WHEN 2 THEN json_object(
+           'SATURN_SCORE_ORIENTATION_MONTH', abs(random() % 2),
+           'SATURN_SCORE_ORIENTATION_YEAR', abs(random() % 2),
+           'SATURN_SCORE_ORIENTATION_DAY_OF_WEEK', abs(random() % 2),
+           'SATURN_SCORE_ORIENTATION_DATE', abs(random() % 2),
+           'SATURN_TIME_ORIENTATION_MONTH_ms', 800 + abs(random() % 8000),
+           'custom_total', 1)
+         WHEN 3 THEN json_object(
+           'SATURN_MOTOR_SPEED_ms_per_button', 100 + abs(random() % 500000) / 1000.0,
+           'taps', 40, 'duration_s', 10)
+         WHEN 6 THEN json_object('MoCA_1_SCORE_trailsB', 1, 'elapsed_ms', 30000)
+       END
+FROM n
+"""
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def populate(rows, users):
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO user (name, email, password_hash, created_at) VALUES (?,?,?,?)",
+            [(f"u{i}", f"u{i}@example.com", "x", "2024-01-01T00:00:00") for i in range(users)]
+        )
+        conn.execute(POPULATE_SQL, {"rows": rows, "users": users})
+        conn.commit()
+
+
+def legacy_pull(limit):
+    """Rows/s of the old path: SELECT details, json.loads per row, pick the SATURN keys."""
+    start = time.perf_counter()
+    count = 0
+    with db.connection() as conn:
+        for row in conn.execute("SELECT id, game, value, created_at, details FROM score ORDER BY id LIMIT ?", (limit,)):
+            try:
+                details = json.loads(row["details"]) if row["details"] else {}
+            except Exception:
+                details = {}
+            {key: details.get(key) for key in db.DETAIL_COLUMNS}
+            count += 1
+    return count / (time.perf_counter() - start)
+
+
+def verify(out_dir, rows):
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    table = ds.dataset(out_dir, partitioning="hive").to_table(
+        columns=["game", "SATURN_TIME_STROOP_MEAN_ms", "SATURN_TIME_STROOP_ERRORS", "value"]
+    )
+    assert table.num_rows == rows, (table.num_rows, rows)
+    with db.connection() as conn:
+        expected = conn.execute(
+            """SELECT SUM(SATURN_TIME_STROOP_MEAN_ms), SUM(CAST(SATURN_TIME_STROOP_ERRORS AS REAL)), SUM(value)
+               FROM score WHERE game = 'stroop'"""
+        ).fetchone()
+    stroop = table.filter(pc.equal(table["game"], "stroop"))
+    actual = [pc.sum(stroop[col]).as_py() for col in ("SATURN_TIME_STROOP_MEAN_ms", "SATURN_TIME_STROOP_ERRORS", "value")]
+    for want, got in zip(expected, actual):
+        assert abs(want - got) <= 1e-9 * abs(want), (expected, actual)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--legacy-rows", type=int, default=1_000_000,
+                        help="rows to time on the json.loads path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+        start = time.perf_counter()
+        populate(args.rows, args.users)
+        print(f"generated {args.rows} scores in {time.perf_counter() - start:.1f}s")
+
+        legacy_rate = legacy_pull(min(args.legacy_rows, args.rows))
+        rss_before = peak_rss_mb()
+
+        out_dir = Path(tmp) / "export"
+        start = time.perf_counter()
+        exported, files = export_scores(out_dir, args.chunk_size)
+        export_s = time.perf_counter() - start
+        rss_after = peak_rss_mb()
+        size_mb = sum(p.stat().st_size for p in out_dir.rglob("*.parquet")) / 1024 / 1024
+        db_mb = db.DB_PATH.stat().st_size / 1024 / 1024
+
+        verify(out_dir, args.rows)
+        print(f"export        {exported / export_s:10.0f} rows/s  {export_s:.1f}s, {files} files, "
+              f"{size_mb:.0f} MB parquet vs {db_mb:.0f} MB sqlite")
+        print(f"json.loads    {legacy_rate:10.0f} rows/s  (decode only, nothing written)")
+        print(f"peak RSS      {rss_before:.0f} MB before export, {rss_after:.0f} MB after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Parity check and per-row latency for the compiled FeatureEncoder against the
+pandas + sklearn pipeline in best_model.joblib.
+
+Parity is checked on every labelled SATURN_MoCA.csv row (prepared the same
+way as cognitive_data_classification.ipynb) and on app-style feature rows
+built by ml.build_feature_dict. Exits non-zero on any mismatch.
+
+    python benchmarks/bench_feature_encoder.py
+"""
+import random
+import re
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from feature_encoder import FeatureEncoder  # noqa: E402
+from ml import (  # noqa: E402
+    FEATURE_COLS, build_feature_dict, build_feature_row, load_ml_model, predict_labels
+)
+
+DATA_PATH = ROOT / "data" / "MoCA" / "SATURN_MoCA.csv"
+NA_VALUES = ["", "NA", "Na", "na", "N/A", "NULL", "null", "nan"]
+NUMERIC_REGEX = re.compile(
+    "(" + "|".join([
+        r"_SCORE$", r"_TOTAL_SCORE$", r"_POSSIBLE_SCORE$", r"_POINTS$",
+        r"_TIME_SINCE_INDEX_days$", r"_ms$", r"_min$", r"_days$", r"_COUNT",
+        r"_SPEED", r"_TOTAL$", r"_WORDS_GENERATED", r"_MIS",
+    ]) + ")"
+)
+
+
+def edu_bin_to_num(val):
+    if pd.isna(val):
+        return np.nan
+    s = str(val).strip().lower()
+    if s == "under_12":
+        return 11.0
+    if s == "20_or_more":
+        return 20.0
+    if "_" in s:
+        a, b = s.split("_", 1)
+        try:
+            return (float(a) + float(b)) / 2.0
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+def load_notebook_features():
+    """Feature frame for labelled rows, prepared as in the training notebook."""
+    df = pd.read_csv(DATA_PATH, encoding="cp1252", na_values=NA_VALUES, dtype=str, low_memory=False)
+    for col in df.columns:
+        df[col] = df[col].astype(str).str.strip().replace({"": np.nan})
+        if NUMERIC_REGEX.search(col):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["YR_EDU_num"] = df["YR_EDU"].apply(edu_bin_to_num)
+
+    y = df["GENERAL_Dx"].map({"NORMAL": 0, "MCI": 1, "DEMENTIA": 1})
+    X = df.loc[y.notna(), [c for c in FEATURE_COLS if c in df.columns]].copy()
+    for col in FEATURE_COLS:
+        X[f"{col}_missing"] = X[col].isna().astype(int)
+    return X
+
+
+def app_rows(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        user = {
+            "age": rng.choice([None, 68, "75_79"]),
+            "gender": rng.choice([None, "male", "female", "other"]),
+            "ethnicity": rng.choice([None, "W_0", "AA_1", "unknown"]),
+        }
+        scores = []
+        if rng.random() < 0.8:
+            scores.append({
+                "game": "stroop",
+                "SATURN_SCORE_STROOP_POINTS": rng.choice([None, 0, 2, 3]),
+                "SATURN_TIME_STROOP_ERRORS": rng.choice([0, 1, "1"]),
+                "SATURN_TIME_STROOP_MEAN_ms": rng.uniform(400, 3000),
+            })
+        if rng.random() < 0.8:
+            scores.append({"game": "orientation", **{
+                k: rng.choice([0, 1]) for k in (
+                    "SATURN_SCORE_ORIENTATION_MONTH", "SATURN_SCORE_ORIENTATION_YEAR",
+                    "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK", "SATURN_SCORE_ORIENTATION_DATE",
+                )
+            }})
+        if rng.random() < 0.8:
+            scores.append({
+                "game": "recall",
+                "SATURN_SCORE_RECALL_FIVEWORDS": rng.randint(0, 5),
+                "SATURN_TIME_RECALL_FIVEWORDS_ms": rng.uniform(5000, 90000),
+            })
+        if rng.random() < 0.8:
+            scores.append({
+                "game": "tapping",
+                "SATURN_MOTOR_SPEED_ms_per_button": rng.uniform(100, 600),
+            })
+        rows.append((user, scores))
+    return rows
+
+
+def check_parity(model, encoder):
+    X = load_notebook_features()
+    expected = model.named_steps["preprocess"].transform(X)
+    actual = encoder.transform(X.to_dict("records"))
+    assert np.array_equal(expected, actual), "encoded vectors differ on SATURN_MoCA.csv rows"
+
+    expected_proba = model.predict_proba(X)[:, 1]
+    actual_proba = np.array([p for _, p in encoder.predict(X.to_dict("records"))])
+    assert np.array_equal(expected_proba, actual_proba), "probabilities differ on SATURN_MoCA.csv rows"
+    assert np.array_equal(model.predict(X), [p for p, _ in encoder.predict(X.to_dict("records"))])
+    print(f"parity ok on {len(X)} SATURN_MoCA.csv rows")
+
+    for user, scores in app_rows(500):
+        frame = build_feature_row(user, scores)
+        expected_row = predict_labels(model, frame)[0]
+        actual_row = encoder.predict([build_feature_dict(user, scores)])[0]
+        assert expected_row == actual_row, (expected_row, actual_row)
+        assert expected_row[0] == int(model.predict(frame)[0])
+    print("parity ok on 500 app-style feature rows")
+
+
+def time_per_row(fn, rows):
+    timings = []
+    for user, scores in rows:
+        start = time.perf_counter()
+        fn(user, scores)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    warnings.filterwarnings("ignore")
+    model = load_ml_model()
+    if model is None:
+        raise SystemExit("model unavailable")
+    encoder = FeatureEncoder(model)
+    check_parity(model, encoder)
+
+    rows = app_rows(300, seed=1)
+    pandas_ms = time_per_row(lambda u, s: predict_labels(model, build_feature_row(u, s)), rows)
+    encoder_ms = time_per_row(lambda u, s: encoder.predict([build_feature_dict(u, s)]), rows)
+    print(f"pandas pipeline   p50={pandas_ms:.3f} ms/row")
+    print(f"compiled encoder  p50={encoder_ms:.3f} ms/row ({pandas_ms / encoder_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
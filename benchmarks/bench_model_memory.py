@@ -0,0 +1,131 @@
+"""
+Per-worker memory and load time of the model artifact, loaded the way
+model_registry.load_artifact does it (uncompressed, mmap_mode="r"), against
+a compressed copy of the same model that joblib has to inflate into private
+memory in every process.
+
+Forks --workers processes that each load the artifact, predict once and
+stay alive together, so /proc/self/smaps_rollup shows what they share.
+Reports, per worker, the load time and how much RSS, private memory and
+PSS (RSS with shared pages split between the processes mapping them) that
+added; the "(no model)" row is what a worker adds without loading anything.
+Runs for ml-models/best_model.joblib and for a RandomForest trained by
+train_model.fit_model, whose tree arrays are the bulk of its size. Linux
+only.
+
+    python benchmarks/bench_model_memory.py --workers 4
+"""
+import argparse
+import gc
+import multiprocessing
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import model_registry  # noqa: E402
+import train_model  # noqa: E402
+
+
+def smaps_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+        "shared": fields["Shared_Clean"] + fields["Shared_Dirty"],
+    }
+
+
+def touch(model):
+    """Predict once so lazily read pages are actually in the worker's RSS."""
+    import numpy as np
+    import pandas as pd
+
+    pre = model.named_steps["preprocess"]
+    row = {}
+    for _, _, cols in pre.transformers_:
+        if isinstance(cols, str):
+            continue
+        for col in cols:
+            row[col] = np.nan
+    model.predict_proba(pd.DataFrame([row], columns=list(pre.feature_names_in_)))
+
+
+def worker(path, mmap_mode, barrier, results):
+    before = smaps_kb()
+    start = time.perf_counter()
+    model = None if path is None else joblib.load(path, mmap_mode=mmap_mode)
+    load_s = time.perf_counter() - start
+    if model is not None:
+        touch(model)
+    barrier.wait()  # every worker holds its model now
+    after = smaps_kb()
+    results.put({
+        "load_s": load_s,
+        "rss": after["rss"] - before["rss"],
+        "private": after["private"] - before["private"],
+        "pss": after["pss"] - before["pss"],
+        "shared": after["shared"] - before["shared"],
+    })
+    barrier.wait()  # keep the mappings until everyone has measured
+
+
+def measure(path, mmap_mode, workers):
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(path, mmap_mode, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {key: sum(r[key] for r in rows) / len(rows) for key in rows[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--compress", type=int, default=3, help="joblib compression level of the copy")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        models = {"artifact": joblib.load(model_registry.DEFAULT_ARTIFACT)}
+        X, y = train_model.load_training_data()
+        models["random_forest"] = train_model.fit_model("random_forest", X, y)
+        for model in models.values():
+            touch(model)  # imports and first-call setup happen once, before the fork
+        gc.freeze()  # keep the workers' collections from dirtying the parent's pages
+
+        print(f"{args.workers} workers; per-worker averages, MB added by loading")
+        print(f"{'model':<14} {'format':<12} {'file MB':>8} {'load s':>7} {'RSS':>7} {'private':>8} {'shared':>7} {'PSS':>7}")
+        r = measure(None, None, args.workers)
+        print(f"{'(no model)':<14} {'':<12} {'':>8} {'':>7} {r['rss'] / 1024:>7.1f} "
+              f"{r['private'] / 1024:>8.1f} {r['shared'] / 1024:>7.1f} {r['pss'] / 1024:>7.1f}")
+        for name, model in models.items():
+            uncompressed = tmp / f"{name}.joblib"
+            compressed = tmp / f"{name}.z.joblib"
+            train_model.save_model(model, uncompressed)
+            joblib.dump(model, compressed, compress=args.compress)
+            for label, path, mmap_mode in (("compressed", compressed, None), ("mmap", uncompressed, "r")):
+                r = measure(path, mmap_mode, args.workers)
+                print(f"{name:<14} {label:<12} {path.stat().st_size / 1e6:>8.1f} {r['load_s']:>7.3f} "
+                      f"{r['rss'] / 1024:>7.1f} {r['private'] / 1024:>8.1f} {r['shared'] / 1024:>7.1f} "
+                      f"{r['pss'] / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
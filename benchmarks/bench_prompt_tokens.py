@@ -0,0 +1,160 @@
+"""
+Prompt and reply sizes for the schedule LLM calls, JSON vs the compact
+one-line-per-day encoding, over 7/14/30-day schedules.
+
+Token counts are approximate: words count as one token and every digit
+and punctuation mark as one (Mistral's tokenizer splits digits). They are
+only meant for comparing the two encodings with each other.
+
+    python benchmarks/bench_prompt_tokens.py
+"""
+import json
+import random
+import re
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scheduling import (  # noqa: E402
+    GAME_NAMES, build_chat_prompt, build_schedule_prompt, decode_compact_schedule,
+    encode_compact_schedule
+)
+
+TOKEN_RE = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+DOMAIN_AVERAGES = {"Memory": 41.5, "Attention": 63.0, "Executive Function": 55.2}
+MESSAGE = "Can you move the fluency game from tomorrow to the weekend and explain why?"
+
+JSON_GENERATE_PROMPT = """
+You are a cognitive training coach. Create a {days}-day schedule starting today.
+
+User signals (not a diagnosis):
+{domains_info}
+
+Available game ids (use ONLY these):
+- typing
+- visual_puzzle
+- stroop
+- recall
+- tapping
+- orientation
+- trails
+- fluency
+
+Rules:
+- Output ONLY valid JSON. No extra text.
+- Exactly {days} days.
+- Each day: 2 to 4 games.
+- Include minutes (int) and a short reason for each game.
+- Add a date for each day starting today.
+
+Return EXACT schema:
+{{
+  "start_date": "YYYY-MM-DD",
+  "num_days": {days},
+  "days": [
+    {{
+      "date": "YYYY-MM-DD",
+      "focus": "short title",
+      "description": "1 sentence",
+      "games": [
+        {{"id":"stroop","name":"Stroop Practice","minutes":2,"reason":"..."}}
+      ]
+    }}
+  ]
+}}
+"""
+
+JSON_CHAT_PROMPT = """
+You are an AI schedule coach. The user wants changes to their schedule.
+
+Current schedule JSON:
+{schedule}
+
+User message:
+"{message}"
+
+Instructions:
+- Understand the request before acting.
+- If user asks a question, answer it. If they ask for a change, update the schedule.
+- If they say "today", apply the change to the day whose date equals today's date (already in the JSON).
+- If they say "tomorrow", apply to the next date in the JSON.
+- If they say "less / shorter", reduce to 2 games that day.
+- If they say "more / harder", increase to 4 games that day.
+- If they want more of a domain:
+  - memory -> recall
+  - executive/attention -> stroop or trails
+  - visuospatial -> visual_puzzle
+  - language -> fluency
+- Keep ids valid: typing, visual_puzzle, stroop, recall, tapping, orientation, trails, fluency
+- Output ONLY valid JSON (no extra text).
+
+Return EXACT JSON:
+{{
+  "response": "1-4 sentences that clearly explains what you changed",
+  "updatedSchedule": null OR {{
+    "start_date": "...",
+    "num_days": ...,
+    "days": [...]
+  }}
+}}
+"""
+
+
+def count_tokens(text):
+    return len(TOKEN_RE.findall(text))
+
+
+def make_schedule(days, seed=0):
+    """A schedule shaped like the model's output, with some games completed."""
+    rng = random.Random(seed)
+    today = date.today()
+    schedule = {"start_date": today.isoformat(), "num_days": days, "days": []}
+    for i in range(days):
+        games = []
+        for game_id in rng.sample(list(GAME_NAMES), rng.randint(2, 4)):
+            game = {
+                "id": game_id, "name": GAME_NAMES[game_id], "minutes": rng.randint(2, 5),
+                "reason": f"Builds {game_id.replace('_', ' ')} skills at a steady pace",
+            }
+            if i == 0 and rng.random() < 0.5:
+                game.update(completed=True, completed_at=f"{today.isoformat()}T09:15:00.000000")
+            games.append(game)
+        schedule["days"].append({
+            "date": (today + timedelta(days=i)).isoformat(),
+            "focus": rng.choice(["Memory boost", "Attention focus", "Mixed practice"]),
+            "description": "Short sessions across the weakest domains.",
+            "games": games,
+        })
+    return schedule
+
+
+def main():
+    domains_info = "\n".join(f"- {d}: {avg:.2f}/100" for d, avg in DOMAIN_AVERAGES.items())
+    print(f"{'days':>4}  {'call':<18} {'json':>7} {'compact':>8} {'saved':>6}")
+    for days in (7, 14, 30):
+        schedule = make_schedule(days, seed=days)
+        compact = encode_compact_schedule(schedule)
+        assert decode_compact_schedule(compact, base=schedule) == schedule, "round trip failed"
+
+        rows = [
+            ("generate prompt",
+             JSON_GENERATE_PROMPT.format(days=days, domains_info=domains_info),
+             build_schedule_prompt(days, DOMAIN_AVERAGES)),
+            ("generate reply",
+             json.dumps(schedule, indent=2),
+             encode_compact_schedule(schedule, reasons=True)),
+            ("chat prompt",
+             JSON_CHAT_PROMPT.format(schedule=json.dumps(schedule, indent=2), message=MESSAGE),
+             build_chat_prompt(schedule, MESSAGE)),
+            ("chat reply",
+             json.dumps({"response": "Done.", "updatedSchedule": schedule}, indent=2),
+             f"REPLY: Done.\nSCHEDULE:\n{compact}"),
+        ]
+        for name, before, after in rows:
+            old, new = count_tokens(before), count_tokens(after)
+            print(f"{days:>4}  {name:<18} {old:>7} {new:>8} {1 - new / old:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
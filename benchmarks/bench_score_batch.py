@@ -0,0 +1,106 @@
+"""
+Throughput of POST /api/scores/batch against one POST /api/score per
+session, through the Flask test client on a temporary database. Also checks
+that both paths leave identical bandit_state and user_game_stats behind, and
+that a batch with a non-finite value is rejected with a 400.
+
+    python benchmarks/bench_score_batch.py --sessions 2000 --batch-size 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("MEMORY_LANE_MODEL_PRELOAD", "off")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+from bandit import ACTIONS  # noqa: E402
+
+GAMES = [("stroop", "Executive Function"), ("recall", "Memory"), ("tapping", "Attention")]
+
+
+def sessions(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    out = []
+    for i in range(count):
+        game, domain = rng.choice(GAMES)
+        out.append({
+            "game": game,
+            "domain": domain,
+            "value": round(rng.uniform(0, 100), 2),
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+            "practice_action": rng.choice(ACTIONS),
+            "practice_context": rng.choice(["low", "mid", "high"]),
+        })
+    return out
+
+
+def login(client, email):
+    client.post("/register", data={"email": email, "password": "pw", "name": "bench", "age": "70", "gender": "male"})
+    client.post("/login", data={"email": email, "password": "pw"})
+    return db.get_user_by_email(email)["id"]
+
+
+def snapshot(user_id):
+    with db.connection() as conn:
+        bandit = conn.execute(
+            "SELECT game, context, action, count, round(value, 9) FROM bandit_state WHERE user_id=? ORDER BY 1, 2, 3",
+            (user_id,)
+        ).fetchall()
+    stats = db.get_game_stats(user_id)
+    return (
+        [tuple(r) for r in bandit],
+        {g: (s["count"], round(s["mean"], 9), round(s["variance"], 6), s["recent"]) for g, s in stats.items()},
+    )
+
+
+def check_rejects_non_finite(client, user_id):
+    good = sessions(1)[0]
+    for bad in ("NaN", "inf", 1e999):
+        resp = client.post("/api/scores/batch", json=[good, dict(good, value=bad)])
+        assert resp.status_code == 400 and "score 1" in resp.get_json()["error"], (bad, resp.status_code)
+    assert not db.get_scores(user_id), "a rejected batch was stored"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        import app as app_module
+
+        client = app_module.app.test_client()
+        payloads = sessions(args.sessions)
+
+        single_user = login(client, "single@example.com")
+        start = time.perf_counter()
+        for payload in payloads:
+            client.post("/api/score", json=payload)
+        single_s = time.perf_counter() - start
+
+        client.get("/logout")
+        batch_user = login(client, "batch@example.com")
+        check_rejects_non_finite(client, batch_user)
+        start = time.perf_counter()
+        for i in range(0, len(payloads), args.batch_size):
+            client.post("/api/scores/batch", json=payloads[i:i + args.batch_size])
+        batch_s = time.perf_counter() - start
+
+        # Rewards reach bandit_state through the write-behind queue.
+        app_module.bandit.flush()
+        assert snapshot(single_user) == snapshot(batch_user), "batch and single-score paths disagree"
+        print(f"single /api/score      {args.sessions / single_s:9.0f} scores/s")
+        print(f"batch  /api/scores/batch ({args.batch_size}/request) {args.sessions / batch_s:9.0f} scores/s "
+              f"({single_s / batch_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Seed a large score table and report query plans and latencies for the hot
+lookups in db.py before and after the index migration.
+
+    python benchmarks/bench_score_indexes.py --scores 1000000
+"""
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+
+GAMES = ["stroop", "recall", "orientation", "tapping", "trails_switch", "visual_puzzle"]
+
+QUERIES = {
+    "get_scores": (
+        "SELECT id, game, domain, value, created_at, details FROM score WHERE user_id=? ORDER BY created_at DESC, id DESC LIMIT 30",
+        lambda uid: (uid,),
+    ),
+    "get_scores_by_game": (
+        """SELECT id, game, domain, value, created_at, details
+           FROM score WHERE user_id=? AND game=? ORDER BY created_at DESC, id DESC LIMIT 5""",
+        lambda uid: (uid, "recall"),
+    ),
+    "get_latest_schedule": (
+        "SELECT * FROM schedule WHERE user_id=? ORDER BY created_at DESC, id DESC LIMIT 1",
+        lambda uid: (uid,),
+    ),
+    "get_orientation_questions": (
+        "SELECT * FROM orientation_question WHERE user_id=? AND active=1 ORDER BY id DESC",
+        lambda uid: (uid,),
+    ),
+}
+
+
+def seed(conn, users, scores):
+    rng = random.Random(0)
+    now = "2026-01-01T00:00:00"
+    conn.executemany(
+        "INSERT INTO user (name, email, password_hash, created_at) VALUES (?,?,?,?)",
+        [(f"user{u}", f"user{u}@example.com", "x", now) for u in range(users)],
+    )
+    batch = []
+    for i in range(scores):
+        batch.append((rng.randint(1, users), rng.choice(GAMES), "Memory", rng.random() * 5, now, "{}"))
+        if len(batch) == 50000:
+            conn.executemany(
+                "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (?,?,?,?,?,?)", batch
+            )
+            batch = []
+    if batch:
+        conn.executemany(
+            "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (?,?,?,?,?,?)", batch
+        )
+    conn.executemany(
+        "INSERT INTO schedule (user_id, schedule_data, num_days, created_at) VALUES (?,?,?,?)",
+        [(rng.randint(1, users), "{}", 7, f"2026-01-{rng.randint(1, 28):02d}") for _ in range(scores // 20)],
+    )
+    conn.executemany(
+        "INSERT INTO orientation_question (user_id, prompt, answer_norm, active, created_at) VALUES (?,?,?,?,?)",
+        [(rng.randint(1, users), "q", "a", rng.randint(0, 1), now) for _ in range(scores // 20)],
+    )
+    conn.commit()
+
+
+def measure(conn, users, repeats):
+    rng = random.Random(1)
+    for name, (sql, params) in QUERIES.items():
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params(1)).fetchall()
+        timings = []
+        for _ in range(repeats):
+            args = params(rng.randint(1, users))
+            start = time.perf_counter()
+            conn.execute(sql, args).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {name:<26} p50={statistics.median(timings):9.3f} ms")
+        for row in plan:
+            print(f"      plan: {row[3]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scores", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "index.db")
+        conn.executescript(db.SCHEMA_PATH.read_text())
+        start = time.perf_counter()
+        seed(conn, args.users, args.scores)
+        print(f"seeded {args.scores} scores in {time.perf_counter() - start:.1f}s")
+
+        print("before migration:")
+        measure(conn, args.users, args.repeats)
+
+        start = time.perf_counter()
+        version = db.apply_migrations(conn)
+        print(f"migrated to user_version={version} in {time.perf_counter() - start:.1f}s")
+
+        print("after migration:")
+        measure(conn, args.users, args.repeats)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Timing report for train_model.py against the notebook path
+(cognitive_data_classification.ipynb): CSV load time and the size of the
+frames it builds, then model selection and the final fit. Checks that both loaders produce
+the same feature values and the same encoded training matrix.
+
+The notebook reads all columns as str, sanitizes every one of them and fits
+each model once on an 80/20 split, single-threaded. train_model.py reads
+only the feature columns with explicit dtypes and runs --folds-fold
+cross-validation with folds (and the final fit) spread over the cores.
+
+    python benchmarks/bench_training.py --folds 5 --jobs -1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+import train_model  # noqa: E402
+from bench_feature_encoder import load_notebook_features  # noqa: E402
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def notebook_raw_frame_kb():
+    """The notebook's df_raw: every column of the CSV as str."""
+    df = pd.read_csv(train_model.DATA_PATH, encoding="cp1252", na_values=train_model.NA_VALUES,
+                     dtype=str, low_memory=False)
+    return df.memory_usage(deep=True).sum() / 1024
+
+
+def notebook_labels():
+    df = pd.read_csv(train_model.DATA_PATH, encoding="cp1252", na_values=train_model.NA_VALUES,
+                     dtype=str, low_memory=False, usecols=["GENERAL_Dx"])
+    y = df["GENERAL_Dx"].str.strip().map(train_model.LABEL_MAP)
+    return y[y.notna()]
+
+
+def notebook_training(X, y):
+    """Split, fit and score every model once, then refit the best on all rows."""
+    from sklearn.metrics import f1_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=train_model.RANDOM_STATE, stratify=y
+    )
+    scores = {}
+    for name, clf in train_model.candidate_models().items():
+        pipe = Pipeline(steps=[("preprocess", train_model.build_preprocess(X)), ("clf", clf)])
+        pipe.fit(X_train, y_train)
+        scores[name] = f1_score(y_test, pipe.predict(X_test))
+    best = max(scores, key=scores.get)
+    train_model.fit_model(best, X, y, jobs=None)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    Xn, nb_load_s = measure(load_notebook_features)
+    yn = notebook_labels()
+    (X, y), load_s = measure(train_model.load_training_data)
+
+    assert list(X.columns) == list(Xn.columns)
+    for col in X.columns:
+        assert X[col].astype(object).equals(Xn[col].astype(object)), col
+    assert np.array_equal(y.to_numpy(), yn.to_numpy())
+    encoded = train_model.build_preprocess(X).fit_transform(X, y)
+    assert np.array_equal(encoded, train_model.build_preprocess(Xn).fit_transform(Xn, yn))
+    print(f"features match the notebook path ({len(X)} rows, {X.shape[1]} columns)")
+
+    start = time.perf_counter()
+    nb_best = notebook_training(Xn, yn)
+    nb_train_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        report = train_model.train(Path(tmp) / "best_model.joblib", folds=args.folds, jobs=args.jobs)
+        train_s = time.perf_counter() - start - report["load_s"]
+
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'':<22} {'notebook':>10} {'train_model':>12}")
+    print(f"{'load (s)':<22} {nb_load_s:>10.3f} {load_s:>12.3f}")
+    print(f"{'feature frame (KB)':<22} {Xn.memory_usage(deep=True).sum() / 1024:>10.0f} "
+          f"{X.memory_usage(deep=True).sum() / 1024:>12.0f}")
+    print(f"{'select + fit (s)':<22} {nb_train_s:>10.1f} {train_s:>12.1f}")
+    print(f"{'fits':<22} {len(train_model.candidate_models()) + 1:>10} "
+          f"{len(report['cv']) * args.folds + 1:>12}")
+    print(f"{'best model':<22} {nb_best:>10} {report['best']:>12}")
+    print(f"notebook df_raw (every column as str): {notebook_raw_frame_kb():.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Parity check and per-row latency for tree_ensemble.TreeEnsemble against the
+classifiers it compiles: the XGBoost model in best_model.joblib, and a
+RandomForest and DecisionTree fitted by train_model.fit_model.
+
+Parity is checked on every labelled SATURN_MoCA.csv row, once as encoded and
+once with 30% of the values replaced by NaN. It compares leaf
+indices with the library's own (apply / pred_leaf), and probabilities and
+labels bit for bit. Exits non-zero on any mismatch.
+
+Latency is measured per row, the way the dashboard scores one user, then
+per batch size to show where the classifier's own batch loop takes over
+(feature_encoder.COMPILED_TREES_MAX_ROWS).
+
+    python benchmarks/bench_tree_ensemble.py
+"""
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+import train_model  # noqa: E402
+from bench_feature_encoder import app_rows, load_notebook_features  # noqa: E402
+from feature_encoder import FeatureEncoder  # noqa: E402
+from ml import build_feature_dict, build_feature_row, load_ml_model  # noqa: E402
+from tree_ensemble import TreeEnsemble  # noqa: E402
+
+BATCH_SIZES = [1, 8, 32, 128, 512]
+
+
+def library_leaves(classifier, X):
+    if hasattr(classifier, "get_booster"):
+        import xgboost
+
+        return classifier.get_booster().predict(xgboost.DMatrix(X.astype(np.float32)), pred_leaf=True).astype(int)
+    leaves = classifier.apply(X)
+    return leaves if leaves.ndim == 2 else leaves[:, np.newaxis]
+
+
+def check_parity(name, classifier, trees, X):
+    with_missing = X.copy()
+    with_missing[np.random.default_rng(0).random(X.shape) < 0.3] = np.nan
+    for label, data in (("encoded", X), ("30% NaN", with_missing)):
+        leaves = trees.leaves(data).T - trees.roots
+        assert np.array_equal(leaves, library_leaves(classifier, data)), f"{name}: leaves differ ({label})"
+        expected = classifier.predict_proba(data)
+        actual = trees.predict_proba(data)
+        assert expected.dtype == actual.dtype, (name, expected.dtype, actual.dtype)
+        assert np.array_equal(expected, actual), f"{name}: probabilities differ ({label})"
+        assert np.array_equal(classifier.predict(data), trees.predict(data)), f"{name}: labels differ ({label})"
+    print(f"{name:<14} parity ok on {len(X)} SATURN_MoCA.csv rows "
+          f"({trees.n_trees} trees, depth {trees.max_depth}, {len(trees.feature)} nodes)")
+
+
+def median_ms(fn, runs):
+    timings = []
+    for args in runs:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    warnings.filterwarnings("ignore")
+    model = load_ml_model()
+    if model is None:
+        raise SystemExit("model unavailable")
+    X_train, y = train_model.load_training_data()
+    pipelines = {
+        "xgboost": model,
+        "random_forest": train_model.fit_model("random_forest", X_train, y, jobs=1),
+        "decision_tree": train_model.fit_model("decision_tree", X_train, y, jobs=1),
+    }
+
+    X_notebook = load_notebook_features()
+    compiled = {}
+    for name, pipeline in pipelines.items():
+        classifier = pipeline.steps[-1][1]
+        start = time.perf_counter()
+        trees = TreeEnsemble(classifier)
+        compile_ms = (time.perf_counter() - start) * 1000
+        X = pipeline.named_steps["preprocess"].transform(X_notebook if name == "xgboost" else X_train)
+        check_parity(name, classifier, trees, X)
+        compiled[name] = (classifier, trees, X, compile_ms)
+
+    # The dashboard's path for one user: the pandas pipeline it used to call
+    # (predict_proba, then predict), against the encoder with compiled trees.
+    encoder = FeatureEncoder(model)
+    users = app_rows(300, seed=1)
+
+    def pipeline_predict(user, scores):
+        frame = build_feature_row(user, scores)
+        return model.predict_proba(frame), model.predict(frame)
+
+    pipeline_ms = median_ms(pipeline_predict, users)
+    encoder_ms = median_ms(lambda u, s: encoder.predict([build_feature_dict(u, s)]), users)
+    print(f"dashboard row   pipeline predict_proba + predict p50={pipeline_ms:.3f} ms, "
+          f"encoder + compiled trees p50={encoder_ms:.3f} ms ({pipeline_ms / encoder_ms:.0f}x)")
+
+    print(f"{'model':<14} {'compile ms':>10} {'rows':>5} {'classifier ms':>14} {'compiled ms':>12} {'speedup':>8}")
+    for name, (classifier, trees, X, compile_ms) in compiled.items():
+        for size in BATCH_SIZES:
+            batches = [(X[i:i + size],) for i in range(0, len(X) - size + 1, max(size, len(X) // 50))][:50]
+            library_ms = median_ms(classifier.predict_proba, batches)
+            trees_ms = median_ms(trees.predict_proba, batches)
+            print(f"{name:<14} {compile_ms:>10.1f} {size:>5} {library_ms:>14.3f} {trees_ms:>12.3f} "
+                  f"{library_ms / trees_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
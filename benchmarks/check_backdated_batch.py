@@ -0,0 +1,75 @@
+"""
+Check that a late offline upload keeps its place in the timeline. The user
+plays online first, then a device uploads sessions from a week earlier
+through POST /api/scores/batch. The newest online session must stay the
+user's latest score, and user_game_stats must keep the online values as
+last/recent. The upload's practice rewards must be computed against the
+sessions before it in time. Runs through the Flask test client on a
+temporary database; exits non-zero on any failure.
+
+    python benchmarks/check_backdated_batch.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("MEMORY_LANE_MODEL_PRELOAD", "off")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+from bandit import ACTIONS  # noqa: E402
+
+ONLINE = [40.0, 45.0, 50.0, 55.0, 60.0, 65.0]
+OFFLINE = [10.0, 20.0]  # played a week ago; 20 after 10 is an improvement
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "check.db"
+        import app as app_module
+
+        client = app_module.app.test_client()
+        client.post("/register", data={"email": "late@example.com", "password": "pw", "name": "late",
+                                       "age": "70", "gender": "male"})
+        client.post("/login", data={"email": "late@example.com", "password": "pw"})
+        user_id = db.get_user_by_email("late@example.com")["id"]
+
+        for value in ONLINE:
+            client.post("/api/score", json={"game": "recall", "domain": "Memory", "value": value})
+        newest_online = db.get_scores(user_id, limit=1)[0]
+
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        resp = client.post("/api/scores/batch", json=[
+            {"game": "recall", "domain": "Memory", "value": value,
+             "created_at": (week_ago + timedelta(minutes=i)).isoformat(),
+             "practice_action": ACTIONS[0], "practice_context": "mid"}
+            for i, value in enumerate(OFFLINE)
+        ])
+        assert resp.status_code == 200, resp.get_json()
+        upload_ids = resp.get_json()["score_ids"]
+        app_module.bandit.flush()
+
+        scores = db.get_scores(user_id, limit=30)
+        stats = db.get_game_stats(user_id, ["recall"])["recall"]
+        with db.connection() as conn:
+            arm = conn.execute(
+                "SELECT count, value FROM bandit_state WHERE user_id=? AND game='recall' AND action=?",
+                (user_id, ACTIONS[0])
+            ).fetchone()
+
+    assert min(upload_ids) > newest_online["id"], "uploads should get the newest ids"
+    assert scores[0]["id"] == newest_online["id"], "the upload became the latest score"
+    assert [s["id"] for s in scores[-2:]] == upload_ids[::-1], "the upload should be oldest"
+    assert stats["last_score_id"] == newest_online["id"] and stats["last_value"] == ONLINE[-1], stats
+    assert stats["recent"] == ONLINE[::-1][:db.STATS_WINDOW], stats["recent"]
+    assert stats["count"] == len(ONLINE) + len(OFFLINE), stats["count"]
+    all_values = ONLINE + OFFLINE
+    assert abs(stats["mean"] - sum(all_values) / len(all_values)) < 1e-9, stats["mean"]
+    # First upload has nothing before it (0.0); the second improved on it (1.0).
+    assert (arm["count"], arm["value"]) == (2, 0.5), tuple(arm)
+    print("backdated batch ok: late upload kept its place; latest score, stats and rewards follow created_at")
+
+
+if __name__ == "__main__":
+    main()
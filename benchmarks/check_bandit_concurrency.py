@@ -0,0 +1,84 @@
+"""
+Hammer one bandit arm from many threads and check that no update is lost:
+count must equal the number of rewards applied and value their mean. Runs
+update_bandit_state and the batched update_bandit_states on a temporary
+database; exits non-zero on any mismatch.
+
+    python benchmarks/check_bandit_concurrency.py --threads 16 --updates 200
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+from bandit import ACTIONS  # noqa: E402
+
+ARM = (1, "stroop", "mid", ACTIONS[-1])
+
+
+def hammer(threads, updates, batch_size):
+    rewards = [[random.Random(t * 7919 + i).choice([-1.0, 0.0, 1.0]) for i in range(updates)] for t in range(threads)]
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def worker(values):
+        try:
+            barrier.wait()
+            if batch_size:
+                for i in range(0, len(values), batch_size):
+                    db.update_bandit_states([(*ARM, r, "now") for r in values[i:i + batch_size]])
+            else:
+                for r in values:
+                    db.update_bandit_state(*ARM, r, "now")
+        except Exception as exc:
+            errors.append(exc)
+
+    pool = [threading.Thread(target=worker, args=(values,)) for values in rewards]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with db.connection() as conn:
+        row = conn.execute(
+            "SELECT count, value FROM bandit_state WHERE user_id=? AND game=? AND context=? AND action=?", ARM
+        ).fetchone()
+        conn.execute("DELETE FROM bandit_state")
+        conn.commit()
+
+    flat = [r for values in rewards for r in values]
+    expected_mean = sum(flat) / len(flat)
+    ok = not errors and row["count"] == len(flat) and abs(row["value"] - expected_mean) < 1e-9
+    label = f"batched ({batch_size}/txn)" if batch_size else "single"
+    print(f"{label:<18} count={row['count']}/{len(flat)} value={row['value']:.6f} "
+          f"expected={expected_mean:.6f} {len(flat) / elapsed:8.0f} updates/s {'ok' if ok else 'FAILED'}")
+    for exc in errors[:3]:
+        print(f"  error: {exc}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--wal", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bandit.db"
+        db.init_db(wal=args.wal)
+        ok = hammer(args.threads, args.updates, batch_size=0)
+        ok = hammer(args.threads, args.updates, batch_size=25) and ok
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
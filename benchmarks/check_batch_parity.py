@@ -0,0 +1,62 @@
+"""
+Check that batch_predict and the dashboard score a user from the same
+scores. The user's only stroop result is older than the dashboard's
+FEATURE_SCORE_WINDOW newest scores, so a batch pass that read the latest
+score per game over all history would give a different prediction under the
+same (user, latest score, model) cache key. Runs on a temporary database;
+exits non-zero on any mismatch.
+
+    python benchmarks/check_batch_parity.py
+"""
+import json
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import batch_predict  # noqa: E402
+import db  # noqa: E402
+from ml import FEATURE_SCORE_WINDOW, build_feature_dict, load_ml_model, predict_rows  # noqa: E402
+
+STROOP = {
+    "SATURN_SCORE_STROOP_POINTS": 0,
+    "SATURN_TIME_STROOP_ERRORS": 9,
+    "SATURN_TIME_STROOP_MEAN_ms": 2900,
+}
+
+
+def main():
+    model = load_ml_model()
+    if model is None:
+        raise SystemExit("model unavailable")
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "check.db"
+        db.init_db()
+        start = datetime(2026, 1, 1)
+        db.create_user("u", "parity@example.com", "x", start.isoformat(), age=74, gender="female")
+        user = dict(db.get_user_by_email("parity@example.com"))
+        db.add_score(user["id"], "stroop", "Attention", 0, start.isoformat(), json.dumps(STROOP))
+        for i in range(FEATURE_SCORE_WINDOW + 5):
+            taps = 20 + i
+            db.add_score(user["id"], "tapping", "Motor", taps, (start + timedelta(minutes=i + 1)).isoformat(),
+                         json.dumps({"SATURN_MOTOR_SPEED_ms_per_button": 10000 / taps, "taps": taps}))
+
+        batch_predict.score_all_users()
+        batch = db.get_prediction(user["id"])
+
+        # The dashboard's path: its score list is the feature window.
+        scores = [dict(s) for s in db.get_scores(user["id"], limit=FEATURE_SCORE_WINDOW)]
+        features = build_feature_dict(user, scores)
+        pred, proba = predict_rows(model, [features])[0]
+
+    assert all(features[k] is None for k in STROOP), "stroop is outside the window"
+    assert batch["score_id"] == max(s["id"] for s in scores), batch["score_id"]
+    assert (batch["pred"], batch["probability"]) == (pred, proba), \
+        f"batch {batch['pred']}/{batch['probability']} != dashboard {pred}/{proba}"
+    print(f"batch parity ok: batch and dashboard agree ({pred}, {proba:.4f}) "
+          f"with stroop outside the last {FEATURE_SCORE_WINDOW} scores")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Check the schedule-chat fast path: which messages scheduling.parse_intent
+understands and the intent each one becomes, and that a swap removes the game
+the user asked to drop. Messages mapped to None must go to the model. Exits
+non-zero on any mismatch.
+
+    python benchmarks/check_chat_fast_path.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scheduling import apply_intent, parse_intent  # noqa: E402
+
+CASES = [
+    ("make today shorter", ("shorter", "today")),
+    ("Could you make tomorrow a bit longer?", ("longer", "tomorrow")),
+    ("more memory on day 3", ("add", 3, "recall")),
+    ("swap stroop for fluency", ("swap", "today", "stroop", "fluency")),
+    ("replace today's stroop with fluency", ("swap", "today", "stroop", "fluency")),
+    ("swap out stroop for fluency", ("swap", "today", "stroop", "fluency")),
+    ("swap stroop out for fluency", ("swap", "today", "stroop", "fluency")),
+    # The new game comes first in these.
+    ("swap in fluency for stroop", ("swap", "today", "stroop", "fluency")),
+    ("switch in fluency for stroop tomorrow", ("swap", "tomorrow", "stroop", "fluency")),
+    ("swap fluency in for stroop", ("swap", "today", "stroop", "fluency")),
+    # Ambiguous or unknown: the model decides.
+    ("switch to fluency instead of stroop", None),
+    ("swap in fluency", None),
+    ("make it more fun", None),
+]
+
+SCHEDULE = {"days": [{"date": None, "games": [
+    {"id": "stroop", "name": "Stroop Practice", "minutes": 3},
+    {"id": "recall", "name": "Word Recall", "minutes": 3},
+]}]}
+
+
+def main():
+    failed = 0
+    for message, expected in CASES:
+        intent = parse_intent(message)
+        if intent != expected:
+            failed += 1
+            print(f"FAILED {message!r}: {intent} != {expected}")
+
+    _, updated = apply_intent(SCHEDULE, parse_intent("swap in fluency for stroop"))
+    ids = [g["id"] for g in updated["days"][0]["games"]] if updated else None
+    if ids != ["fluency", "recall"]:
+        failed += 1
+        print(f"FAILED swap in: games {ids}")
+    if failed:
+        raise SystemExit(1)
+    print(f"chat fast path ok: {len(CASES)} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Check that schedules whose focus, description or reasons contain the compact
+format's separators ("|", ";") or backslashes survive encode_compact_schedule
+-> decode_compact_schedule unchanged, both against the stored schedule and
+from the lines alone, and that DayStreamParser reads the same days. Exits
+non-zero on any mismatch.
+
+    python benchmarks/check_compact_schedule.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scheduling import DayStreamParser, decode_compact_schedule, encode_compact_schedule  # noqa: E402
+
+SCHEDULE = {
+    "start_date": "2026-10-17",
+    "num_days": 3,
+    "days": [
+        {"date": "2026-10-17", "focus": "Memory | attention", "description": "Recall first; then stroop.",
+         "games": [
+             {"id": "recall", "name": "Word Recall", "minutes": 3, "reason": "word memory (lists; pairs)"},
+             {"id": "stroop", "name": "Stroop Practice", "minutes": 2, "reason": "focus | speed",
+              "completed": True, "completed_at": "2026-10-17T09:15:00.000000"},
+         ]},
+        {"date": "2026-10-18", "focus": "A\\B split", "description": "Ends with a backslash \\",
+         "games": [
+             {"id": "fluency", "name": "Verbal Fluency", "minutes": 4, "reason": "trailing \\"},
+             {"id": "trails", "name": "Trail Making", "minutes": 3, "reason": "(a) then (b)"},
+         ]},
+        {"date": "2026-10-19", "focus": "Plain", "description": "No separators here.",
+         "games": [
+             {"id": "tapping", "name": "Finger Tapping", "minutes": 2, "reason": "motor"},
+             {"id": "visual_puzzle", "name": "Visual Puzzle", "minutes": 3, "reason": "a;b|c\\;d\\|e"},
+         ]},
+    ],
+}
+
+
+def text_fields(schedule):
+    return [
+        (day["focus"], day["description"], [(g["id"], g.get("minutes"), g.get("reason")) for g in day["games"]])
+        for day in schedule["days"]
+    ]
+
+
+def main():
+    failed = 0
+    lines = encode_compact_schedule(SCHEDULE, reasons=True)
+    if len(lines.splitlines()) != len(SCHEDULE["days"]):
+        failed += 1
+        print(f"FAILED: {len(lines.splitlines())} lines for {len(SCHEDULE['days'])} days")
+
+    if decode_compact_schedule(lines, base=SCHEDULE) != SCHEDULE:
+        failed += 1
+        print("FAILED: round trip against the stored schedule")
+
+    decoded = decode_compact_schedule(lines)
+    if decoded is None or text_fields(decoded) != text_fields(SCHEDULE):
+        failed += 1
+        print(f"FAILED: round trip from the lines alone: {decoded and text_fields(decoded)}")
+
+    parser = DayStreamParser()
+    streamed = []
+    for i in range(0, len(lines), 7):
+        streamed.extend(parser.feed(lines[i:i + 7]))
+    streamed.extend(parser.flush())
+    if text_fields({"days": streamed}) != text_fields(SCHEDULE):
+        failed += 1
+        print(f"FAILED: streamed days: {text_fields({'days': streamed})}")
+
+    if failed:
+        raise SystemExit(1)
+    print(f"compact schedule ok: {len(SCHEDULE['days'])} days with separators in their text round-trip")
+
+
+if __name__ == "__main__":
+    main()
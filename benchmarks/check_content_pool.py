@@ -0,0 +1,72 @@
+"""
+Check that content_pool refills for a user who has exhausted the pool. The
+user reads every item while the LLM is down (refills generate nothing), then
+the LLM comes back. The next take must queue a refill that calls it, and the
+take after that must return fresh content instead of the static fallback.
+Runs on a temporary database with a canned generator; exits non-zero on
+failure.
+
+    python benchmarks/check_content_pool.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import content_pool  # noqa: E402
+import db  # noqa: E402
+
+USER_ID = 1
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def main():
+    calls = {"count": 0, "up": False}
+
+    def generate(prompt, timeout=None):
+        calls["count"] += 1
+        return "a fresh sentence for the typing test" if calls["up"] else None
+
+    content_pool.llm_generate = generate
+    kind = content_pool.TYPING_TEXT
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "check.db"
+        db.init_db()
+        initial = content_pool.LOW_WATERMARK + 5
+        db.add_pool_content(kind, [f"pooled sentence number {i}" for i in range(initial)], "2026-01-01T00:00:00")
+
+        # Outage: the user reads the whole pool and refills produce nothing.
+        for _ in range(initial):
+            assert content_pool.take(USER_ID, kind) is not None
+        assert content_pool.take(USER_ID, kind) is None, "pool should be exhausted"
+        assert wait_for(lambda: content_pool._REFILL_QUEUE.empty())
+        time.sleep(0.1)
+
+        # Recovery: the exhausted user's next take has to trigger a refill.
+        calls["up"] = True
+        calls["count"] = 0
+        assert content_pool.take(USER_ID, kind) is None
+        assert wait_for(lambda: db.count_pool_content_after(kind, 0, initial + 1) > initial), \
+            f"no refill after recovery (LLM called {calls['count']} times)"
+        text = content_pool.take(USER_ID, kind)
+        assert text == "a fresh sentence for the typing test", text
+
+        # Let the worker finish the refill this take queued before the
+        # database goes away.
+        calls["up"] = False
+        wait_for(lambda: content_pool._REFILL_QUEUE.empty())
+        time.sleep(0.2)
+    print(f"content pool ok: exhausted user got a refill after recovery ({calls['count']} LLM calls)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Boot several worker processes against one database at the same moment, the
+way gunicorn starts them, and check that every init_db() succeeds and the
+migrations are applied exactly once: once on a new file and once on a
+populated database that has not been migrated yet (user_version 0). Then
+re-runs steps on a migrated database, as if the user_version bookkeeping had
+been lost, and checks they still succeed. Exits non-zero on any failure.
+
+    python benchmarks/check_migrations.py --workers 8 --runs 20
+"""
+import argparse
+import multiprocessing as mp
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+
+
+def boot(db_path, barrier, results):
+    db.DB_PATH = Path(db_path)
+    barrier.wait()
+    try:
+        db.init_db()
+        results.put(None)
+    except Exception as exc:
+        results.put(repr(exc))
+
+
+def populate_unmigrated(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(db.SCHEMA_PATH.read_text())
+    conn.execute(
+        "INSERT INTO user (name, email, password_hash, created_at) VALUES ('u', 'u@example.com', 'x', '2026-01-01')"
+    )
+    conn.executemany(
+        "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (1,?,?,?,?,?)",
+        [(game, "Memory", i % 5, f"2026-01-01T00:{i:02d}:00", '{"SATURN_TIME_STROOP_MEAN_ms": 900}')
+         for i, game in enumerate(["stroop", "recall", "tapping"] * 10)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(workers, populated):
+    ctx = mp.get_context("fork")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "check.db"
+        if populated:
+            populate_unmigrated(path)
+        barrier = ctx.Barrier(workers)
+        results = ctx.Queue()
+        procs = [ctx.Process(target=boot, args=(path, barrier, results)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        errors = [e for e in (results.get() for _ in procs) if e]
+        for p in procs:
+            p.join()
+
+        conn = sqlite3.connect(path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        stats = conn.execute("SELECT COUNT(*), SUM(count) FROM user_game_stats").fetchone()
+        conn.close()
+    if version != db.MIGRATIONS[-1][0]:
+        errors.append(f"user_version {version}")
+    if populated and stats != (3, 30):
+        errors.append(f"user_game_stats backfilled as {stats}")
+    return errors
+
+
+def rerun(from_version):
+    """Errors from re-applying every step after from_version to a migrated database."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "check.db"
+        populate_unmigrated(db.DB_PATH)
+        db.init_db()
+        with db.connection() as conn:
+            stats = [tuple(r) for r in conn.execute("SELECT * FROM user_game_stats ORDER BY game")]
+            conn.execute(f"PRAGMA user_version={from_version}")
+        try:
+            db.init_db()
+        except Exception as exc:
+            return [repr(exc)]
+        with db.connection() as conn:
+            if [tuple(r) for r in conn.execute("SELECT * FROM user_game_stats ORDER BY game")] != stats:
+                return ["user_game_stats changed"]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    failed = 0
+    for populated in (False, True):
+        label = "unmigrated database" if populated else "new database"
+        bad = 0
+        for _ in range(args.runs):
+            errors = run(args.workers, populated)
+            if errors:
+                bad += 1
+                print(f"{label}: {errors[0]}")
+        print(f"{label:<20} {args.workers} workers x {args.runs} runs: {bad} failed")
+        failed += bad
+    for step, _ in db.MIGRATIONS:
+        errors = rerun(step - 1)
+        print(f"re-run step {step:<10} {errors[0] if errors else 'ok'}")
+        failed += bool(errors)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Check that a run_write callback failing with something other than a locked
+OperationalError rolls its transaction back: within one Flask app context
+(the connection a request shares) the next run_write must succeed, and a
+second connection must be able to write meanwhile. Exits non-zero on any
+failure.
+
+    python benchmarks/check_run_write.py
+"""
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import db  # noqa: E402
+
+
+def insert_user(email):
+    return lambda conn: conn.execute(
+        "INSERT INTO user (name, email, password_hash, created_at) VALUES (?,?,?,?)",
+        ("u", email, "x", "2026-01-01T00:00:00"),
+    )
+
+
+def failing(exc):
+    def work(conn):
+        insert_user("rolled-back@example.com")(conn)
+        raise exc
+    return work
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "check.db"
+        db.init_db()
+        app = Flask(__name__)
+        db.init_app(app)
+
+        db.run_write(insert_user("taken@example.com"))
+        failures = [
+            ValueError("bad callback"),
+            KeyError("missing"),
+            None,  # IntegrityError from a duplicate email
+        ]
+        with app.app_context():
+            for i, exc in enumerate(failures):
+                work = insert_user("taken@example.com") if exc is None else failing(exc)
+                expected = sqlite3.IntegrityError if exc is None else type(exc)
+                try:
+                    db.run_write(work)
+                except expected:
+                    pass
+                else:
+                    raise SystemExit(f"{expected.__name__} was not raised")
+
+                with db.connection() as conn:
+                    assert not conn.in_transaction, "transaction left open after a failed write"
+                # Another connection (another worker) can take the write lock.
+                other = db.get_conn()
+                try:
+                    other.execute("BEGIN IMMEDIATE")
+                    other.rollback()
+                finally:
+                    other.close()
+                # And the same request can write again.
+                db.run_write(insert_user(f"after-{i}@example.com"))
+
+        with db.connection() as conn:
+            emails = {r["email"] for r in conn.execute("SELECT email FROM user")}
+        assert "rolled-back@example.com" not in emails, "failed write was committed"
+        assert {f"after-{i}@example.com" for i in range(len(failures))} <= emails
+    print("run_write ok: failed callbacks roll back and release the write lock")
+
+
+if __name__ == "__main__":
+    main()
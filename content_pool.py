@@ -0,0 +1,114 @@
+"""
+Pre-generated typing sentences and recall word sets.
+
+Requests take the next unseen item from the content_pool table (one indexed
+read plus a cursor update) instead of waiting on the LLM. After each take, a
+background worker checks how much unseen content the user has left. When it
+drops below LOW_WATERMARK, the worker generates another batch.
+"""
+import json
+import queue
+import threading
+from datetime import datetime
+
+from db import take_pool_content, count_pool_content_after, add_pool_content
+from llm import generate as llm_generate
+
+TYPING_TEXT = "typing_text"
+RECALL_WORDS = "recall_words"
+
+LOW_WATERMARK = 20
+REFILL_BATCH = 10
+GENERATION_TIMEOUT = 20
+
+
+def _parse_typing_text(text):
+    text = (text or "").strip()
+    return text if len(text) >= 10 else None
+
+
+def _parse_recall_words(text):
+    words = [w.strip().lower() for w in (text or "").split(",") if w.strip()]
+    return json.dumps(words) if len(words) == 5 else None
+
+
+# kind -> (prompt, parser returning the stored payload or None to discard)
+GENERATORS = {
+    TYPING_TEXT: (
+        "Generate a single short sentence (15-30 words) about a random topic for a typing test. Just the sentence, nothing else.",
+        _parse_typing_text,
+    ),
+    RECALL_WORDS: (
+        "Generate exactly 5 random common English words separated by commas. Just the words, nothing else. Example format: cat, book, tree, water, light",
+        _parse_recall_words,
+    ),
+}
+
+_REFILL_QUEUE = queue.Queue()
+_WORKER = {"thread": None}
+_WORKER_LOCK = threading.Lock()
+
+
+def take(user_id, kind):
+    """Next unseen payload for the user (decoded), or None if the pool is exhausted."""
+    # Refill checks count from the user's cursor, so an exhausted user (whose
+    # cursor is at the end of the pool) always finds it below the mark.
+    last_id, payload = take_pool_content(user_id, kind)
+    request_refill(kind, last_id)
+    if payload is None:
+        return None
+    return json.loads(payload) if kind == RECALL_WORDS else payload
+
+
+def request_refill(kind, last_id):
+    """Ask the background worker to top up kind if fewer than LOW_WATERMARK items follow last_id."""
+    _ensure_worker()
+    _REFILL_QUEUE.put((kind, last_id))
+
+
+def _ensure_worker():
+    with _WORKER_LOCK:
+        thread = _WORKER["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_refill_loop, name="content-refill", daemon=True)
+            _WORKER["thread"] = thread
+            thread.start()
+
+
+def _refill_loop():
+    while True:
+        kind, last_id = _REFILL_QUEUE.get()
+        try:
+            if count_pool_content_after(kind, last_id, LOW_WATERMARK) < LOW_WATERMARK:
+                refill(kind, REFILL_BATCH)
+                _drain(kind)
+        except Exception as exc:
+            print(f"Content refill error ({kind}): {exc}")
+
+
+def _drain(kind):
+    # Checks queued for this kind during the refill are answered by it.
+    pending = []
+    while True:
+        try:
+            item = _REFILL_QUEUE.get_nowait()
+        except queue.Empty:
+            break
+        if item[0] != kind:
+            pending.append(item)
+    for item in pending:
+        _REFILL_QUEUE.put(item)
+
+
+def refill(kind, count):
+    """Generate up to count new items of kind and add them to the pool."""
+    prompt, parse = GENERATORS[kind]
+    payloads = []
+    for _ in range(count):
+        payload = parse(llm_generate(prompt, timeout=GENERATION_TIMEOUT))
+        if payload is None:
+            # Model unavailable or returning junk; try again on the next take.
+            break
+        payloads.append(payload)
+    add_pool_content(kind, payloads, datetime.utcnow().isoformat())
+    return len(payloads)
@@ -1,18 +1,320 @@
+import json
+import os
+import random
 import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
+from flask import g, has_app_context
+
 DB_PATH = Path(__file__).parent / "app.db"
 SCHEMA_PATH = Path(__file__).parent / "schema.sql"
 
+# Opt-in WAL storage mode for running several worker processes against one
+# database file. Set MEMORY_LANE_WAL=1 or call init_db(wal=True).
+WAL_ENABLED = os.environ.get("MEMORY_LANE_WAL") == "1"
+BUSY_TIMEOUT_MS = 5000
+
+# Applied once when a connection is opened, not on every query.
+CONNECTION_PRAGMAS = (
+    ("temp_store", "MEMORY"),
+)
+WAL_PRAGMAS = (
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("cache_size", -64000),  # KiB
+    ("busy_timeout", BUSY_TIMEOUT_MS),
+)
+
+# SATURN_* keys of score.details (README_SCORING.md) exposed as virtual
+# generated columns, so queries read typed values instead of decoding the
+# JSON in Python. Rows with malformed details read NULL.
+DETAIL_COLUMNS = (
+    "SATURN_SCORE_STROOP_POINTS",
+    "SATURN_TIME_STROOP_ERRORS",
+    "SATURN_TIME_STROOP_MEAN_ms",
+    "SATURN_SCORE_RECALL_FIVEWORDS",
+    "SATURN_TIME_RECALL_FIVEWORDS_ms",
+    "SATURN_SCORE_ORIENTATION_MONTH",
+    "SATURN_SCORE_ORIENTATION_YEAR",
+    "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK",
+    "SATURN_SCORE_ORIENTATION_DATE",
+    "SATURN_SCORE_ORIENTATION_STATE",
+    "SATURN_TIME_ORIENTATION_MONTH_ms",
+    "SATURN_TIME_ORIENTATION_YEAR_ms",
+    "SATURN_TIME_ORIENTATION_DAY_OF_WEEK_ms",
+    "SATURN_TIME_ORIENTATION_DATE_ms",
+    "SATURN_MOTOR_SPEED_ms_per_button",
+)
+DETAIL_SELECT = ", ".join(DETAIL_COLUMNS)
+
+
+def _detail_columns_script(conn):
+    # No declared type, so values keep the JSON's type (int, real or text)
+    # exactly as json.loads would return them. The timing columns are indexed
+    # per game for cohort analytics (ranges, percentiles). Only missing
+    # columns are added, so the step can be re-run safely.
+    existing = {row[1] for row in conn.execute("PRAGMA table_xinfo(score)")}
+    return "".join(
+        f"""
+        ALTER TABLE score ADD COLUMN {col} GENERATED ALWAYS AS (
+          CASE WHEN json_valid(details) THEN json_extract(details, '$.{col}') END
+        ) VIRTUAL;"""
+        for col in DETAIL_COLUMNS if col not in existing
+    ) + """
+        CREATE INDEX IF NOT EXISTS idx_score_stroop_mean_ms
+          ON score (game, SATURN_TIME_STROOP_MEAN_ms);
+        CREATE INDEX IF NOT EXISTS idx_score_recall_ms
+          ON score (game, SATURN_TIME_RECALL_FIVEWORDS_ms);
+        CREATE INDEX IF NOT EXISTS idx_score_motor_speed
+          ON score (game, SATURN_MOTOR_SPEED_ms_per_button);
+    """
+
+
+# Ordered schema migrations: SQL text, or a function of the connection that
+# returns it. PRAGMA user_version records the last one applied, so each runs
+# exactly once per database file.
+MIGRATIONS = [
+    (1, """
+        CREATE INDEX IF NOT EXISTS idx_score_user_id
+          ON score (user_id, id);
+        CREATE INDEX IF NOT EXISTS idx_score_user_game_id
+          ON score (user_id, game, id);
+        CREATE INDEX IF NOT EXISTS idx_schedule_user_created
+          ON schedule (user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_orientation_question_user_active
+          ON orientation_question (user_id, active, id);
+    """),
+    # Schedules move from append-only JSON snapshots to schedule_day and
+    # schedule_item rows. Keep each user's latest snapshot, explode its days
+    # and games, and leave only the top-level fields in schedule_data.
+    (2, """
+        DELETE FROM schedule WHERE id NOT IN (
+          SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+              PARTITION BY user_id ORDER BY created_at DESC, id DESC
+            ) AS rn
+            FROM schedule
+          ) WHERE rn = 1
+        );
+        UPDATE schedule SET schedule_data = '{}' WHERE NOT json_valid(schedule_data);
+        INSERT INTO schedule_day (schedule_id, day_index, date, focus, description)
+          SELECT s.id, d.key,
+                 json_extract(d.value, '$.date'),
+                 json_extract(d.value, '$.focus'),
+                 json_extract(d.value, '$.description')
+          FROM schedule s, json_each(s.schedule_data, '$.days') d
+          WHERE json_type(s.schedule_data, '$.days') = 'array'
+            AND d.type = 'object';
+        INSERT INTO schedule_item (
+          schedule_day_id, position, game, name, minutes, reason, completed, completed_at
+        )
+          SELECT sd.id, gm.key,
+                 json_extract(gm.value, '$.id'),
+                 json_extract(gm.value, '$.name'),
+                 json_extract(gm.value, '$.minutes'),
+                 json_extract(gm.value, '$.reason'),
+                 CASE WHEN json_extract(gm.value, '$.completed') THEN 1 ELSE 0 END,
+                 json_extract(gm.value, '$.completed_at')
+          FROM schedule s
+          JOIN schedule_day sd ON sd.schedule_id = s.id,
+               json_each(s.schedule_data, '$.days[' || sd.day_index || '].games') gm
+          WHERE gm.type = 'object'
+            AND json_extract(gm.value, '$.id') IS NOT NULL;
+        UPDATE schedule SET schedule_data = json_remove(schedule_data, '$.days');
+    """),
+    # Backfill user_game_stats from the score history (two-pass variance);
+    # existing rows are overwritten, so re-running it is harmless.
+    (3, """
+        INSERT INTO user_game_stats (
+          user_id, game, domain, count, mean, m2, last_value, last_score_id, recent, updated_at
+        )
+        WITH agg AS (
+          SELECT user_id, game, COUNT(*) AS n, AVG(value) AS mean, MAX(id) AS last_id
+          FROM score GROUP BY user_id, game
+        ),
+        dev AS (
+          SELECT s.user_id, s.game, SUM((s.value - a.mean) * (s.value - a.mean)) AS m2
+          FROM score s JOIN agg a ON a.user_id = s.user_id AND a.game = s.game
+          GROUP BY s.user_id, s.game
+        ),
+        recent AS (
+          -- %!.17g keeps full float precision (json_group_array rounds to 15 digits)
+          SELECT user_id, game, '[' || group_concat(printf('%!.17g', value), ',') || ']' AS vals
+          FROM (
+            SELECT user_id, game, value
+            FROM (
+              SELECT user_id, game, value,
+                     ROW_NUMBER() OVER (PARTITION BY user_id, game ORDER BY id DESC) AS rn
+              FROM score
+            )
+            WHERE rn <= 5
+            ORDER BY user_id, game, rn
+          )
+          GROUP BY user_id, game
+        )
+        SELECT a.user_id, a.game, last.domain, a.n, a.mean, d.m2, last.value, a.last_id,
+               r.vals, last.created_at
+        FROM agg a
+        JOIN dev d ON d.user_id = a.user_id AND d.game = a.game
+        JOIN recent r ON r.user_id = a.user_id AND r.game = a.game
+        JOIN score last ON last.id = a.last_id
+        -- WHERE true lets the parser tell the upsert from a join constraint.
+        WHERE true
+        ON CONFLICT(user_id, game) DO UPDATE SET
+          domain = excluded.domain, count = excluded.count, mean = excluded.mean,
+          m2 = excluded.m2, last_value = excluded.last_value,
+          last_score_id = excluded.last_score_id, recent = excluded.recent,
+          updated_at = excluded.updated_at;
+    """),
+    (4, _detail_columns_script),
+    # Recency is created_at order: a late offline upload keeps its place in
+    # the timeline even though its ids are the newest. These replace the
+    # id-ordered indexes from migration 1.
+    (5, """
+        CREATE INDEX IF NOT EXISTS idx_score_user_created
+          ON score (user_id, created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_score_user_game_created
+          ON score (user_id, game, created_at, id);
+        DROP INDEX IF EXISTS idx_score_user_id;
+        DROP INDEX IF EXISTS idx_score_user_game_id;
+    """),
+]
+
+# Newest values kept per (user, game) in user_game_stats.recent; the
+# difficulty context tertiles are taken over this window.
+STATS_WINDOW = 5
+
+WRITE_RETRIES = 6
+WRITE_RETRY_BASE_DELAY = 0.01
+WRITE_RETRY_MAX_DELAY = 0.5
+
 
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+    """Open a new connection with the per-connection PRAGMAs applied."""
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
     conn.row_factory = sqlite3.Row
+    pragmas = CONNECTION_PRAGMAS + (WAL_PRAGMAS if WAL_ENABLED else ())
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name}={value}")
     return conn
 
 
-def init_db():
+@contextmanager
+def connection():
+    """
+    Yield the connection for the current Flask app context, opening it on
+    first use so every helper called during a request shares it.
+    Outside an app context (init_db, scripts) a short-lived connection is used.
+    """
+    if has_app_context():
+        conn = g.get("db_conn")
+        if conn is None:
+            conn = g.db_conn = get_conn()
+        yield conn
+        return
+
+    conn = get_conn()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def close_conn(exc=None):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        conn.close()
+
+
+def init_app(app):
+    app.teardown_appcontext(close_conn)
+
+
+def _is_locked(exc):
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def run_write(work):
+    """
+    Run work(conn) inside a BEGIN IMMEDIATE transaction and commit it.
+    Taking the write lock up front avoids the reader-to-writer upgrade
+    deadlock; if the lock is still contended after the busy timeout the
+    whole transaction is retried with jittered exponential backoff.
+    """
+    delay = WRITE_RETRY_BASE_DELAY
+    for attempt in range(WRITE_RETRIES + 1):
+        with connection() as conn:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                result = work(conn)
+                conn.commit()
+                return result
+            except BaseException as exc:
+                # Whatever failed, never leave the transaction (and the write
+                # lock) open on a connection the rest of the request shares.
+                if conn.in_transaction:
+                    conn.rollback()
+                if not isinstance(exc, sqlite3.OperationalError) or not _is_locked(exc) or attempt == WRITE_RETRIES:
+                    raise
+        time.sleep(delay * random.uniform(0.5, 1.5))
+        delay = min(delay * 2, WRITE_RETRY_MAX_DELAY)
+
+
+def _script_statements(script):
+    """Split a migration script into complete SQL statements."""
+    statements, pending = [], ""
+    for part in script.split(";"):
+        pending += part + ";"
+        if sqlite3.complete_statement(pending):
+            if pending.strip(" \n;"):
+                statements.append(pending)
+            pending = ""
+    return statements
+
+
+def apply_migrations(conn):
+    """
+    Apply pending MIGRATIONS, each in its own BEGIN IMMEDIATE transaction.
+    user_version is read again once the write lock is held, so when several
+    workers boot against the same file only the first applies a step and
+    the rest skip it.
+    """
+    version = 0
+    for target, script in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= target:
+                conn.rollback()
+                continue
+            if callable(script):
+                script = script(conn)
+            # executescript would commit first; run statement by statement
+            # so the step and its user_version bump commit together.
+            for statement in _script_statements(script):
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version={target}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        version = target
+    return version
+
+
+def init_db(wal=None):
+    global WAL_ENABLED
+    if wal is not None:
+        WAL_ENABLED = bool(wal)
+
     conn = get_conn()
+    if WAL_ENABLED:
+        # journal_mode is persistent in the database file
+        conn.execute("PRAGMA journal_mode=WAL")
     conn.executescript(SCHEMA_PATH.read_text())
     conn.commit()
 
@@ -43,12 +345,12 @@ def init_db():
         # Column already exists
         pass
 
+    apply_migrations(conn)
     conn.close()
 
 
 def create_user(name, email, password_hash, created_at, age=None, gender=None, gender_other=None, ethnicity=None, city=None, state=None, country=None):
-    conn = get_conn()
-    conn.execute(
+    run_write(lambda conn: conn.execute(
         """INSERT INTO user (
             name, email, password_hash, created_at, 
             age, gender, gender_other, ethnicity, 
@@ -59,76 +361,363 @@ def create_user(name, email, password_hash, created_at, age=None, gender=None, g
             age, gender, gender_other, ethnicity, 
             city, state, country
         )
-    )
-    conn.commit()
-    conn.close()
+    ))
 
 
 def get_user_by_email(email):
-    conn = get_conn()
-    row = conn.execute(
-        "SELECT * FROM user WHERE email=?",
-        (email.lower().strip(),)
-    ).fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM user WHERE email=?",
+            (email.lower().strip(),)
+        ).fetchone()
     return row
 
 
 def get_user_by_id(user_id):
-    conn = get_conn()
-    row = conn.execute("SELECT * FROM user WHERE id=?", (user_id,)).fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute("SELECT * FROM user WHERE id=?", (user_id,)).fetchone()
     return row
 
 
-def add_score(user_id, game, domain, value, created_at, details=None):
-    conn = get_conn()
-    conn.execute(
-        "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (?,?,?,?,?,?)",
-        (user_id, game, domain, float(value), created_at, details)
+def _load_game_stats(conn, user_id, games):
+    games = list(games)
+    rows = conn.execute(
+        f"""SELECT game, count, mean, m2, recent, updated_at FROM user_game_stats
+            WHERE user_id=? AND game IN ({','.join(['?'] * len(games))})""",
+        (user_id, *games)
+    ).fetchall()
+    return {
+        row["game"]: {"count": row["count"], "mean": row["mean"], "m2": row["m2"],
+                      "recent": json.loads(row["recent"]), "updated_at": row["updated_at"]}
+        for row in rows
+    }
+
+
+def _recent_game_scores(conn, user_id, game, until=None):
+    """
+    The game's newest STATS_WINDOW scores by (created_at, id), newest first,
+    optionally only those at or before until=(created_at, id).
+    """
+    bound, params = "", (user_id, game)
+    if until is not None:
+        bound, params = "AND (created_at, id) <= (?, ?)", params + tuple(until)
+    return conn.execute(
+        f"""SELECT id, domain, value, created_at FROM score
+            WHERE user_id=? AND game=? {bound}
+            ORDER BY created_at DESC, id DESC LIMIT ?""",
+        params + (STATS_WINDOW,)
+    ).fetchall()
+
+
+def _fold_game_stat(state, domain, value, score_id, created_at):
+    # Welford's online update of count/mean/m2, plus the recent-value window.
+    state = state or {"count": 0, "mean": 0.0, "m2": 0.0, "recent": []}
+    count = state["count"] + 1
+    delta = value - state["mean"]
+    mean = state["mean"] + delta / count
+    return {
+        "count": count,
+        "mean": mean,
+        "m2": state["m2"] + delta * (value - mean),
+        "recent": ([value] + state["recent"])[:STATS_WINDOW],
+        "domain": domain,
+        "last_value": value,
+        "last_score_id": score_id,
+        "updated_at": created_at,
+    }
+
+
+def _save_game_stats(conn, user_id, stats):
+    conn.executemany(
+        """INSERT INTO user_game_stats
+           (user_id, game, domain, count, mean, m2, last_value, last_score_id, recent, updated_at)
+           VALUES (?,?,?,?,?,?,?,?,?,?)
+           ON CONFLICT(user_id, game) DO UPDATE SET
+             domain=excluded.domain, count=excluded.count, mean=excluded.mean, m2=excluded.m2,
+             last_value=excluded.last_value, last_score_id=excluded.last_score_id,
+             recent=excluded.recent, updated_at=excluded.updated_at""",
+        [
+            (user_id, game, st["domain"], st["count"], st["mean"], st["m2"], st["last_value"],
+             st["last_score_id"], json.dumps(st["recent"]), st["updated_at"])
+            for game, st in stats.items()
+        ]
     )
-    conn.commit()
-    conn.close()
+
+
+def _reread_latest(conn, user_id, game, state):
+    # After folding a score older than the game's newest: the recent window
+    # and last score come from created_at order instead.
+    recent = _recent_game_scores(conn, user_id, game)
+    state.update(
+        recent=[r["value"] for r in recent], domain=recent[0]["domain"],
+        last_value=recent[0]["value"], last_score_id=recent[0]["id"], updated_at=recent[0]["created_at"],
+    )
+
+
+def add_score(user_id, game, domain, value, created_at, details=None):
+    def work(conn):
+        score_id = conn.execute(
+            "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (?,?,?,?,?,?)",
+            (user_id, game, domain, float(value), created_at, details)
+        ).lastrowid
+        state = _load_game_stats(conn, user_id, [game]).get(game)
+        folded = _fold_game_stat(state, domain, float(value), score_id, created_at)
+        if state is not None and created_at < state["updated_at"]:
+            _reread_latest(conn, user_id, game, folded)
+        _save_game_stats(conn, user_id, {game: folded})
+        # A new score makes the user's cached prediction stale
+        conn.execute("DELETE FROM prediction WHERE user_id=?", (user_id,))
+        return score_id
+
+    return run_write(work)
+
+
+def add_scores(user_id, scores, reward=None):
+    """
+    Insert a batch of scores for one user in a single transaction, in list
+    order. Each score is a dict with game, domain, value, created_at and
+    optionally details, practice_action and practice_context.
+
+    Game stats are folded in order. When a score carries a practice action
+    and context, reward(game, recent) is evaluated against that game's
+    recent values (newest first) as of that score, and the bandit update is
+    replayed in the same order. Each game is also marked completed on the
+    schedule day of its created_at. Returns the new score ids.
+
+    Recency is created_at order, not id order: when a batch reaches back
+    before a game's newest stored score (a late offline upload), that
+    game's recent values and last score are re-read by created_at, so the
+    upload takes its place in the timeline instead of becoming the latest.
+    """
+    if not scores:
+        return []
+
+    def work(conn):
+        conn.executemany(
+            "INSERT INTO score (user_id, game, domain, value, created_at, details) VALUES (?,?,?,?,?,?)",
+            [
+                (user_id, s["game"], s["domain"], float(s["value"]), s["created_at"], s.get("details"))
+                for s in scores
+            ]
+        )
+        # AUTOINCREMENT ids are consecutive inside one write transaction
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        score_ids = list(range(last_id - len(scores) + 1, last_id + 1))
+
+        stats = _load_game_stats(conn, user_id, {s["game"] for s in scores})
+        backdated = {
+            s["game"] for s in scores
+            if s["game"] in stats and s["created_at"] < stats[s["game"]]["updated_at"]
+        }
+        bandit_updates = []
+        for score_id, s in zip(score_ids, scores):
+            game = s["game"]
+            stats[game] = _fold_game_stat(stats.get(game), s["domain"], float(s["value"]), score_id, s["created_at"])
+            if game in backdated:
+                # count/mean/m2 don't depend on order; the window does.
+                stats[game]["recent"] = [
+                    r["value"] for r in _recent_game_scores(conn, user_id, game, (s["created_at"], score_id))
+                ]
+            if reward and s.get("practice_action") and s.get("practice_context"):
+                bandit_updates.append((
+                    game, s["practice_context"], s["practice_action"],
+                    reward(game, stats[game]["recent"]), s["created_at"]
+                ))
+        for game in backdated:
+            _reread_latest(conn, user_id, game, stats[game])
+        _save_game_stats(conn, user_id, stats)
+
+        conn.executemany(
+            BANDIT_UPSERT_SQL,
+            [(user_id, game, context, action, float(value), updated_at)
+             for game, context, action, value, updated_at in bandit_updates]
+        )
+
+        conn.executemany(
+            COMPLETE_SCHEDULE_GAME_SQL,
+            [(s["created_at"], s["game"], user_id, schedule_date(s["created_at"])) for s in scores]
+        )
+        conn.execute("DELETE FROM prediction WHERE user_id=?", (user_id,))
+        return score_ids
+
+    return run_write(work)
+
+
+def get_game_stats(user_id, games=None):
+    """
+    {game: {"count", "mean", "variance", "last_value", "last_score_id",
+    "recent" (newest first), "domain"}} from user_game_stats, for all of
+    the user's games or only those listed.
+    """
+    sql = "SELECT * FROM user_game_stats WHERE user_id=?"
+    params = [user_id]
+    if games is not None:
+        sql += f" AND game IN ({','.join(['?'] * len(games))})"
+        params.extend(games)
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return {
+        row["game"]: {
+            "domain": row["domain"],
+            "count": row["count"],
+            "mean": row["mean"],
+            "variance": row["m2"] / (row["count"] - 1) if row["count"] > 1 else 0.0,
+            "last_value": row["last_value"],
+            "last_score_id": row["last_score_id"],
+            "recent": json.loads(row["recent"]),
+        }
+        for row in rows
+    }
+
+
+def get_domain_averages(user_id):
+    """{domain: mean score} over all of the user's scores, from user_game_stats."""
+    with connection() as conn:
+        rows = conn.execute(
+            """SELECT domain, SUM(mean * count) / SUM(count) AS avg
+               FROM user_game_stats WHERE user_id=? GROUP BY domain""",
+            (user_id,)
+        ).fetchall()
+    return {row["domain"]: row["avg"] for row in rows}
 
 
 def get_scores(user_id, limit=20):
-    conn = get_conn()
-    rows = conn.execute(
-        "SELECT id, game, domain, value, created_at, details FROM score WHERE user_id=? ORDER BY id DESC LIMIT ?",
-        (user_id, limit)
-    ).fetchall()
-    conn.close()
+    """The user's newest scores by created_at (offline uploads can arrive late)."""
+    with connection() as conn:
+        rows = conn.execute(
+            f"""SELECT id, game, domain, value, created_at,
+                       CASE WHEN json_valid(details) THEN details END AS details,
+                       {DETAIL_SELECT}
+                FROM score WHERE user_id=? ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (user_id, limit)
+        ).fetchall()
     return rows
 
 
-def save_schedule(user_id, schedule_data, num_days, created_at):
-    """Save or update user's schedule"""
-    conn = get_conn()
+def _delete_schedules(conn, user_id):
     conn.execute(
-        "INSERT INTO schedule (user_id, schedule_data, num_days, created_at) VALUES (?,?,?,?)",
-        (user_id, schedule_data, num_days, created_at)
+        """DELETE FROM schedule_item WHERE schedule_day_id IN (
+             SELECT sd.id FROM schedule_day sd JOIN schedule s ON s.id = sd.schedule_id
+             WHERE s.user_id=?)""",
+        (user_id,)
     )
-    conn.commit()
-    conn.close()
+    conn.execute(
+        "DELETE FROM schedule_day WHERE schedule_id IN (SELECT id FROM schedule WHERE user_id=?)",
+        (user_id,)
+    )
+    conn.execute("DELETE FROM schedule WHERE user_id=?", (user_id,))
+
+
+def save_schedule(user_id, schedule_data, num_days, created_at):
+    """
+    Replace the user's schedule. schedule_data is the schedule dict; its
+    days and games go to schedule_day / schedule_item rows and the other
+    top-level fields stay as JSON on the schedule row.
+    """
+    def work(conn):
+        _delete_schedules(conn, user_id)
+        header = {k: v for k, v in schedule_data.items() if k != "days"}
+        schedule_id = conn.execute(
+            "INSERT INTO schedule (user_id, schedule_data, num_days, created_at) VALUES (?,?,?,?)",
+            (user_id, json.dumps(header), num_days, created_at)
+        ).lastrowid
+        for day_index, day in enumerate(schedule_data.get("days") or []):
+            day_id = conn.execute(
+                "INSERT INTO schedule_day (schedule_id, day_index, date, focus, description) VALUES (?,?,?,?,?)",
+                (schedule_id, day_index, day.get("date"), day.get("focus"), day.get("description"))
+            ).lastrowid
+            conn.executemany(
+                """INSERT INTO schedule_item
+                   (schedule_day_id, position, game, name, minutes, reason, completed, completed_at)
+                   VALUES (?,?,?,?,?,?,?,?)""",
+                [
+                    (day_id, position, game["id"], game.get("name"), game.get("minutes"),
+                     game.get("reason"), 1 if game.get("completed") else 0, game.get("completed_at"))
+                    for position, game in enumerate(day.get("games") or [])
+                    if isinstance(game, dict) and game.get("id")
+                ]
+            )
+        return schedule_id
+    return run_write(work)
+
+
+COMPLETE_SCHEDULE_GAME_SQL = """
+    UPDATE schedule_item SET completed=1, completed_at=?
+    WHERE game=? AND completed=0 AND schedule_day_id IN (
+      SELECT sd.id FROM schedule_day sd JOIN schedule s ON s.id = sd.schedule_id
+      WHERE s.user_id=? AND sd.date=?)
+"""
+
+
+def schedule_date(timestamp):
+    """
+    The schedule day (local date, as add_dates_to_schedule numbers them from
+    date.today()) that a naive UTC isoformat timestamp falls on.
+    """
+    utc = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc)
+    return utc.astimezone().date().isoformat()
+
+
+def complete_schedule_game(user_id, game, completed_at):
+    """Mark game completed on the schedule day of completed_at; returns rows changed."""
+    return run_write(lambda conn: conn.execute(
+        COMPLETE_SCHEDULE_GAME_SQL, (completed_at, game, user_id, schedule_date(completed_at))
+    ).rowcount)
 
 
 def get_latest_schedule(user_id):
-    """Get the latest schedule for a user"""
-    conn = get_conn()
-    row = conn.execute(
-        "SELECT * FROM schedule WHERE user_id=? ORDER BY created_at DESC LIMIT 1",
-        (user_id,)
-    ).fetchone()
-    conn.close()
-    return row
+    """
+    The user's schedule row as a dict, with schedule_data assembled back
+    into the schedule dict the templates use, or None.
+    """
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM schedule WHERE user_id=? ORDER BY created_at DESC, id DESC LIMIT 1",
+            (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        days = conn.execute(
+            "SELECT id, date, focus, description FROM schedule_day WHERE schedule_id=? ORDER BY day_index",
+            (row["id"],)
+        ).fetchall()
+        items = conn.execute(
+            """SELECT i.schedule_day_id, i.game, i.name, i.minutes, i.reason, i.completed, i.completed_at
+               FROM schedule_item i JOIN schedule_day sd ON sd.id = i.schedule_day_id
+               WHERE sd.schedule_id=? ORDER BY sd.day_index, i.position""",
+            (row["id"],)
+        ).fetchall()
+
+    try:
+        schedule_data = json.loads(row["schedule_data"])
+    except ValueError:
+        schedule_data = {}
+    games_by_day = {}
+    for item in items:
+        game = {"id": item["game"]}
+        for key in ("name", "minutes", "reason"):
+            if item[key] is not None:
+                game[key] = item[key]
+        if item["completed"]:
+            game["completed"] = True
+            if item["completed_at"] is not None:
+                game["completed_at"] = item["completed_at"]
+        games_by_day.setdefault(item["schedule_day_id"], []).append(game)
+    schedule_data["days"] = [
+        dict(
+            {k: day[k] for k in ("date", "focus", "description") if day[k] is not None},
+            games=games_by_day.get(day["id"], []),
+        )
+        for day in days
+    ]
+    return dict(row, schedule_data=schedule_data)
 
 def norm_answer(s: str) -> str:
     return (s or "").strip().lower()
 
 def update_user_profile(user_id, name, age=None, gender=None, gender_other=None,
                         ethnicity=None, city=None, state=None, country=None):
-    conn = get_conn()
-    conn.execute(
+    run_write(lambda conn: conn.execute(
         """UPDATE user
            SET name=?,
                age=?,
@@ -140,9 +729,7 @@ def update_user_profile(user_id, name, age=None, gender=None, gender_other=None,
                country=?
            WHERE id=?""",
         (name, age, gender, gender_other, ethnicity, city, state, country, user_id)
-    )
-    conn.commit()
-    conn.close()
+    ))
 
 
 def add_orientation_question(user_id, prompt, answer, created_at):
@@ -151,106 +738,277 @@ def add_orientation_question(user_id, prompt, answer, created_at):
     if not prompt or not answer_norm:
         return
 
-    conn = get_conn()
-    conn.execute(
+    run_write(lambda conn: conn.execute(
         """INSERT INTO orientation_question (user_id, prompt, answer_norm, active, created_at)
            VALUES (?,?,?,?,?)""",
         (user_id, prompt, answer_norm, 1, created_at)
-    )
-    conn.commit()
-    conn.close()
+    ))
 
 
 def get_orientation_questions(user_id, active_only=True):
-    conn = get_conn()
-    if active_only:
-        rows = conn.execute(
-            "SELECT * FROM orientation_question WHERE user_id=? AND active=1 ORDER BY id DESC",
-            (user_id,)
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            "SELECT * FROM orientation_question WHERE user_id=? ORDER BY id DESC",
-            (user_id,)
-        ).fetchall()
-    conn.close()
+    with connection() as conn:
+        if active_only:
+            rows = conn.execute(
+                "SELECT * FROM orientation_question WHERE user_id=? AND active=1 ORDER BY id DESC",
+                (user_id,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT * FROM orientation_question WHERE user_id=? ORDER BY id DESC",
+                (user_id,)
+            ).fetchall()
     return rows
 
 
 def deactivate_orientation_question(user_id, q_id):
-    conn = get_conn()
-    conn.execute(
+    run_write(lambda conn: conn.execute(
         "UPDATE orientation_question SET active=0 WHERE id=? AND user_id=?",
         (q_id, user_id)
-    )
-    conn.commit()
-    conn.close()
+    ))
 
 
 def get_orientation_questions_by_ids(user_id, ids):
     if not ids:
         return []
     placeholders = ",".join(["?"] * len(ids))
-    conn = get_conn()
-    rows = conn.execute(
-        f"""SELECT * FROM orientation_question
-            WHERE user_id=? AND active=1 AND id IN ({placeholders})""",
-        (user_id, *ids)
-    ).fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute(
+            f"""SELECT * FROM orientation_question
+                WHERE user_id=? AND active=1 AND id IN ({placeholders})""",
+            (user_id, *ids)
+        ).fetchall()
+    return rows
+
+
+def get_bandit_states(user_id):
+    """Every bandit_state arm for the user, across games and contexts."""
+    with connection() as conn:
+        rows = conn.execute(
+            """SELECT game, context, action, count, value
+               FROM bandit_state
+               WHERE user_id=?""",
+            (user_id,)
+        ).fetchall()
     return rows
 
 
 def get_bandit_state(user_id, game, context):
-    conn = get_conn()
-    rows = conn.execute(
-        """SELECT action, count, value
-           FROM bandit_state
-           WHERE user_id=? AND game=? AND context=?""",
-        (user_id, game, context)
-    ).fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute(
+            """SELECT action, count, value
+               FROM bandit_state
+               WHERE user_id=? AND game=? AND context=?""",
+            (user_id, game, context)
+        ).fetchall()
     return rows
 
 
+# One atomic statement per reward: the incremental mean is computed from the
+# stored row under the write lock, so concurrent updates can't lose a count.
+BANDIT_UPSERT_SQL = """
+    INSERT INTO bandit_state (user_id, game, context, action, count, value, updated_at)
+    VALUES (?,?,?,?,1,?,?)
+    ON CONFLICT(user_id, game, context, action) DO UPDATE SET
+      count = count + 1,
+      value = value + (excluded.value - value) / (count + 1),
+      updated_at = excluded.updated_at
+"""
+
+
 def update_bandit_state(user_id, game, context, action, reward, updated_at):
-    conn = get_conn()
-    row = conn.execute(
-        """SELECT count, value
-           FROM bandit_state
-           WHERE user_id=? AND game=? AND context=? AND action=?""",
-        (user_id, game, context, action)
-    ).fetchone()
-
-    if row:
-        count = int(row["count"]) + 1
-        value = float(row["value"])
-        new_value = value + (reward - value) / count
-        conn.execute(
-            """UPDATE bandit_state
-               SET count=?, value=?, updated_at=?
-               WHERE user_id=? AND game=? AND context=? AND action=?""",
-            (count, new_value, updated_at, user_id, game, context, action)
-        )
-    else:
-        conn.execute(
-            """INSERT INTO bandit_state
-               (user_id, game, context, action, count, value, updated_at)
-               VALUES (?,?,?,?,?,?,?)""",
-            (user_id, game, context, action, 1, float(reward), updated_at)
-        )
-    conn.commit()
-    conn.close()
+    run_write(lambda conn: conn.execute(
+        BANDIT_UPSERT_SQL, (user_id, game, context, action, float(reward), updated_at)
+    ))
+
+
+def update_bandit_states(rows):
+    """
+    Apply many rewards in one transaction, in order. rows are
+    (user_id, game, context, action, reward, updated_at) tuples.
+    """
+    rows = [(u, g, c, a, float(r), t) for u, g, c, a, r, t in rows]
+    if rows:
+        run_write(lambda conn: conn.executemany(BANDIT_UPSERT_SQL, rows))
 
 
 def get_scores_by_game(user_id, game, limit=5):
-    conn = get_conn()
-    rows = conn.execute(
-        """SELECT id, game, domain, value, created_at, details
-           FROM score
-           WHERE user_id=? AND game=?
-           ORDER BY id DESC LIMIT ?""",
-        (user_id, game, limit)
-    ).fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute(
+            """SELECT id, game, domain, value, created_at, details
+               FROM score
+               WHERE user_id=? AND game=?
+               ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (user_id, game, limit)
+        ).fetchall()
     return rows
+
+
+def iter_users(chunk_size=500):
+    """Yield lists of user rows in id order, chunk_size at a time (keyset paging)."""
+    last_id = 0
+    while True:
+        with connection() as conn:
+            rows = conn.execute(
+                """SELECT id, age, gender, ethnicity
+                   FROM user
+                   WHERE id > ?
+                   ORDER BY id LIMIT ?""",
+                (last_id, chunk_size)
+            ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+SCORE_EXPORT_COLUMNS = ("id", "user_id", "game", "domain", "value", "created_at") + DETAIL_COLUMNS + ("details",)
+
+
+def iter_scores(chunk_size=50000):
+    """
+    Yield lists of plain score tuples (SCORE_EXPORT_COLUMNS) in id order,
+    chunk_size at a time (keyset paging). details is NULL when malformed.
+    """
+    last_id = 0
+    while True:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(
+                f"""SELECT id, user_id, game, domain, value, created_at, {DETAIL_SELECT},
+                           CASE WHEN json_valid(details) THEN details END
+                    FROM score
+                    WHERE id > ?
+                    ORDER BY id LIMIT ?""",
+                (last_id, chunk_size)
+            ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def get_latest_scores_for_users(user_ids, games, window):
+    """
+    Latest score per (user, game) among each user's newest window scores
+    (what the dashboard builds features from), for a chunk of users, with the
+    DETAIL_COLUMNS values, plus the highest score id in each user's window
+    (the prediction cache key). Returns ({user_id: [rows]}, {user_id: max_id}).
+    """
+    if not user_ids:
+        return {}, {}
+    user_marks = ",".join(["?"] * len(user_ids))
+    wanted = set(games)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # Each user's window, newest first by created_at as get_scores orders
+        # it, ranked from the (user_id, game, created_at, id) index alone.
+        ranked = cursor.execute(
+            f"""SELECT user_id, id, game FROM (
+                    SELECT user_id, id, game,
+                           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS rn
+                    FROM score
+                    WHERE user_id IN ({user_marks})
+                )
+                WHERE rn <= ?
+                ORDER BY user_id, rn""",
+            (*user_ids, window)
+        ).fetchall()
+
+        max_ids, picked = {}, {}
+        for user_id, score_id, game in ranked:
+            max_ids[user_id] = max(max_ids.get(user_id, 0), score_id)
+            if game in wanted:
+                picked.setdefault((user_id, game), score_id)
+        # Only the winning rows are read from the table.
+        rows = conn.execute(
+            f"""SELECT user_id, id, game, {DETAIL_SELECT}
+                FROM score
+                WHERE id IN (SELECT value FROM json_each(?))
+                ORDER BY user_id, created_at DESC, id DESC""",
+            (json.dumps(list(picked.values())),)
+        ).fetchall()
+
+    latest = {}
+    for row in rows:
+        latest.setdefault(row["user_id"], []).append(row)
+    return latest, max_ids
+
+
+def save_predictions(rows):
+    """rows: iterable of (user_id, score_id, model_version, pred, probability, created_at)"""
+    rows = list(rows)
+    if not rows:
+        return
+    run_write(lambda conn: conn.executemany(
+        """INSERT INTO prediction (user_id, score_id, model_version, pred, probability, created_at)
+           VALUES (?,?,?,?,?,?)
+           ON CONFLICT(user_id) DO UPDATE SET
+             score_id=excluded.score_id,
+             model_version=excluded.model_version,
+             pred=excluded.pred,
+             probability=excluded.probability,
+             created_at=excluded.created_at""",
+        rows
+    ))
+
+
+def get_prediction(user_id):
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT score_id, model_version, pred, probability, created_at FROM prediction WHERE user_id=?",
+            (user_id,)
+        ).fetchone()
+    return row
+
+
+def take_pool_content(user_id, kind):
+    """
+    Next pooled item of kind this user has not seen, advancing their cursor.
+    Pool ids only grow, so everything at or below the cursor counts as seen.
+    Returns (cursor, payload): the user's cursor after the take and the item's
+    payload, or their unchanged cursor and None when they have exhausted the pool.
+    """
+    def work(conn):
+        cursor = conn.execute(
+            "SELECT last_id FROM content_cursor WHERE user_id=? AND kind=?",
+            (user_id, kind)
+        ).fetchone()
+        last_id = cursor["last_id"] if cursor else 0
+        row = conn.execute(
+            "SELECT id, payload FROM content_pool WHERE kind=? AND id > ? ORDER BY id LIMIT 1",
+            (kind, last_id)
+        ).fetchone()
+        if row is None:
+            return last_id, None
+        conn.execute(
+            """INSERT INTO content_cursor (user_id, kind, last_id) VALUES (?,?,?)
+               ON CONFLICT(user_id, kind) DO UPDATE SET last_id=excluded.last_id""",
+            (user_id, kind, row["id"])
+        )
+        return row["id"], row["payload"]
+
+    return run_write(work)
+
+
+def count_pool_content_after(kind, last_id, limit):
+    """Unseen items after last_id, counted only up to limit."""
+    with connection() as conn:
+        row = conn.execute(
+            """SELECT COUNT(*) FROM (
+                   SELECT 1 FROM content_pool WHERE kind=? AND id > ? LIMIT ?
+               )""",
+            (kind, last_id, limit)
+        ).fetchone()
+    return row[0]
+
+
+def add_pool_content(kind, payloads, created_at):
+    payloads = list(payloads)
+    if not payloads:
+        return
+    run_write(lambda conn: conn.executemany(
+        "INSERT INTO content_pool (kind, payload, created_at) VALUES (?,?,?)",
+        [(kind, payload, created_at) for payload in payloads]
+    ))
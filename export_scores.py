@@ -0,0 +1,183 @@
+"""
+Columnar export of the score history for analytics.
+
+Streams score in id order, chunk by chunk, and writes Hive-partitioned
+Parquet that pandas, pyarrow, DuckDB or Spark read as one dataset:
+
+    <out>/game=stroop/month=2026-01/part-0.parquet
+
+The SATURN_* values come from score's generated columns (db.DETAIL_COLUMNS)
+as float64, with text that is not a number read as null (pd.to_numeric's
+errors="coerce"). The raw details JSON is kept for the other fields.
+
+Memory does not grow with the table: rows are buffered per partition and written as a row
+group once ROW_GROUP_ROWS are waiting, the largest buffers are written
+whenever MAX_BUFFERED_ROWS are held in total, and at most MAX_OPEN_WRITERS
+files are open (a partition that comes back after its file was closed
+continues in part-1, part-2, ...). Needs pyarrow, which the app itself does
+not.
+
+    python export_scores.py exports/scores --chunk-size 10000
+"""
+import argparse
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from db import DETAIL_COLUMNS, SCORE_EXPORT_COLUMNS, init_db, iter_scores
+
+# Peak memory is roughly one chunk of Python rows, MAX_BUFFERED_ROWS of Arrow
+# data and MAX_OPEN_WRITERS open files' encoders; see RUNNING_APP.md for
+# what these defaults measure at.
+CHUNK_SIZE = 10000
+ROW_GROUP_ROWS = 64 * 1024
+MAX_BUFFERED_ROWS = 64 * 1024
+MAX_OPEN_WRITERS = 8
+
+MONTH_PATTERN = r"^\d{4}-\d{2}"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except Exception:
+        return None, None, None
+    return pa, pc, pq
+
+
+def _to_float(value):
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+class PartitionedWriter:
+    """Buffers Arrow tables per (game, month) and writes them as Parquet."""
+
+    def __init__(self, out_dir, schema, pa, pq):
+        self.out_dir = Path(out_dir)
+        self.schema = schema
+        self.pa = pa
+        self.pq = pq
+        self.buffers = {}  # key -> [tables]
+        self.buffered = {}  # key -> rows
+        self.writers = {}  # key -> ParquetWriter, least recently written first
+        self.parts = {}  # key -> files started
+        self.files = 0
+
+    def add(self, key, table):
+        self.buffers.setdefault(key, []).append(table)
+        self.buffered[key] = self.buffered.get(key, 0) + table.num_rows
+        if self.buffered[key] >= ROW_GROUP_ROWS:
+            self._write(key)
+        while sum(self.buffered.values()) > MAX_BUFFERED_ROWS:
+            self._write(max(self.buffered, key=self.buffered.get))
+
+    def _writer(self, key):
+        writer = self.writers.pop(key, None)
+        if writer is None:
+            while len(self.writers) >= MAX_OPEN_WRITERS:
+                oldest = next(iter(self.writers))
+                self._write(oldest)
+                self.writers.pop(oldest).close()
+            game, month = key
+            part = self.parts.get(key, 0)
+            self.parts[key] = part + 1
+            path = self.out_dir / f"game={quote(game, safe='')}" / f"month={month}" / f"part-{part}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            writer = self.pq.ParquetWriter(path, self.schema)
+            self.files += 1
+        self.writers[key] = writer
+        return writer
+
+    def _write(self, key):
+        tables = self.buffers.pop(key, None)
+        self.buffered.pop(key, None)
+        if not tables:
+            return
+        self._writer(key).write_table(self.pa.concat_tables(tables), row_group_size=ROW_GROUP_ROWS)
+
+    def close(self):
+        for key in list(self.buffers):
+            self._write(key)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+
+def _chunk_table(pa, schema, rows):
+    """(table, game array) for one chunk of db.iter_scores rows."""
+    columns = dict(zip(SCORE_EXPORT_COLUMNS, zip(*rows)))
+    games = pa.array(columns.pop("game"), type=pa.string())
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        try:
+            arrays.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            if field.type != pa.float64():
+                raise
+            # Mixed JSON types (e.g. "1" next to 1): coerce value by value.
+            arrays.append(pa.array([_to_float(v) for v in values], type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema), games
+
+
+def export_scores(out_dir, chunk_size=CHUNK_SIZE):
+    """Write every score to out_dir as partitioned Parquet. Returns (rows, files)."""
+    pa, pc, pq = _import_pyarrow()
+    if pa is None:
+        raise SystemExit("pyarrow is required: pip install pyarrow")
+    out_dir = Path(out_dir)
+    if out_dir.exists() and any(out_dir.iterdir()):
+        raise SystemExit(f"{out_dir} is not empty")
+
+    # game is the partition column, so it is not repeated inside the files.
+    schema = pa.schema(
+        [("id", pa.int64()), ("user_id", pa.int64()), ("domain", pa.string()),
+         ("value", pa.float64()), ("created_at", pa.string())]
+        + [(col, pa.float64()) for col in DETAIL_COLUMNS]
+        + [("details", pa.string())]
+    )
+
+    writer = PartitionedWriter(out_dir, schema, pa, pq)
+    total = 0
+    try:
+        for rows in iter_scores(chunk_size):
+            table, games = _chunk_table(pa, schema, rows)
+            created = table["created_at"]
+            months = pc.if_else(
+                pc.match_substring_regex(created, MONTH_PATTERN),
+                pc.utf8_slice_codeunits(created, 0, 7),
+                "unknown",
+            )
+            keys = pa.table({"game": games, "month": months}).group_by(["game", "month"]).aggregate([])
+            for game, month in zip(keys["game"].to_pylist(), keys["month"].to_pylist()):
+                mask = pc.and_(pc.equal(games, game), pc.equal(months, month))
+                writer.add((game, month), table.filter(mask))
+            total += len(rows)
+    finally:
+        writer.close()
+    return total, writer.files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the score table to partitioned Parquet.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    start = time.perf_counter()
+    rows, files = export_scores(args.out_dir, args.chunk_size)
+    print(f"Exported {rows} scores to {files} files in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
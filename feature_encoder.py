@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+
+from tree_ensemble import TreeEnsemble
+
+# Up to this many rows the compiled trees beat the classifier's own
+# predict_proba; past it XGBoost's and scikit-learn's batch loops win.
+COMPILED_TREES_MAX_ROWS = 32
+
+
+class FeatureEncoder:
+    """
+    Compiled form of the fitted ColumnTransformer in best_model.joblib.
+
+    The imputer statistics, scaler parameters and one-hot categories are read
+    once from the pipeline so a feature dict can be turned straight into the
+    classifier's input vector, without building a pandas DataFrame. Only the
+    layout the training notebook produces is supported: numeric columns
+    through SimpleImputer + StandardScaler and categorical columns through
+    SimpleImputer(most_frequent) + OneHotEncoder(handle_unknown="ignore").
+    Anything else raises ValueError so callers can fall back to the pipeline.
+
+    Tree classifiers are also compiled (tree_ensemble.TreeEnsemble), so
+    small requests skip the classifier's per-call overhead as well.
+    """
+
+    def __init__(self, pipeline):
+        preprocess = pipeline.steps[0][1]
+        self.classifier = pipeline.steps[-1][1]
+        self.classes = np.asarray(pipeline.classes_)
+
+        if getattr(preprocess, "sparse_output_", False):
+            raise ValueError("sparse ColumnTransformer output is not supported")
+
+        self.numeric = []      # (column, fill, mean, scale, out_index)
+        self.categorical = []  # (column, fill, {category: out_index})
+        offset = 0
+        for name, transformer, columns in preprocess.transformers_:
+            if transformer == "drop" or name == "remainder":
+                continue
+            steps = dict(transformer.named_steps)
+            if "scaler" in steps:
+                offset = self._compile_numeric(steps, columns, offset)
+            elif "onehot" in steps:
+                offset = self._compile_categorical(steps, columns, offset)
+            else:
+                raise ValueError(f"unsupported transformer: {name}")
+        self.width = offset
+
+        try:
+            self.trees = TreeEnsemble(self.classifier)
+        except Exception as exc:
+            print(f"Compiled trees unavailable, using {type(self.classifier).__name__}: {exc}")
+            self.trees = None
+
+    def _compile_numeric(self, steps, columns, offset):
+        imputer, scaler = steps.get("imputer"), steps["scaler"]
+        if imputer is None or imputer.strategy not in ("mean", "median", "constant"):
+            raise ValueError("numeric columns need a mean/median/constant imputer")
+        stats = np.asarray(imputer.statistics_, dtype=float)
+        if np.isnan(stats).any():
+            raise ValueError("imputer dropped empty features")
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(len(columns))
+        scale = scaler.scale_ if scaler.with_std else np.ones(len(columns))
+        for i, col in enumerate(columns):
+            self.numeric.append((col, float(stats[i]), float(mean[i]), float(scale[i]), offset + i))
+        return offset + len(columns)
+
+    def _compile_categorical(self, steps, columns, offset):
+        imputer, onehot = steps.get("imputer"), steps["onehot"]
+        if imputer is None or imputer.strategy != "most_frequent":
+            raise ValueError("categorical columns need a most_frequent imputer")
+        if onehot.handle_unknown != "ignore" or onehot.drop_idx_ is not None:
+            raise ValueError("one-hot encoder must use handle_unknown='ignore' and no drop")
+        for col, fill, categories in zip(columns, imputer.statistics_, onehot.categories_):
+            lookup = {cat: offset + j for j, cat in enumerate(categories.tolist())}
+            self.categorical.append((col, fill, lookup))
+            offset += len(categories)
+        return offset
+
+    def transform(self, rows):
+        """Encode a list of feature dicts into a (len(rows), width) float array."""
+        out = np.zeros((len(rows), self.width))
+        for r, data in enumerate(rows):
+            target = out[r]
+            for col, fill, mean, scale, idx in self.numeric:
+                value = data.get(col)
+                value = fill if value is None else float(value)
+                if math.isnan(value):
+                    value = fill
+                target[idx] = (value - mean) / scale
+            for col, fill, lookup in self.categorical:
+                value = data.get(col)
+                # SimpleImputer only treats NaN as missing in object columns;
+                # None passes through and is unknown to the one-hot encoder.
+                if isinstance(value, float) and math.isnan(value):
+                    value = fill
+                idx = lookup.get(value)
+                if idx is not None:
+                    target[idx] = 1.0
+        return out
+
+    def predict(self, rows):
+        """[(pred, proba)] per row, matching ml.predict_labels on the full pipeline."""
+        X = self.transform(rows)
+        if not hasattr(self.classifier, "predict_proba"):
+            return [(int(p), None) for p in self.classifier.predict(X)]
+        if self.trees is not None and len(X) <= COMPILED_TREES_MAX_ROWS:
+            proba = self.trees.predict_proba(X)
+        else:
+            proba = self.classifier.predict_proba(X)
+        return [(int(self.classes[row.argmax()]), float(row[1])) for row in proba]
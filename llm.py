@@ -0,0 +1,79 @@
+"""
+Bounded, deadline-aware access to the local Ollama model.
+
+Generation runs on a small worker pool instead of the Flask request thread.
+Each call has a deadline, and the pool never queues more calls than it has
+workers. A slow or saturated model therefore makes callers fall back
+quickly instead of tying up every worker.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+LLM_MODEL = os.environ.get("MEMORY_LANE_LLM_MODEL", "mistral")
+LLM_WORKERS = int(os.environ.get("MEMORY_LANE_LLM_WORKERS", "4"))
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+_SLOTS = threading.BoundedSemaphore(LLM_WORKERS)
+
+
+@lru_cache(maxsize=8)
+def _client(timeout):
+    import ollama
+    # The HTTP timeout frees the worker thread soon after the caller gives up.
+    return ollama.Client(timeout=timeout)
+
+
+def _generate(prompt, timeout, options):
+    response = _client(timeout).generate(model=LLM_MODEL, prompt=prompt, stream=False, **options)
+    return (response.get("response") or "").strip()
+
+
+def generate(prompt, timeout, **options):
+    """
+    Response text for prompt, or None if the model errors, misses the
+    deadline (seconds), or every worker is already busy.
+    """
+    if not _SLOTS.acquire(blocking=False):
+        print("LLM busy: all workers in use")
+        return None
+    try:
+        future = _EXECUTOR.submit(_generate, prompt, timeout, options)
+    except Exception:
+        _SLOTS.release()
+        raise
+    future.add_done_callback(lambda _: _SLOTS.release())
+
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        print(f"LLM timeout after {timeout}s")
+        return None
+    except Exception as e:
+        print(f"LLM Error: {e}")
+        return None
+
+
+def stream(prompt, timeout, **options):
+    """
+    Yield response text chunks for prompt as the model produces them. Stops
+    early on error or once the deadline (seconds) passes, and yields nothing
+    if every worker is already busy. The caller's thread drives the stream,
+    but it still holds one of the LLM_WORKERS slots until it finishes.
+    """
+    if not _SLOTS.acquire(blocking=False):
+        print("LLM busy: all workers in use")
+        return
+    deadline = time.monotonic() + timeout
+    try:
+        for part in _client(timeout).generate(model=LLM_MODEL, prompt=prompt, stream=True, **options):
+            yield part.get("response") or ""
+            if time.monotonic() > deadline:
+                print(f"LLM stream timeout after {timeout}s")
+                break
+    except Exception as e:
+        print(f"LLM Error: {e}")
+    finally:
+        _SLOTS.release()
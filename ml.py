@@ -0,0 +1,396 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import model_registry
+from db import get_prediction, save_predictions
+
+# When app.py starts the model load: "background" (thread at import),
+# "eager" (block at import, e.g. before a gunicorn --preload fork so workers
+# share the loaded pages) or "off" (first dashboard miss starts it).
+MODEL_PRELOAD = os.environ.get("MEMORY_LANE_MODEL_PRELOAD", "background")
+
+# Seconds between checks of the model registry for a new active version.
+MODEL_RELOAD_INTERVAL = 5.0
+
+# Games whose latest SATURN_* values feed the classifier.
+FEATURE_GAMES = ["stroop", "orientation", "recall", "tapping"]
+
+# Features come from the latest score per game among the user's newest
+# FEATURE_SCORE_WINDOW scores, on the dashboard and in batch_predict alike:
+# both cache predictions under the same (user, highest score id in the
+# window, model) key.
+FEATURE_SCORE_WINDOW = 30
+
+FEATURE_COLS = [
+    "AGE",
+    "AUTO_LEGAL_SEX",
+    "RACE_ETHNICITY",
+    "YR_EDU_num",
+    "SATURN_SCORE_STROOP_POINTS",
+    "SATURN_TIME_STROOP_ERRORS",
+    "SATURN_TIME_STROOP_MEAN_ms",
+    "MoCA_1_SCORE_orientation",
+    "SATURN_SCORE_ORIENTATION_MONTH",
+    "SATURN_SCORE_ORIENTATION_YEAR",
+    "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK",
+    "SATURN_SCORE_ORIENTATION_STATE",
+    "SATURN_SCORE_RECALL_FIVEWORDS",
+    "SATURN_TIME_RECALL_FIVEWORDS_ms",
+    "MoCA_1_SCORE_recall",
+    "SATURN_MOTOR_SPEED_ms_per_button",
+    "MoCA_1_SCORE_fluency",
+]
+
+# "current" is a (model, version) tuple once the first load has finished, so
+# readers always see a model together with the version that produced it.
+_MODEL_CACHE = {"current": None}
+_MODEL_LOCK = threading.Lock()
+_PRELOAD = {"thread": None}
+_PRELOAD_LOCK = threading.Lock()
+_RELOAD = {"checked_at": 0.0, "thread": None, "failed": None}
+_ENCODER_CACHE = {"model": None, "encoder": None}
+
+# user_id -> ((score_id, model_version), prediction); mirrors the prediction table
+PREDICTION_CACHE_SIZE = 4096
+_PREDICTION_CACHE = OrderedDict()
+_PREDICTION_LOCK = threading.Lock()
+
+
+def _import_pandas():
+    # pandas/joblib are only needed on a prediction cache miss
+    try:
+        import pandas as pd
+    except Exception:
+        return None
+    return pd
+
+
+def _load_entry(entry):
+    model = model_registry.load_artifact(entry)
+    expected = entry.get("feature_cols") or []
+    produced = set(FEATURE_COLS) | {f"{col}_missing" for col in FEATURE_COLS}
+    unknown = sorted(set(expected) - produced)
+    if unknown:
+        raise ValueError(f"model {entry['version']} expects features the app does not build: {unknown}")
+    _warm_up(model)
+    return model
+
+
+def _current_model():
+    """(model, version) after the first load, loading the active version if needed."""
+    current = _MODEL_CACHE["current"]
+    if current is not None:
+        return current
+    with _MODEL_LOCK:
+        if _MODEL_CACHE["current"] is None:
+            model = version = None
+            try:
+                entry = model_registry.active_entry()
+                if entry is not None:
+                    model = _load_entry(entry)
+                    version = entry["version"]
+            except Exception as exc:
+                print(f"Model load error: {exc}")
+                model = version = None
+            _MODEL_CACHE["current"] = (model, version)
+    return _MODEL_CACHE["current"]
+
+
+def load_ml_model():
+    """Load the active model once per process; blocks while another thread is loading it."""
+    return _current_model()[0]
+
+
+def model_version():
+    """Version of the model serving predictions (the registry's active one before the first load)."""
+    current = _MODEL_CACHE["current"]
+    if current is not None and current[1] is not None:
+        return current[1]
+    entry = model_registry.active_entry()
+    return entry["version"] if entry else None
+
+
+def check_model_update():
+    """
+    Rate-limited check for a newly activated registry version. The new model is
+    loaded and warmed up in a background thread while requests keep using the
+    current one, then swapped in with a single assignment.
+    """
+    now = time.monotonic()
+    if _MODEL_CACHE["current"] is None or now - _RELOAD["checked_at"] < MODEL_RELOAD_INTERVAL:
+        return
+    _RELOAD["checked_at"] = now
+    try:
+        entry = model_registry.active_entry()
+    except Exception as exc:
+        print(f"Model registry error: {exc}")
+        return
+    if entry is None or entry["version"] in (_MODEL_CACHE["current"][1], _RELOAD["failed"]):
+        return
+    with _PRELOAD_LOCK:
+        thread = _RELOAD["thread"]
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_swap_model, args=(entry,), name="model-reload", daemon=True)
+        _RELOAD["thread"] = thread
+    thread.start()
+
+
+def _swap_model(entry):
+    try:
+        model = _load_entry(entry)
+    except Exception as exc:
+        print(f"Model reload error ({entry['version']}): {exc}")
+        _RELOAD["failed"] = entry["version"]
+        return
+    _MODEL_CACHE["current"] = (model, entry["version"])
+
+
+def _warm_up(model):
+    # Compile the feature encoder and push one row through the classifier so
+    # the first real request does not pay for lazy initialisation.
+    try:
+        predict_rows(model, [build_feature_dict({}, [])])
+    except Exception as exc:
+        print(f"Model warm-up error: {exc}")
+
+
+def model_ready():
+    return _MODEL_CACHE["current"] is not None
+
+
+def preload_model(background=True):
+    """Start loading the model ahead of the first request that needs it."""
+    if model_ready():
+        return
+    if not background:
+        load_ml_model()
+        return
+    with _PRELOAD_LOCK:
+        if _PRELOAD["thread"] is not None or model_ready():
+            return
+        thread = threading.Thread(target=load_ml_model, name="model-preload", daemon=True)
+        _PRELOAD["thread"] = thread
+    thread.start()
+
+
+def start_model_preload():
+    if MODEL_PRELOAD == "eager":
+        preload_model(background=False)
+    elif MODEL_PRELOAD == "background":
+        preload_model()
+
+
+def _reset_after_fork():
+    # Threads do not survive fork(): if a preload was still running in the
+    # parent, let the child start its own instead of waiting on it forever.
+    global _MODEL_LOCK, _PRELOAD_LOCK
+    _MODEL_LOCK = threading.Lock()
+    _PRELOAD_LOCK = threading.Lock()
+    _PRELOAD["thread"] = None
+    _RELOAD["thread"] = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_feature_encoder(model):
+    """FeatureEncoder compiled from model's preprocessing, or None if unsupported."""
+    if _ENCODER_CACHE["model"] is not model:
+        try:
+            from feature_encoder import FeatureEncoder
+            encoder = FeatureEncoder(model)
+        except Exception as exc:
+            print(f"Feature encoder unavailable, using pipeline: {exc}")
+            encoder = None
+        _ENCODER_CACHE["model"] = model
+        _ENCODER_CACHE["encoder"] = encoder
+    return _ENCODER_CACHE["encoder"]
+
+
+def map_gender_to_legal_sex(gender):
+    if not gender:
+        return None
+    g = str(gender).strip().lower()
+    if g.startswith("m"):
+        return "M"
+    if g.startswith("f"):
+        return "W"
+    return None
+
+
+def extract_latest_by_game(scores):
+    latest = {}
+    for s in scores:
+        game = s.get("game")
+        if game and game not in latest:
+            latest[game] = s
+    return latest
+
+
+def build_feature_dict(user, scores):
+    """
+    One model input row as a dict: FEATURE_COLS plus *_missing indicators.
+    scores are newest-first score rows carrying game and the SATURN_* values
+    (db.DETAIL_COLUMNS), as get_scores and get_latest_scores_for_users return.
+    """
+    latest = extract_latest_by_game(scores)
+
+    def get_detail(game_id, key):
+        return (latest.get(game_id) or {}).get(key)
+
+    # General demographics
+    age = user["age"] if user and user.get("age") not in ("", None) else None
+    legal_sex = map_gender_to_legal_sex(user.get("gender") if user else None)
+    race_eth = user.get("ethnicity") if user else None
+
+    # Orientation score proxy (sum device items)
+    orient_device_score = 0
+    orient_keys = [
+        "SATURN_SCORE_ORIENTATION_MONTH",
+        "SATURN_SCORE_ORIENTATION_YEAR",
+        "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK",
+        "SATURN_SCORE_ORIENTATION_DATE",
+    ]
+    for k in orient_keys:
+        val = get_detail("orientation", k)
+        if isinstance(val, (int, float)):
+            orient_device_score += int(val)
+
+    data = {
+        "AGE": age,
+        "AUTO_LEGAL_SEX": legal_sex,
+        "RACE_ETHNICITY": race_eth,
+        "YR_EDU_num": None,
+        "SATURN_SCORE_STROOP_POINTS": get_detail("stroop", "SATURN_SCORE_STROOP_POINTS"),
+        "SATURN_TIME_STROOP_ERRORS": get_detail("stroop", "SATURN_TIME_STROOP_ERRORS"),
+        "SATURN_TIME_STROOP_MEAN_ms": get_detail("stroop", "SATURN_TIME_STROOP_MEAN_ms"),
+        "MoCA_1_SCORE_orientation": orient_device_score if orient_device_score > 0 else None,
+        "SATURN_SCORE_ORIENTATION_MONTH": get_detail("orientation", "SATURN_SCORE_ORIENTATION_MONTH"),
+        "SATURN_SCORE_ORIENTATION_YEAR": get_detail("orientation", "SATURN_SCORE_ORIENTATION_YEAR"),
+        "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK": get_detail("orientation", "SATURN_SCORE_ORIENTATION_DAY_OF_WEEK"),
+        "SATURN_SCORE_ORIENTATION_STATE": get_detail("orientation", "SATURN_SCORE_ORIENTATION_STATE"),
+        "SATURN_SCORE_RECALL_FIVEWORDS": get_detail("recall", "SATURN_SCORE_RECALL_FIVEWORDS"),
+        "SATURN_TIME_RECALL_FIVEWORDS_ms": get_detail("recall", "SATURN_TIME_RECALL_FIVEWORDS_ms"),
+        "MoCA_1_SCORE_recall": get_detail("recall", "SATURN_SCORE_RECALL_FIVEWORDS"),
+        "SATURN_MOTOR_SPEED_ms_per_button": get_detail("tapping", "SATURN_MOTOR_SPEED_ms_per_button"),
+        "MoCA_1_SCORE_fluency": None,
+    }
+
+    # Add missingness indicators
+    for col in FEATURE_COLS:
+        data[f"{col}_missing"] = 1 if data.get(col) is None else 0
+
+    return data
+
+
+def build_feature_row(user, scores):
+    pd = _import_pandas()
+    if not pd:
+        return None
+    return pd.DataFrame([build_feature_dict(user, scores)])
+
+
+def build_feature_frame(rows):
+    """
+    Stack feature dicts into one frame for batch scoring. dtype=object keeps
+    None as None per cell, so each row encodes exactly as it would in a
+    one-row frame from build_feature_row.
+    """
+    pd = _import_pandas()
+    if not pd:
+        return None
+    columns = FEATURE_COLS + [f"{col}_missing" for col in FEATURE_COLS]
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+
+def predict_labels(model, features):
+    """
+    Run the model once over a feature frame and return [(pred, proba)] per row.
+    The class label is taken from predict_proba's argmax rather than a second
+    predict() pass through the pipeline.
+    """
+    if not hasattr(model, "predict_proba"):
+        return [(int(p), None) for p in model.predict(features)]
+    proba = model.predict_proba(features)
+    classes = model.classes_
+    return [(int(classes[row.argmax()]), float(row[1])) for row in proba]
+
+
+def predict_rows(model, rows):
+    """
+    [(pred, proba)] for a list of feature dicts. Uses the compiled feature
+    encoder when the pipeline supports it and the pandas pipeline otherwise.
+    """
+    encoder = get_feature_encoder(model)
+    if encoder is not None:
+        return encoder.predict(rows)
+    return predict_labels(model, build_feature_frame(rows))
+
+
+def describe_prediction(pred, proba):
+    color = "indigo"
+    if proba is not None:
+        if proba < 0.33:
+            color = "emerald"
+        elif proba < 0.66:
+            color = "amber"
+        else:
+            color = "rose"
+    return {
+        "label": "abnormal" if pred == 1 else "normal",
+        "probability": proba,
+        "color": color
+    }
+
+
+def _remember_prediction(user_id, key, prediction):
+    with _PREDICTION_LOCK:
+        _PREDICTION_CACHE[user_id] = (key, prediction)
+        _PREDICTION_CACHE.move_to_end(user_id)
+        while len(_PREDICTION_CACHE) > PREDICTION_CACHE_SIZE:
+            _PREDICTION_CACHE.popitem(last=False)
+
+
+def get_cached_prediction(user_id, score_id):
+    """
+    Prediction for (user_id, score_id, current model version) from the
+    in-process LRU, falling back to the prediction table. Never touches
+    pandas or the model; returns None on a miss.
+    """
+    key = (score_id, model_version())
+    with _PREDICTION_LOCK:
+        hit = _PREDICTION_CACHE.get(user_id)
+        if hit is not None and hit[0] == key:
+            _PREDICTION_CACHE.move_to_end(user_id)
+            return hit[1]
+
+    row = get_prediction(user_id)
+    if row is None or (row["score_id"], row["model_version"]) != key:
+        return None
+    prediction = describe_prediction(row["pred"], row["probability"])
+    _remember_prediction(user_id, key, prediction)
+    return prediction
+
+
+def predict_for_user(user, scores, score_id, created_at):
+    """
+    Score one user with the serving model and cache the result under that
+    model's version. Returns None when no model is available.
+    """
+    model, version = _current_model()
+    if model is None:
+        return None
+    pred, proba = predict_rows(model, [build_feature_dict(user, scores)])[0]
+    prediction = describe_prediction(pred, proba)
+    save_predictions([(user["id"], score_id, version, pred, proba, created_at)])
+    _remember_prediction(user["id"], (score_id, version), prediction)
+    return prediction
+
+
+def invalidate_prediction(user_id):
+    with _PREDICTION_LOCK:
+        _PREDICTION_CACHE.pop(user_id, None)
@@ -0,0 +1,177 @@
+"""
+Versioned model artifacts for the risk classifier.
+
+ml-models/registry.json lists every registered artifact with its checksum
+and the feature columns it expects, plus which version is active:
+
+    {"active": "v2",
+     "versions": {"v2": {"path": "versions/v2.joblib", "sha256": "...",
+                         "feature_cols": [...], "created_at": "..."}}}
+
+Without a registry.json the single ml-models/best_model.joblib is the active
+version, named after the first 12 characters of its checksum. The manifest
+is replaced atomically, and workers pick up a new active version on their
+next mtime check (see ml.check_model_update).
+
+    python model_registry.py list
+    python model_registry.py register path/to/model.joblib --version v2 --activate
+    python model_registry.py activate v2
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+MODELS_DIR = Path(__file__).parent / "ml-models"
+REGISTRY_PATH = MODELS_DIR / "registry.json"
+DEFAULT_ARTIFACT = MODELS_DIR / "best_model.joblib"
+VERSIONS_DIR = MODELS_DIR / "versions"
+
+_SHA_CACHE = {}
+_REGISTRY_CACHE = {"key": None, "registry": None}
+
+
+def file_sha256(path):
+    """sha256 of a file, cached until its mtime or size changes."""
+    stat = os.stat(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _SHA_CACHE:
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        _SHA_CACHE[key] = digest.hexdigest()
+    return _SHA_CACHE[key]
+
+
+def _default_registry():
+    if not DEFAULT_ARTIFACT.exists():
+        return {"active": None, "versions": {}}
+    sha = file_sha256(DEFAULT_ARTIFACT)
+    version = sha[:12]
+    return {
+        "active": version,
+        "versions": {
+            version: {"path": DEFAULT_ARTIFACT.name, "sha256": sha, "feature_cols": None}
+        },
+    }
+
+
+def read_registry():
+    if not REGISTRY_PATH.exists():
+        return _default_registry()
+    stat = REGISTRY_PATH.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _REGISTRY_CACHE["key"] != key:
+        _REGISTRY_CACHE["registry"] = json.loads(REGISTRY_PATH.read_text())
+        _REGISTRY_CACHE["key"] = key
+    return _REGISTRY_CACHE["registry"]
+
+
+def write_registry(registry):
+    # Write a temp file and rename it over the manifest so readers only ever
+    # see the old or the new registry, never a partial one.
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=MODELS_DIR, prefix=".registry-", suffix=".json")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(registry, fh, indent=2)
+    os.replace(tmp, REGISTRY_PATH)
+
+
+def active_entry():
+    """The active version's entry (with its "version" key), or None."""
+    registry = read_registry()
+    version = registry.get("active")
+    entry = registry.get("versions", {}).get(version)
+    if entry is None:
+        return None
+    return dict(entry, version=version)
+
+
+def artifact_path(entry):
+    return MODELS_DIR / entry["path"]
+
+
+def load_artifact(entry):
+    """
+    Load an entry's artifact after checking it against the recorded checksum.
+    numpy arrays in an uncompressed artifact are memory-mapped read-only, so
+    every worker process serves them from the same page cache. Artifacts are
+    only ever replaced by rename, never rewritten in place, so a mapping
+    stays valid while a worker still uses the old version.
+    """
+    import joblib
+
+    path = artifact_path(entry)
+    sha = file_sha256(path)
+    if sha != entry["sha256"]:
+        raise ValueError(f"checksum mismatch for model {entry['version']}: {path}")
+    return joblib.load(path, mmap_mode="r")
+
+
+def register(src, version, activate=False):
+    src = Path(src)
+    registry = read_registry()
+    if version in registry.get("versions", {}):
+        raise SystemExit(f"version {version} is already registered")
+
+    import joblib
+    model = joblib.load(src)
+    feature_cols = [str(c) for c in getattr(model, "feature_names_in_", [])] or None
+
+    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    dest = VERSIONS_DIR / f"{version}{src.suffix}"
+    tmp = dest.with_suffix(dest.suffix + ".tmp")
+    # Stored uncompressed whatever src used, so load_artifact can memory-map it.
+    joblib.dump(model, tmp, compress=0)
+    os.replace(tmp, dest)
+
+    registry = json.loads(json.dumps(registry))  # copy; may be the implicit default
+    registry.setdefault("versions", {})[version] = {
+        "path": str(dest.relative_to(MODELS_DIR)),
+        "sha256": file_sha256(dest),
+        "feature_cols": feature_cols,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    if activate or not registry.get("active"):
+        registry["active"] = version
+    write_registry(registry)
+    return registry["versions"][version]
+
+
+def activate(version):
+    registry = json.loads(json.dumps(read_registry()))
+    if version not in registry.get("versions", {}):
+        raise SystemExit(f"unknown version {version}")
+    registry["active"] = version
+    write_registry(registry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage versioned risk model artifacts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    reg = sub.add_parser("register")
+    reg.add_argument("artifact")
+    reg.add_argument("--version", required=True)
+    reg.add_argument("--activate", action="store_true")
+    act = sub.add_parser("activate")
+    act.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "register":
+        register(args.artifact, args.version, activate=args.activate)
+    elif args.command == "activate":
+        activate(args.version)
+
+    registry = read_registry()
+    for version, entry in registry.get("versions", {}).items():
+        marker = "*" if version == registry.get("active") else " "
+        print(f"{marker} {version:<16} {entry['sha256'][:12]}  {entry['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,555 @@
+"""
+Helpers for LLM-generated training schedules.
+
+Schedules go to and come back from the model in a compact one-line-per-day
+format (encode_compact_schedule / decode_compact_schedule) rather than
+indented JSON, which keeps prompts short as num_days grows. DayStreamParser
+pulls finished days out of the model's output while it is still writing the
+rest, so each day can be sent to the browser as soon as its line ends.
+
+Schedule chat handles common edits ("make today shorter", "more memory
+tomorrow") directly, and caches the model's replies for everything else
+by (date, schedule hash, normalized intent) for up to CHAT_CACHE_TTL seconds.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+DAYS_ARRAY_RE = re.compile(r'"days"\s*:\s*\[')
+
+
+class DayStreamParser:
+    """
+    Feed model output in arbitrary chunks; feed() returns the day objects
+    completed by that chunk, and flush() any day on an unterminated last
+    line. Days come from compact lines (see encode_compact_schedule) or,
+    if the model answered in JSON instead, from the "days" array. Days
+    that don't parse are skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.line_start = 0
+        self.compact = False
+        self.pos = 0
+        self.in_days = False
+        self.done = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.start = None
+
+    def feed(self, text):
+        self.buffer += text or ""
+        days = self._compact_days()
+        if not self.compact:
+            days.extend(self._json_days())
+        return days
+
+    def flush(self):
+        day = decode_compact_day(self.buffer[self.line_start:])
+        self.line_start = len(self.buffer)
+        return [day] if day is not None and not self.done else []
+
+    def _compact_days(self):
+        days = []
+        end = self.buffer.find("\n", self.line_start)
+        while end != -1:
+            day = decode_compact_day(self.buffer[self.line_start:end])
+            if day is not None:
+                self.compact = True
+                days.append(day)
+            self.line_start = end + 1
+            end = self.buffer.find("\n", self.line_start)
+        return days
+
+    def _json_days(self):
+        days = []
+        if self.done:
+            return days
+        if not self.in_days:
+            match = DAYS_ARRAY_RE.search(self.buffer)
+            if not match:
+                return days
+            self.in_days = True
+            self.pos = match.end()
+
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf):
+            ch = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                if self.depth == 0 and ch == "{":
+                    self.start = i
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0:
+                    # The "]" closing the days array itself.
+                    self.done = True
+                    i += 1
+                    break
+                self.depth -= 1
+                if self.depth == 0 and self.start is not None:
+                    try:
+                        day = json.loads(buf[self.start:i + 1])
+                    except ValueError:
+                        day = None
+                    if isinstance(day, dict):
+                        days.append(day)
+                    self.start = None
+            i += 1
+        self.pos = i
+        return days
+
+
+# ---------------------------------------------------------------------------
+# Schedule chat: deterministic edits for common requests and a reply cache
+# for everything that still goes to the model.
+# ---------------------------------------------------------------------------
+
+CHAT_CACHE_SIZE = 512
+CHAT_CACHE_TTL = 3600
+MIN_GAMES_PER_DAY = 2
+MAX_GAMES_PER_DAY = 4
+
+GAME_NAMES = {
+    "typing": "Typing Speed",
+    "visual_puzzle": "Visual Puzzle",
+    "stroop": "Stroop Practice",
+    "recall": "Word Recall",
+    "tapping": "Finger Tapping",
+    "orientation": "Orientation",
+    "trails": "Trail Making",
+    "fluency": "Verbal Fluency",
+}
+
+# Words naming a game or a domain -> game id (same mapping the chat prompt gives the model)
+GAME_WORDS = {
+    "typing": "typing", "puzzle": "visual_puzzle", "puzzles": "visual_puzzle",
+    "visual": "visual_puzzle", "visuospatial": "visual_puzzle", "spatial": "visual_puzzle",
+    "stroop": "stroop", "attention": "stroop", "executive": "stroop",
+    "recall": "recall", "memory": "recall",
+    "tapping": "tapping", "motor": "tapping",
+    "orientation": "orientation",
+    "trails": "trails", "trail": "trails",
+    "fluency": "fluency", "language": "fluency", "verbal": "fluency",
+}
+
+SHORTER_WORDS = {"shorter", "less", "fewer", "easier", "lighter", "shorten", "reduce"}
+MORE_WORDS = {"more", "longer", "harder", "extra", "add", "increase", "lengthen"}
+SWAP_WORDS = {"swap", "replace", "switch", "change"}
+FILLER_WORDS = {
+    "a", "an", "and", "bit", "by", "can", "could", "day", "do", "exercise",
+    "exercises", "for", "function", "game", "games", "i", "in", "instead", "into",
+    "it", "just", "let", "lets", "like", "little", "lot", "make", "me", "much",
+    "my", "of", "on", "one", "plan", "please", "practice", "s", "schedule",
+    "session", "slightly", "some", "thank", "thanks", "the", "to", "training",
+    "us", "want", "with", "would", "you",
+}
+
+_CHAT_CACHE = OrderedDict()
+_CHAT_LOCK = threading.Lock()
+_CHAT_STATS = {"hits": 0, "misses": 0, "fast_path": 0}
+
+
+def normalize_message(message):
+    text = (message or "").lower().replace("’", "'")
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def schedule_hash(schedule):
+    canonical = json.dumps(schedule, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def parse_intent(message):
+    """
+    (action, day, *games) for a fully understood edit request, else None.
+    day is "today", "tomorrow" or a 1-based day number; actions are
+    "shorter", "longer", "add" (one game) and "swap" (from, to).
+    """
+    words = normalize_message(message).split()
+    day = "today"
+    actions = set()
+    games = []
+    swap_in = False
+    i = 0
+    while i < len(words):
+        word = words[i]
+        prev = words[i - 1] if i else None
+        if word in ("today", "tomorrow"):
+            day = word
+        elif word == "day" and i + 1 < len(words) and words[i + 1].isdigit():
+            day = int(words[i + 1])
+            i += 1
+        elif word in SHORTER_WORDS:
+            actions.add("shorter")
+        elif word in MORE_WORDS:
+            actions.add("more")
+        elif word in SWAP_WORDS:
+            actions.add("swap")
+        elif word in GAME_WORDS:
+            if GAME_WORDS[word] not in games:
+                games.append(GAME_WORDS[word])
+        elif word in ("in", "out") and (prev in SWAP_WORDS or (prev in GAME_WORDS and len(games) == 1)):
+            # "swap in X for Y" / "swap X in for Y" name the new game first;
+            # "swap out X for Y" is the usual order.
+            swap_in = swap_in or word == "in"
+        elif word not in FILLER_WORDS:
+            # Anything we don't understand goes to the model.
+            return None
+        i += 1
+
+    if actions == {"swap"} and len(games) == 2:
+        if "instead" in words:
+            # "swap to X instead of Y" reverses the order too; let the model read it.
+            return None
+        old, new = (games[1], games[0]) if swap_in else (games[0], games[1])
+        return ("swap", day, old, new)
+    if actions == {"shorter"} and not games:
+        return ("shorter", day)
+    if actions == {"more"} and not games:
+        return ("longer", day)
+    if actions == {"more"} and len(games) == 1:
+        return ("add", day, games[0])
+    return None
+
+
+def _day_index(schedule, day):
+    days = schedule.get("days") or []
+    if isinstance(day, int):
+        index = day - 1
+    else:
+        today = date.today().isoformat()
+        dates = [d.get("date") if isinstance(d, dict) else None for d in days]
+        index = dates.index(today) if today in dates else 0
+        if day == "tomorrow":
+            index += 1
+    return index if 0 <= index < len(days) else None
+
+
+def _game_entry(game_id):
+    return {"id": game_id, "name": GAME_NAMES[game_id], "minutes": 3, "reason": "Added at your request."}
+
+
+def _game_list(games):
+    return ", ".join(GAME_NAMES.get(g.get("id"), g.get("name") or g.get("id")) for g in games)
+
+
+def apply_intent(schedule, intent):
+    """
+    Apply a parse_intent() result to a copy of schedule without calling the
+    model. Returns (response, updated_schedule or None), or None if the
+    intent doesn't fit this schedule.
+    """
+    action, day = intent[0], intent[1]
+    updated = json.loads(json.dumps(schedule))
+    index = _day_index(updated, day)
+    if index is None or not isinstance(updated["days"][index], dict):
+        return None
+    target = updated["days"][index]
+    games = [g for g in target.get("games") or [] if isinstance(g, dict)]
+    ids = [g.get("id") for g in games]
+    label = day if isinstance(day, str) else f"day {day}"
+
+    if action == "shorter":
+        if len(games) <= MIN_GAMES_PER_DAY:
+            return (f"{label.capitalize()} already has only {len(games)} games, so I left it as is.", None)
+        target["games"] = games[:MIN_GAMES_PER_DAY]
+        return (f"I shortened {label} to {MIN_GAMES_PER_DAY} games: {_game_list(target['games'])}.", updated)
+
+    if action == "longer":
+        if len(games) >= MAX_GAMES_PER_DAY:
+            return (f"{label.capitalize()} already has {len(games)} games, so I left it as is.", None)
+        for game_id in GAME_NAMES:
+            if len(games) >= MAX_GAMES_PER_DAY:
+                break
+            if game_id not in ids:
+                games.append(_game_entry(game_id))
+                ids.append(game_id)
+        target["games"] = games
+        return (f"I made {label} longer with {len(games)} games: {_game_list(games)}.", updated)
+
+    if action == "add":
+        game_id = intent[2]
+        if game_id in ids:
+            return (f"{label.capitalize()} already includes {GAME_NAMES[game_id]}.", None)
+        if len(games) >= MAX_GAMES_PER_DAY:
+            games = games[:MAX_GAMES_PER_DAY - 1]
+        target["games"] = games + [_game_entry(game_id)]
+        return (f"I added {GAME_NAMES[game_id]} to {label}.", updated)
+
+    if action == "swap":
+        old_id, new_id = intent[2], intent[3]
+        if old_id not in ids:
+            return (f"{label.capitalize()} doesn't include {GAME_NAMES[old_id]}, so there was nothing to swap.", None)
+        if new_id in ids:
+            return (f"{label.capitalize()} already includes {GAME_NAMES[new_id]}.", None)
+        entry = dict(games[ids.index(old_id)], id=new_id, name=GAME_NAMES[new_id])
+        games[ids.index(old_id)] = entry
+        target["games"] = games
+        return (f"I swapped {GAME_NAMES[old_id]} for {GAME_NAMES[new_id]} on {label}.", updated)
+    return None
+
+
+def chat_fast_path(schedule, message):
+    """(response, updated_schedule or None) for a common edit, or None to ask the model."""
+    intent = parse_intent(message)
+    result = apply_intent(schedule, intent) if intent else None
+    if result is not None:
+        with _CHAT_LOCK:
+            _CHAT_STATS["fast_path"] += 1
+    return result
+
+
+def chat_cache_key(schedule, message):
+    # "today" and "tomorrow" mean different days after midnight, so a reply
+    # is only reused on the date it was generated.
+    return (date.today().isoformat(), schedule_hash(schedule), parse_intent(message) or normalize_message(message))
+
+
+def get_cached_reply(key):
+    """The model's parsed reply for key, or None on a miss."""
+    with _CHAT_LOCK:
+        entry = _CHAT_CACHE.get(key)
+        if entry is not None and time.monotonic() - entry[0] > CHAT_CACHE_TTL:
+            del _CHAT_CACHE[key]
+            entry = None
+        if entry is None:
+            _CHAT_STATS["misses"] += 1
+            return None
+        _CHAT_CACHE.move_to_end(key)
+        _CHAT_STATS["hits"] += 1
+    return json.loads(entry[1])
+
+
+def remember_reply(key, reply):
+    with _CHAT_LOCK:
+        # Stored serialized so callers can't mutate the cached copy.
+        _CHAT_CACHE[key] = (time.monotonic(), json.dumps(reply))
+        _CHAT_CACHE.move_to_end(key)
+        while len(_CHAT_CACHE) > CHAT_CACHE_SIZE:
+            _CHAT_CACHE.popitem(last=False)
+
+
+def chat_cache_stats():
+    with _CHAT_LOCK:
+        lookups = _CHAT_STATS["hits"] + _CHAT_STATS["misses"]
+        return dict(
+            _CHAT_STATS,
+            size=len(_CHAT_CACHE),
+            hit_rate=(_CHAT_STATS["hits"] / lookups) if lookups else 0.0,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Compact prompt encoding: one line per day instead of indented JSON.
+#
+#     day|focus|description|games
+#     1|Memory focus|Warm up recall and attention.|recall:3 (word memory);stroop:2*
+#
+# Games are id[:minutes][*][ (reason)] separated by ";", where * marks a
+# completed game. Dates are implied by the line order (day 1 is start_date).
+# A "|", ";" or "\\" inside focus, description or a reason is written with a
+# backslash in front so it isn't read as a separator.
+# ---------------------------------------------------------------------------
+
+COMPACT_HEADER = "day|focus|description|games"
+COMPACT_DAY_RE = re.compile(r"^\s*(?:day\s*)?(\d+)\s*\|(.*)$", re.IGNORECASE)
+COMPACT_GAME_RE = re.compile(r"^\s*([a-z_]+)\s*(?::\s*(\d+))?\s*(\*)?\s*(?:\((.*)\))?\s*$", re.IGNORECASE)
+COMPACT_ESCAPE_RE = re.compile(r"\\([\\|;])")
+
+
+def _compact_text(value):
+    text = " ".join(str(value or "").split())
+    return text.replace("\\", "\\\\").replace("|", "\\|").replace(";", "\\;")
+
+
+def _compact_unescape(text):
+    return COMPACT_ESCAPE_RE.sub(r"\1", text)
+
+
+def _compact_split(text, sep):
+    """text split on sep where it isn't escaped; the parts keep their escapes."""
+    parts = []
+    start = i = 0
+    while i < len(text):
+        if text[i] == "\\" and text[i + 1:i + 2] in ("\\", "|", ";"):
+            i += 2
+            continue
+        if text[i] == sep:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def encode_compact_day(index, day, reasons=False):
+    tokens = []
+    for game in day.get("games") or []:
+        if not isinstance(game, dict) or not game.get("id"):
+            continue
+        token = str(game["id"])
+        if game.get("minutes") is not None:
+            token += f":{game['minutes']}"
+        if game.get("completed"):
+            token += "*"
+        if reasons and game.get("reason"):
+            token += f" ({_compact_text(game['reason'])})"
+        tokens.append(token)
+    return "|".join([
+        str(index + 1), _compact_text(day.get("focus")), _compact_text(day.get("description")),
+        ";".join(tokens),
+    ])
+
+
+def encode_compact_schedule(schedule, reasons=False):
+    """
+    The schedule's days as compact lines. Names, dates and completion
+    times are left out; decode_compact_schedule restores them from the
+    stored schedule. Reasons are only included when asked for.
+    """
+    days = [d for d in schedule.get("days") or [] if isinstance(d, dict)]
+    return "\n".join(encode_compact_day(i, day, reasons) for i, day in enumerate(days))
+
+
+def decode_compact_day(line, base_day=None):
+    """
+    Day dict for one compact line, or None if the line isn't one. Games
+    and fields the line doesn't mention are taken from base_day (the same
+    day of the stored schedule) when given.
+    """
+    match = COMPACT_DAY_RE.match(line or "")
+    if not match:
+        return None
+    parts = _compact_split(match.group(2), "|")
+    if len(parts) < 3:
+        return None
+
+    base_day = base_day if isinstance(base_day, dict) else {}
+    base_games = {g.get("id"): g for g in base_day.get("games") or [] if isinstance(g, dict)}
+    games = []
+    for token in _compact_split(parts[-1], ";"):
+        game_match = COMPACT_GAME_RE.match(token)
+        if not game_match:
+            continue
+        game_id, minutes, completed, reason = game_match.groups()
+        game_id = game_id.lower()
+        if game_id not in GAME_NAMES:
+            continue
+        if game_id in base_games:
+            game = json.loads(json.dumps(base_games[game_id]))
+        else:
+            game = {"id": game_id, "name": GAME_NAMES[game_id]}
+        if minutes is not None:
+            game["minutes"] = int(minutes)
+        if reason:
+            game["reason"] = _compact_unescape(reason.strip())
+        if completed:
+            game["completed"] = True
+        games.append(game)
+
+    day = json.loads(json.dumps(base_day))
+    day["focus"] = _compact_unescape(parts[0].strip())
+    day["description"] = _compact_unescape("|".join(parts[1:-1]).strip())
+    day["games"] = games
+    return day
+
+
+def decode_compact_schedule(text, base=None):
+    """
+    Stored-format schedule from compact lines (other lines are ignored),
+    or None if there are none. With base, encode -> decode round-trips.
+    """
+    base = base if isinstance(base, dict) else {}
+    base_days = base.get("days") or []
+    days = []
+    for line in (text or "").splitlines():
+        base_day = base_days[len(days)] if len(days) < len(base_days) else None
+        day = decode_compact_day(line, base_day)
+        if day is not None:
+            days.append(day)
+    if not days:
+        return None
+    schedule = json.loads(json.dumps(base))
+    schedule["num_days"] = len(days)
+    schedule["days"] = days
+    return schedule
+
+
+def build_schedule_prompt(days, domain_averages):
+    domains_info = "\n".join([f"- {d}: {avg:.2f}/100" for d, avg in domain_averages.items()]) if domain_averages else "- No prior scores yet"
+
+    return f"""
+You are a cognitive training coach. Create a {days}-day schedule starting today.
+
+User signals (not a diagnosis):
+{domains_info}
+
+Game ids (use ONLY these): {", ".join(GAME_NAMES)}
+
+Write exactly {days} lines and nothing else, one per day:
+{COMPACT_HEADER}
+games: 2 to 4 entries of id:minutes (short reason), separated by ";"
+
+Example:
+1|Memory focus|Warm up recall and attention.|recall:3 (word memory);stroop:2 (focus)
+"""
+
+
+def build_chat_prompt(schedule, message):
+    return f"""
+You are an AI schedule coach. The user wants changes to their schedule.
+
+Current schedule, one line per day ({COMPACT_HEADER}; games are id:minutes, * = completed, \\| and \\; are text):
+{encode_compact_schedule(schedule)}
+
+Today is day {(_day_index(schedule, "today") or 0) + 1}.
+
+User message:
+"{message}"
+
+Instructions:
+- Understand the request before acting.
+- If user asks a question, answer it. If they ask for a change, update the schedule.
+- "today" and "tomorrow" refer to the day numbers above.
+- If they say "less / shorter", reduce to 2 games that day.
+- If they say "more / harder", increase to 4 games that day.
+- If they want more of a domain:
+  - memory -> recall
+  - executive/attention -> stroop or trails
+  - visuospatial -> visual_puzzle
+  - language -> fluency
+- Keep ids valid: {", ".join(GAME_NAMES)}
+- Keep the * on completed games.
+
+Reply in exactly this format:
+REPLY: 1-4 sentences that clearly explain what you changed
+SCHEDULE:
+every day in the same line format, or NONE if nothing changed
+"""
+
+
+def parse_chat_reply(text, schedule):
+    """{"response", "updatedSchedule"} from a build_chat_prompt reply, or None."""
+    match = re.search(r"REPLY:\s*(.*?)\s*(?:SCHEDULE:(.*))?$", text or "", re.DOTALL | re.IGNORECASE)
+    if not match or not match.group(1):
+        return None
+    return {
+        "response": match.group(1).strip(),
+        "updatedSchedule": decode_compact_schedule(match.group(2) or "", base=schedule),
+    }
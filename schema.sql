@@ -57,3 +57,75 @@ CREATE TABLE IF NOT EXISTS bandit_state (
 
 CREATE UNIQUE INDEX IF NOT EXISTS idx_bandit_state_unique
   ON bandit_state (user_id, game, context, action);
+
+CREATE TABLE IF NOT EXISTS prediction (
+  user_id INTEGER PRIMARY KEY,
+  score_id INTEGER NOT NULL,
+  model_version TEXT NOT NULL,
+  pred INTEGER NOT NULL,
+  probability REAL,
+  created_at TEXT NOT NULL,
+  FOREIGN KEY(user_id) REFERENCES user(id)
+);
+
+CREATE TABLE IF NOT EXISTS content_pool (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  payload TEXT NOT NULL,
+  created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_content_pool_kind_id
+  ON content_pool (kind, id);
+
+CREATE TABLE IF NOT EXISTS content_cursor (
+  user_id INTEGER NOT NULL,
+  kind TEXT NOT NULL,
+  last_id INTEGER NOT NULL,
+  PRIMARY KEY (user_id, kind),
+  FOREIGN KEY(user_id) REFERENCES user(id)
+);
+
+CREATE TABLE IF NOT EXISTS schedule_day (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  schedule_id INTEGER NOT NULL,
+  day_index INTEGER NOT NULL,
+  date TEXT,
+  focus TEXT,
+  description TEXT,
+  FOREIGN KEY(schedule_id) REFERENCES schedule(id)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_schedule_day_schedule
+  ON schedule_day (schedule_id, day_index);
+
+CREATE TABLE IF NOT EXISTS schedule_item (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  schedule_day_id INTEGER NOT NULL,
+  position INTEGER NOT NULL,
+  game TEXT NOT NULL,
+  name TEXT,
+  minutes INTEGER,
+  reason TEXT,
+  completed INTEGER NOT NULL DEFAULT 0,
+  completed_at TEXT,
+  FOREIGN KEY(schedule_day_id) REFERENCES schedule_day(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_schedule_item_day
+  ON schedule_item (schedule_day_id, position);
+
+CREATE TABLE IF NOT EXISTS user_game_stats (
+  user_id INTEGER NOT NULL,
+  game TEXT NOT NULL,
+  domain TEXT NOT NULL,
+  count INTEGER NOT NULL,
+  mean REAL NOT NULL,
+  m2 REAL NOT NULL,
+  last_value REAL NOT NULL,
+  last_score_id INTEGER NOT NULL,
+  recent TEXT NOT NULL,
+  updated_at TEXT NOT NULL,
+  PRIMARY KEY (user_id, game),
+  FOREIGN KEY(user_id) REFERENCES user(id)
+);
@@ -0,0 +1,242 @@
+"""
+Training pipeline for the risk classifier, built from
+ml-models/cognitive_data_classification.ipynb.
+
+Reads only the columns ml.FEATURE_COLS needs from SATURN_MoCA.csv, with
+explicit dtypes: float64 for the notebook's numeric columns and category for
+the rest. It cross-validates each candidate model with folds fitted in
+parallel, then refits the best one (by mean F1) on every labelled row with
+n_jobs threads. The result is written to ml-models/best_model.joblib.
+
+Features are prepared exactly as the notebook prepares them under the
+pandas in requirements.txt (and as benchmarks/bench_feature_encoder.py
+does), so the artifact keeps the layout FeatureEncoder expects. Missing
+categorical values stay missing and are imputed. Artifacts trained under
+pandas < 3 saw them as a "nan" category, because astype(str) stringified
+NaN there.
+
+    python train_model.py --folds 5 --jobs -1
+    python train_model.py --register v3
+"""
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import model_registry
+from ml import FEATURE_COLS
+
+DATA_PATH = Path(__file__).parent / "data" / "MoCA" / "SATURN_MoCA.csv"
+NA_VALUES = ["", "NA", "Na", "na", "N/A", "NULL", "null", "nan"]
+NUMERIC_REGEX = re.compile(
+    "(" + "|".join([
+        r"_SCORE$", r"_TOTAL_SCORE$", r"_POSSIBLE_SCORE$", r"_POINTS$",
+        r"_TIME_SINCE_INDEX_days$", r"_ms$", r"_min$", r"_days$", r"_COUNT",
+        r"_SPEED", r"_TOTAL$", r"_WORDS_GENERATED", r"_MIS",
+    ]) + ")"
+)
+LABEL_MAP = {"NORMAL": 0, "MCI": 1, "DEMENTIA": 1}
+RANDOM_STATE = 42
+
+
+def edu_bin_to_num(val):
+    if pd.isna(val):
+        return np.nan
+    s = str(val).strip().lower()
+    if s == "under_12":
+        return 11.0
+    if s == "20_or_more":
+        return 20.0
+    if "_" in s:
+        a, b = s.split("_", 1)
+        try:
+            return (float(a) + float(b)) / 2.0
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+def _clean_categorical(series):
+    # The notebook's str.strip().replace({"": nan}), done once per category
+    # instead of once per row.
+    lookup = np.append(series.cat.categories.astype(str).str.strip().to_numpy(object), np.nan)
+    values = lookup[series.cat.codes.to_numpy()]  # code -1 (NaN) picks the NaN
+    return pd.Series(values, index=series.index).replace("", np.nan).astype("category")
+
+
+def load_training_data(path=DATA_PATH):
+    """(X, y) for the labelled rows, as the notebook prepares them."""
+    raw_cols = [c for c in FEATURE_COLS if c != "YR_EDU_num"] + ["YR_EDU", "GENERAL_Dx"]
+    header = pd.read_csv(path, encoding="cp1252", nrows=0).columns
+    usecols = [c for c in raw_cols if c in header]
+    numeric = [c for c in usecols if NUMERIC_REGEX.search(c)]
+    dtypes = {c: ("float64" if c in numeric else "category") for c in usecols}
+    try:
+        df = pd.read_csv(path, encoding="cp1252", na_values=NA_VALUES, usecols=usecols, dtype=dtypes)
+    except ValueError:
+        # A numeric column holds text: read it as text and coerce like the notebook.
+        dtypes.update({c: "category" for c in numeric})
+        df = pd.read_csv(path, encoding="cp1252", na_values=NA_VALUES, usecols=usecols, dtype=dtypes)
+        for col in numeric:
+            df[col] = pd.to_numeric(_clean_categorical(df[col]).astype(object), errors="coerce")
+
+    for col in usecols:
+        if col not in numeric:
+            df[col] = _clean_categorical(df[col])
+    edu = df["YR_EDU"]
+    lookup = np.append([edu_bin_to_num(v) for v in edu.cat.categories], np.nan).astype("float64")
+    df["YR_EDU_num"] = lookup[edu.cat.codes.to_numpy()]
+
+    y = df["GENERAL_Dx"].astype(object).map(LABEL_MAP)
+    mask = y.notna()
+    features = [c for c in FEATURE_COLS if c in df.columns]
+    X = df.loc[mask, features].copy()
+    for col in features:
+        X[f"{col}_missing"] = X[col].isna().astype(int)
+    return X, y.loc[mask]
+
+
+def build_preprocess(X):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    numeric_cols = X.select_dtypes(include=["number"]).columns.tolist()
+    categorical_cols = [c for c in X.columns if c not in numeric_cols]
+    numeric_pipe = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+    ])
+    categorical_pipe = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("onehot", OneHotEncoder(handle_unknown="ignore")),
+    ])
+    return ColumnTransformer(transformers=[
+        ("num", numeric_pipe, numeric_cols),
+        ("cat", categorical_pipe, categorical_cols),
+    ])
+
+
+def candidate_models(n_jobs=None):
+    """The notebook's models; n_jobs goes to those that fit in parallel."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
+    models = {
+        "log_reg": LogisticRegression(max_iter=300, class_weight="balanced"),
+        "decision_tree": DecisionTreeClassifier(max_depth=5, random_state=RANDOM_STATE, class_weight="balanced"),
+        "random_forest": RandomForestClassifier(
+            n_estimators=300, random_state=RANDOM_STATE, class_weight="balanced", n_jobs=n_jobs
+        ),
+    }
+    try:
+        from xgboost import XGBClassifier
+        models["xgboost"] = XGBClassifier(
+            n_estimators=300,
+            max_depth=4,
+            learning_rate=0.05,
+            subsample=0.9,
+            colsample_bytree=0.9,
+            eval_metric="logloss",
+            random_state=RANDOM_STATE,
+            n_jobs=n_jobs,
+        )
+    except Exception as exc:
+        print(f"XGBoost not available: {exc}")
+    return models
+
+
+def cross_validate_models(X, y, folds=5, jobs=-1):
+    """Mean CV metrics per candidate, best (highest F1) first."""
+    from sklearn.model_selection import StratifiedKFold, cross_validate
+    from sklearn.pipeline import Pipeline
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+    results = []
+    # Folds run in parallel, so each fit stays single-threaded.
+    for name, clf in candidate_models(n_jobs=1).items():
+        pipe = Pipeline(steps=[("preprocess", build_preprocess(X)), ("clf", clf)])
+        start = time.perf_counter()
+        scores = cross_validate(pipe, X, y, cv=cv, scoring=["accuracy", "f1", "roc_auc"], n_jobs=jobs)
+        results.append({
+            "model": name,
+            "accuracy": float(np.mean(scores["test_accuracy"])),
+            "f1": float(np.mean(scores["test_f1"])),
+            "roc_auc": float(np.mean(scores["test_roc_auc"])),
+            "seconds": time.perf_counter() - start,
+        })
+    return sorted(results, key=lambda r: r["f1"], reverse=True)
+
+
+def fit_model(name, X, y, jobs=-1):
+    """Fit candidate name on all of X with jobs threads; the result predicts single-threaded."""
+    from sklearn.pipeline import Pipeline
+
+    clf = candidate_models(n_jobs=jobs)[name]
+    model = Pipeline(steps=[("preprocess", build_preprocess(X)), ("clf", clf)])
+    model.fit(X, y)
+    if "n_jobs" in clf.get_params():
+        # Serving scores one row at a time; a thread pool per call only adds latency.
+        clf.set_params(n_jobs=1)
+    return model
+
+
+def save_model(model, out_path):
+    import joblib
+
+    out_path = Path(out_path)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    # Uncompressed, so model_registry.load_artifact can memory-map the arrays.
+    joblib.dump(model, tmp, compress=0)
+    os.replace(tmp, out_path)
+
+
+def train(out_path=model_registry.DEFAULT_ARTIFACT, folds=5, jobs=-1, data_path=DATA_PATH):
+    """Cross-validate, refit the best model and save it. Returns a timing/metrics report."""
+    report = {}
+    start = time.perf_counter()
+    X, y = load_training_data(data_path)
+    report["load_s"] = time.perf_counter() - start
+    report["rows"] = len(X)
+
+    start = time.perf_counter()
+    report["cv"] = cross_validate_models(X, y, folds=folds, jobs=jobs)
+    report["cv_s"] = time.perf_counter() - start
+
+    best = report["cv"][0]["model"]
+    start = time.perf_counter()
+    model = fit_model(best, X, y, jobs=jobs)
+    report["fit_s"] = time.perf_counter() - start
+    save_model(model, out_path)
+    report["best"] = best
+    report["out"] = str(out_path)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the risk classifier from SATURN_MoCA.csv.")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel folds / threads per fit (-1: all cores)")
+    parser.add_argument("--out", default=str(model_registry.DEFAULT_ARTIFACT))
+    parser.add_argument("--register", metavar="VERSION", help="also register and activate the artifact")
+    args = parser.parse_args()
+
+    report = train(args.out, folds=args.folds, jobs=args.jobs)
+    print(f"Loaded {report['rows']} labelled rows in {report['load_s']:.2f}s")
+    print(f"{'model':<14} {'accuracy':>8} {'f1':>6} {'roc_auc':>7} {'cv s':>6}")
+    for row in report["cv"]:
+        print(f"{row['model']:<14} {row['accuracy']:>8.3f} {row['f1']:>6.3f} {row['roc_auc']:>7.3f} {row['seconds']:>6.1f}")
+    print(f"Cross-validation {report['cv_s']:.1f}s; refit {report['best']} in {report['fit_s']:.1f}s -> {report['out']}")
+    if args.register:
+        model_registry.register(report["out"], args.register, activate=True)
+        print(f"Registered and activated {args.register}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+
+
+class TreeEnsemble:
+    """
+    Compiled form of the fitted tree classifier in best_model.joblib.
+
+    Every tree is flattened into shared node arrays (feature, threshold,
+    children, missing_left, value) and all trees are walked together, one
+    level per step, over a (trees, rows) array of node indices. Leaves point
+    to themselves, so at most max_depth steps bring every row to its leaf in
+    every tree.
+
+    Splits follow the libraries' own comparisons on float32 inputs.
+    scikit-learn sends x left when float32(x) <= threshold, with a float64
+    threshold. XGBoost sends x left when x < threshold, with a float32
+    threshold. Both are stored as the largest float32 that keeps the same
+    rows on the left, so a single float32 "<=" covers both. NaN follows the
+    split's default direction.
+
+    Supported: DecisionTreeClassifier / RandomForestClassifier /
+    ExtraTreesClassifier (leaf class fractions averaged over trees) and
+    binary:logistic gbtree XGBClassifier (leaf margins summed onto the base
+    margin, then the sigmoid). Anything else raises ValueError so callers
+    can fall back to the classifier's own predict_proba.
+    """
+
+    def __init__(self, classifier):
+        self.classes = np.asarray(classifier.classes_)
+        if hasattr(classifier, "get_booster"):
+            trees = self._compile_xgboost(classifier)
+        elif hasattr(classifier, "estimators_") or hasattr(classifier, "tree_"):
+            trees = self._compile_sklearn(classifier)
+        else:
+            raise ValueError(f"unsupported classifier: {type(classifier).__name__}")
+
+        roots, offset = [], 0
+        feature, threshold, left, right, missing_left, value = ([] for _ in range(6))
+        self.max_depth = 0
+        for tree in trees:
+            n = len(tree["feature"])
+            is_leaf = tree["left"] < 0
+            own = np.arange(n)
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree["feature"]))
+            threshold.append(tree["threshold"])
+            left.append(offset + np.where(is_leaf, own, tree["left"]))
+            right.append(offset + np.where(is_leaf, own, tree["right"]))
+            missing_left.append(tree["missing_left"])
+            value.append(tree["value"])
+            self.max_depth = max(self.max_depth, _depth(tree["left"], tree["right"]))
+            offset += n
+
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float32)
+        # children[2 * node] is the left child, children[2 * node + 1] the right.
+        self.children = np.column_stack([np.concatenate(left), np.concatenate(right)]).astype(np.intp).ravel()
+        self.missing_left = np.concatenate(missing_left).astype(bool)
+        self.value = np.concatenate(value)
+        self.n_trees = len(roots)
+
+    def _compile_sklearn(self, classifier):
+        estimators = getattr(classifier, "estimators_", None) or [classifier]
+        self.kind = "mean"
+        trees = []
+        for est in estimators:
+            tree = est.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("multi-output trees are not supported")
+            nodes = tree.__getstate__()["nodes"]
+            missing = nodes["missing_go_to_left"] if "missing_go_to_left" in nodes.dtype.names else np.zeros(len(nodes))
+            value = np.array(tree.value[:, 0, :], dtype=np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            if not np.allclose(normalizer, 1.0):
+                # scikit-learn < 1.4 stores weighted class counts, which
+                # predict_proba divides by their sum; later versions store
+                # the fractions and return them as they are.
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer
+            trees.append({
+                "feature": tree.feature,
+                "threshold": _float32_at_most(tree.threshold),
+                "left": tree.children_left,
+                "right": tree.children_right,
+                "missing_left": missing,
+                "value": value,
+            })
+        return trees
+
+    def _compile_xgboost(self, classifier):
+        booster = classifier.get_booster()
+        learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+        gbtree = learner["gradient_booster"]
+        if gbtree["name"] != "gbtree" or learner["objective"]["name"] != "binary:logistic":
+            raise ValueError("only binary:logistic gbtree boosters are supported")
+        model = gbtree["model"]
+        if int(model["gbtree_model_param"]["num_parallel_tree"]) != 1:
+            raise ValueError("boosted forests are not supported")
+        trees = model["trees"]
+        best = getattr(classifier, "best_iteration", None)
+        if best is not None:
+            trees = trees[: best + 1]
+
+        # Stored as a probability ("5E-1", or "[5E-1]" from XGBoost 3) and
+        # turned into a margin in float32, as XGBoost's -logf(1/p - 1).
+        base_score = np.float32(learner["learner_model_param"]["base_score"].strip("[]"))
+        self.kind = "logistic"
+        self.base_margin = -np.log(np.float32(1) / base_score - np.float32(1))
+        compiled = []
+        for tree in trees:
+            if any(tree["split_type"]) or tree["categories"]:
+                raise ValueError("categorical splits are not supported")
+            left = np.asarray(tree["left_children"])
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            compiled.append({
+                "feature": np.asarray(tree["split_indices"]),
+                # x < t on float32 is x <= the float32 just below t.
+                "threshold": np.nextafter(conditions, np.float32(-np.inf)),
+                "left": left,
+                "right": np.asarray(tree["right_children"]),
+                "missing_left": np.asarray(tree["default_left"]),
+                "value": np.where(left < 0, conditions, 0).astype(np.float32)[:, np.newaxis],
+            })
+        return compiled
+
+    def leaves(self, X):
+        """(trees, rows) leaf node indices for a 2-d float array."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, width = X.shape
+        flat = X.ravel()
+        row_start = np.arange(n, dtype=np.intp) * width
+        has_missing = np.isnan(flat).any()
+        # Work arrays are allocated once: fresh multi-megabyte temporaries on
+        # every level cost more in page faults than the gathers themselves.
+        # Indices are always in range, so take(mode="clip") writes straight
+        # into out instead of buffering.
+        nodes = np.repeat(self.roots[:, np.newaxis], n, axis=1)
+        step = np.empty_like(nodes)
+        index = np.empty_like(nodes)
+        x = np.empty(nodes.shape, dtype=np.float32)
+        threshold = np.empty(nodes.shape, dtype=np.float32)
+        go_right = np.empty(nodes.shape, dtype=bool)
+        for _ in range(self.max_depth):
+            np.take(self.feature, nodes, out=index, mode="clip")
+            index += row_start
+            np.take(flat, index, out=x, mode="clip")
+            np.take(self.threshold, nodes, out=threshold, mode="clip")
+            np.greater(x, threshold, out=go_right)
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.missing_left[nodes[missing]]
+            np.multiply(nodes, 2, out=index)
+            index += go_right
+            np.take(self.children, index, out=step, mode="clip")
+            if np.array_equal(step, nodes):
+                break  # every row is at a leaf in every tree
+            nodes, step = step, nodes
+        return nodes
+
+    def predict_proba(self, X):
+        """Class probabilities, one column per classes entry, as the classifier computes them."""
+        values = self.value[self.leaves(X)]  # (trees, rows, outputs)
+        # cumsum adds strictly in tree order, as the libraries do, so the
+        # float rounding (and the result) is theirs to the last bit.
+        if self.kind == "mean":
+            return np.cumsum(values, axis=0)[-1] / self.n_trees
+        margin = np.cumsum(np.vstack([np.full(values.shape[1], self.base_margin), values[:, :, 0]]), axis=0)[-1]
+        # expf(-margin) rounded from float64, since numpy's float32 exp can be
+        # an ulp away from the C library's.
+        exp = np.exp(-margin.astype(np.float64)).astype(np.float32)
+        p = np.float32(1) / (exp + np.float32(1))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+
+def _float32_at_most(threshold):
+    """Largest float32 <= each float64 threshold: float32(x) <= t exactly when x32 <= this."""
+    t32 = threshold.astype(np.float32)
+    too_big = t32.astype(np.float64) > threshold
+    t32[too_big] = np.nextafter(t32[too_big], np.float32(-np.inf))
+    return t32
+
+
+def _depth(left, right):
+    depth = np.zeros(len(left), dtype=int)
+    for node in range(len(left)):  # children always come after their parent
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())